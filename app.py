@@ -1,12 +1,42 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc
+import gzip
+import functools
+import html
+import io
 import json
+import hashlib
+import logging
+import os
+import pathlib
+import random
+import re
+import requests
+import sqlite3
+import string
+import threading
+import time
 import gspread
+from google.auth.exceptions import TransportError
+from google.auth.transport.requests import Request
 from google.oauth2.service_account import Credentials
-from datetime import datetime, timedelta
-import plotly.express as px
+from datetime import datetime, timedelta, timezone
 import plotly.graph_objects as go
+import dataplane
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from io import StringIO
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
 
 # Page config
 st.set_page_config(
@@ -28,346 +58,3538 @@ st.markdown("""
     border-left: 5px solid #ff6b6b;
 }
 
-.email-card-high {
-    border-left-color: #ff4757;
-    background: linear-gradient(135deg, #ff6b6b 0%, #ee5a24 100%);
-}
+.email-card-high {
+    border-left-color: #ff4757;
+    background: linear-gradient(135deg, #ff6b6b 0%, #ee5a24 100%);
+}
+
+.email-card-medium {
+    border-left-color: #ffa726;
+    background: linear-gradient(135deg, #ffa726 0%, #ff7043 100%);
+}
+
+.email-card-low {
+    border-left-color: #66bb6a;
+    background: linear-gradient(135deg, #66bb6a 0%, #43a047 100%);
+}
+
+.card-header {
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    margin-bottom: 15px;
+}
+
+.priority-badge {
+    padding: 5px 15px;
+    border-radius: 20px;
+    font-size: 12px;
+    font-weight: bold;
+    text-transform: uppercase;
+}
+
+.status-badge {
+    padding: 5px 10px;
+    border-radius: 10px;
+    font-size: 11px;
+    background: rgba(255,255,255,0.2);
+}
+
+.card-content {
+    margin: 10px 0;
+}
+
+.card-footer {
+    margin-top: 15px;
+    padding-top: 15px;
+    border-top: 1px solid rgba(255,255,255,0.3);
+    display: flex;
+    justify-content: space-between;
+    font-size: 12px;
+}
+
+.metric-card {
+    background: white;
+    padding: 20px;
+    border-radius: 10px;
+    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+    text-align: center;
+}
+
+.mailbox-header {
+    background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
+    color: white;
+    padding: 15px;
+    border-radius: 10px;
+    margin: 20px 0 10px 0;
+}
+
+.filter-section {
+    background: #f8f9fa;
+    padding: 15px;
+    border-radius: 10px;
+    margin: 10px 0;
+}
+</style>
+""", unsafe_allow_html=True)
+
+# Initialize session state. Loaded data lives in the shared cache; a session
+# only keeps the (key, version) of the data it last showed.
+if 'gsheet_connected' not in st.session_state:
+    st.session_state.gsheet_connected = False
+if 'service_account_info' not in st.session_state:
+    st.session_state.service_account_info = None
+if 'data_source' not in st.session_state:
+    st.session_state.data_source = None
+if 'data_version' not in st.session_state:
+    st.session_state.data_version = None
+
+# Stage instrumentation: wall time and RSS growth per stage of each rerun, with
+# rolling windows per stage for percentiles. Reruns are also logged as JSON
+# lines on the "email_dashboard.perf" logger and, when the environment variable
+# below names a file, written there in Prometheus text format after every rerun
+# (e.g. for the node_exporter textfile collector).
+PERF_WINDOW = 500
+PERF_RUN_HISTORY = 200
+PERF_QUANTILES = [0.5, 0.9, 0.99]
+PERF_METRICS_FILE = os.environ.get("EMAIL_DASHBOARD_METRICS_FILE")
+perf_logger = logging.getLogger("email_dashboard.perf")
+
+@st.cache_resource
+def _perf_metrics():
+    """Process-wide stage timings; "local" holds the breakdown of the rerun on each script thread"""
+    return {
+        "lock": threading.Lock(),
+        "stages": {},
+        "totals": {},
+        "runs": deque(maxlen=PERF_RUN_HISTORY),
+        "local": threading.local()
+    }
+
+def _rss_bytes():
+    """Resident set size of the process, or None where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+def record_stage(stage, seconds, rss_delta=None, at=None):
+    """Add one timing to a stage's rolling window and to the current rerun's breakdown.
+
+    at is where the stage started in the breakdown, so it is listed before the
+    calls nested in it.
+    """
+    metrics = _perf_metrics()
+    with metrics["lock"]:
+        window = metrics["stages"].get(stage)
+        if window is None:
+            window = metrics["stages"][stage] = deque(maxlen=PERF_WINDOW)
+            metrics["totals"][stage] = [0, 0.0]
+        window.append(seconds)
+        metrics["totals"][stage][0] += 1
+        metrics["totals"][stage][1] += seconds
+    run = getattr(metrics["local"], "run", None)
+    if run is not None:
+        run["stages"].insert(len(run["stages"]) if at is None else at, {
+            "stage": stage,
+            "ms": round(seconds * 1000, 2),
+            "rss_delta_mib": None if rss_delta is None else round(rss_delta / 1024 ** 2, 2),
+            "depth": run["depth"]
+        })
+
+def timed(stage):
+    """Decorator recording every call of a function as a stage"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            run = getattr(_perf_metrics()["local"], "run", None)
+            at = None
+            if run is not None:
+                at = len(run["stages"])
+                run["depth"] += 1
+            rss = _rss_bytes()
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - started
+                if run is not None:
+                    run["depth"] -= 1
+                after = _rss_bytes()
+                record_stage(stage, seconds, None if rss is None or after is None else after - rss, at)
+        return wrapper
+    return decorate
+
+def start_perf_run():
+    """Begin the breakdown of this rerun; stages are then closed with perf_lap"""
+    rss = _rss_bytes()
+    now = time.perf_counter()
+    _perf_metrics()["local"].run = {"started": now, "last": now, "rss": rss, "stages": [], "lap_at": 0, "depth": 1}
+
+def perf_lap(stage):
+    """Record the time since the previous lap (or the start of the rerun) as a stage"""
+    run = getattr(_perf_metrics()["local"], "run", None)
+    if run is None:
+        return
+    now = time.perf_counter()
+    rss = _rss_bytes()
+    run["depth"] -= 1
+    record_stage(stage, now - run["last"], None if rss is None or run["rss"] is None else rss - run["rss"], run["lap_at"])
+    run["depth"] += 1
+    run["last"], run["rss"], run["lap_at"] = now, rss, len(run["stages"])
+
+def finish_perf_run():
+    """Close the rerun: record its total, log it and refresh the metrics file; returns its breakdown"""
+    metrics = _perf_metrics()
+    run = getattr(metrics["local"], "run", None)
+    if run is None:
+        return None
+    metrics["local"].run = None
+    total = time.perf_counter() - run["started"]
+    record_stage("rerun", total)
+    ctx = get_script_run_ctx()
+    record = {
+        "event": "rerun",
+        "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "session": ctx.session_id if ctx is not None else None,
+        "total_ms": round(total * 1000, 2),
+        "rss_mib": None if run["rss"] is None else round(run["rss"] / 1024 ** 2, 1),
+        "stages": run["stages"]
+    }
+    with metrics["lock"]:
+        metrics["runs"].append(record)
+    perf_logger.info(json.dumps(record))
+    if PERF_METRICS_FILE:
+        try:
+            # Written aside and renamed, so scrapers never read a partial file
+            partial = f"{PERF_METRICS_FILE}.partial"
+            with open(partial, "w") as handle:
+                handle.write(prometheus_metrics())
+            os.replace(partial, PERF_METRICS_FILE)
+        except OSError as e:
+            perf_logger.warning("Could not write %s: %s", PERF_METRICS_FILE, e)
+    return record
+
+def stage_percentiles():
+    """Rolling count, percentiles and max per stage, slowest median first"""
+    metrics = _perf_metrics()
+    with metrics["lock"]:
+        windows = {stage: np.array(window) for stage, window in metrics["stages"].items()}
+    rows = [
+        {"Stage": stage, "Calls": len(window)}
+        | {f"p{round(q * 100)} (ms)": np.quantile(window, q) * 1000 for q in PERF_QUANTILES}
+        | {"Max (ms)": window.max() * 1000}
+        for stage, window in windows.items()
+    ]
+    return pd.DataFrame(rows).sort_values("p50 (ms)", ascending=False) if rows else pd.DataFrame()
+
+def _prometheus_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def prometheus_metrics():
+    """Stage timings (rolling quantiles, lifetime sum and count), RSS and Sheets API counters in Prometheus text format"""
+    metrics = _perf_metrics()
+    with metrics["lock"]:
+        windows = {stage: np.array(window) for stage, window in metrics["stages"].items()}
+        totals = {stage: tuple(total) for stage, total in metrics["totals"].items()}
+    lines = [
+        "# HELP email_dashboard_stage_seconds Time spent in each dashboard stage (quantiles over the last "
+        f"{PERF_WINDOW} calls)",
+        "# TYPE email_dashboard_stage_seconds summary"
+    ]
+    for stage, window in windows.items():
+        label = _prometheus_label(stage)
+        for q in PERF_QUANTILES:
+            lines.append(f'email_dashboard_stage_seconds{{stage="{label}",quantile="{q}"}} {np.quantile(window, q):.6f}')
+        lines.append(f'email_dashboard_stage_seconds_sum{{stage="{label}"}} {totals[stage][1]:.6f}')
+        lines.append(f'email_dashboard_stage_seconds_count{{stage="{label}"}} {totals[stage][0]}')
+    rss = _rss_bytes()
+    if rss is not None:
+        lines += [
+            "# HELP email_dashboard_resident_memory_bytes Resident memory of the dashboard process",
+            "# TYPE email_dashboard_resident_memory_bytes gauge",
+            f"email_dashboard_resident_memory_bytes {rss}"
+        ]
+    for name, value in sheets_metrics().items():
+        metric = f"email_dashboard_sheets_{name}" + ("" if name == "waited_seconds" else "_total")
+        lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    return "\n".join(lines) + "\n"
+
+def render_perf_panel(record):
+    """Sidebar panel with this rerun's stage breakdown, rolling percentiles and the metric exports"""
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        if record is not None:
+            st.caption(f"This rerun: {record['total_ms']:.0f} ms" + (
+                "" if record["rss_mib"] is None else f", {record['rss_mib']:.0f} MiB resident"
+            ))
+            breakdown = pd.DataFrame(record["stages"])
+            if not breakdown.empty:
+                # Calls made inside a stage are listed under it
+                breakdown["stage"] = [
+                    "  " * (depth - 1) + "↳ " + stage if depth else stage
+                    for stage, depth in zip(breakdown["stage"], breakdown["depth"])
+                ]
+                st.dataframe(
+                    breakdown.drop(columns="depth").rename(columns={"stage": "Stage", "ms": "ms", "rss_delta_mib": "RSS Δ (MiB)"}),
+                    hide_index=True, use_container_width=True
+                )
+        st.caption(f"Rolling percentiles (last {PERF_WINDOW} calls per stage, all sessions)")
+        st.dataframe(stage_percentiles().round(1), hide_index=True, use_container_width=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                "📥 Prometheus", data=prometheus_metrics, file_name="email_dashboard_metrics.prom",
+                mime="text/plain", on_click="ignore", key="perf_prometheus"
+            )
+        with col2:
+            st.download_button(
+                "📥 JSON log",
+                data=lambda: "\n".join(json.dumps(run) for run in list(_perf_metrics()["runs"])) + "\n",
+                file_name="email_dashboard_reruns.jsonl", mime="application/x-ndjson",
+                on_click="ignore", key="perf_log"
+            )
+
+# Typed schema: low-cardinality text as categoricals, Y/N flags as booleans and
+# Received Date + Received Time folded into one datetime64 column
+CATEGORY_COLUMNS = [
+    "Company Main Email", "Department", "Priority", "Category/Tag",
+    "Approver Name", "Assigned To", "Resolution Status"
+]
+FLAG_COLUMNS = [
+    "Response Approved (Y/N)", "Sent (Y/N)", "Attachments Received (Y/N)", "Follow-up Required (Y/N)"
+]
+RECEIVED_AT = "Received At"
+
+def parse_sheet_datetimes(dates, times=None):
+    """Parse date (and optional time) text columns into datetime64, NaT where unparseable"""
+    text = dates.astype(str).str.strip()
+    if times is not None:
+        text = (text + " " + times.astype(str).str.strip()).str.strip()
+    parsed = pd.to_datetime(text, format="%Y-%m-%d %H:%M" if times is not None else "%Y-%m-%d", errors="coerce")
+    # Fall back to per-value parsing only for cells in another format (e.g. 10/16/2024 9:15 AM)
+    retry = parsed.isna() & (text != "")
+    if retry.any():
+        parsed[retry] = pd.to_datetime(text[retry], format="mixed", errors="coerce")
+    return parsed
+
+def normalize_email_frame(df):
+    """Convert raw sheet strings into the compact typed schema"""
+    df = df.copy()
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).astype("category")
+    for col in FLAG_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip().str.upper().isin(["Y", "YES", "TRUE"])
+    if "Received Date" in df.columns and "Received Time" in df.columns:
+        position = df.columns.get_loc("Received Date")
+        received_at = parse_sheet_datetimes(df["Received Date"], df["Received Time"])
+        df = df.drop(columns=["Received Date", "Received Time"])
+        df.insert(position, RECEIVED_AT, received_at)
+    return df
+
+def concat_email_frames(frames):
+    """Concatenate typed frames, unioning categories so the columns stay categorical"""
+    frames = list(frames)
+    for col in CATEGORY_COLUMNS:
+        present = [f[col].cat.categories for f in frames if col in f.columns]
+        if not present:
+            continue
+        categories = present[0]
+        for other in present[1:]:
+            categories = categories.union(other)
+        frames = [
+            f.assign(**{col: f[col].cat.set_categories(categories)}) if col in f.columns else f
+            for f in frames
+        ]
+    return pd.concat(frames, ignore_index=True)
+
+def to_sheet_format(df):
+    """Convert a typed frame back to the sheet layout (Y/N flags, separate date and time) for exports"""
+    df = df.copy()
+    for col in FLAG_COLUMNS:
+        if col in df.columns:
+            df[col] = np.where(df[col], "Y", "N")
+    if RECEIVED_AT in df.columns:
+        position = df.columns.get_loc(RECEIVED_AT)
+        received_at = df.pop(RECEIVED_AT)
+        df.insert(position, "Received Date", received_at.dt.strftime("%Y-%m-%d").fillna(""))
+        df.insert(position + 1, "Received Time", received_at.dt.strftime("%H:%M").fillna(""))
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str)
+    return df
+
+def format_flag(value):
+    """Format a boolean flag the way the sheet stores it"""
+    return "Y" if value else "N"
+
+def format_received(value):
+    """Format a Received At timestamp for display"""
+    return value.strftime("%Y-%m-%d at %H:%M") if pd.notna(value) else "Unknown"
+
+# Column layout of the email tracking sheet (and of CSV exports and SQL tables)
+SHEET_COLUMNS = [
+    "Company Main Email", "Email ID", "Received Date", "Received Time",
+    "From (Sender Name)", "From (Sender Email)", "Subject", "Department",
+    "Priority", "Category/Tag", "Email Summary", "Drafted Response",
+    "Response Approved (Y/N)", "Approver Name", "Sent (Y/N)", "Sent Date",
+    "Sent Time", "Sent Email Summary", "Attachments Received (Y/N)",
+    "Attachment Details", "Follow-up Required (Y/N)", "Follow-up Due Date",
+    "Assigned To", "Resolution Status", "Notes/Comments"
+]
+
+# Value pools for the synthetic emails behind the demo data and the benchmarks
+DEMO_DEPARTMENTS = {
+    "Support": "support", "Sales": "sales", "Billing": "billing", "HR": "hr", "General": "info"
+}
+DEMO_SUBJECTS = [
+    "Urgent: Payment processing issue needs immediate attention",
+    "Follow-up on credit application status inquiry",
+    "Request for documentation update and verification",
+    "Complaint about service delays and resolution needed",
+    "New partnership opportunity discussion",
+    "Account verification and security update required",
+    "Invoice discrepancy needs clarification",
+    "Employee onboarding documentation request",
+    "Product demo scheduling and requirements",
+    "Technical support for platform integration"
+]
+DEMO_SUMMARIES = [
+    "Customer experiencing payment gateway errors affecting multiple transactions",
+    "Applicant requesting status update on business credit application submitted last week",
+    "Client needs to update business documentation for compliance review",
+    "Frustrated customer complaining about 3-day service delay, requesting manager escalation",
+    "Potential partner proposing strategic alliance for mutual growth opportunities",
+    "Security team requesting account verification due to suspicious login attempts",
+    "Billing discrepancy of $1,500 requires investigation and correction",
+    "New hire needs access credentials and onboarding materials",
+    "Prospect interested in product demo and pricing information",
+    "Integration issues with API causing data sync problems"
+]
+DEMO_CATEGORIES = ["Urgent", "Follow-up", "Inquiry", "Complaint", "Request"]
+DEMO_FIRST_NAMES = ["James", "Maria", "Robert", "Linda", "Michael", "Aisha", "David", "Chen", "Sarah", "Carlos"]
+DEMO_LAST_NAMES = ["Smith", "Garcia", "Johnson", "Nguyen", "Williams", "Patel", "Brown", "Kim", "Jones", "Lopez"]
+DEMO_APPROVERS = ["Manager Smith", "Manager Lee", "Manager Ortiz"]
+DEMO_ATTACHMENTS = ["contract.pdf, invoice.xlsx", "id_scan.png", "statement.pdf", "application_form.docx"]
+# Probabilities of High/Medium/Low priority and of Pending/In Progress/Completed status
+DEMO_PRIORITY_RATES = [0.2, 0.5, 0.3]
+DEMO_STATUS_RATES = [0.3, 0.35, 0.35]
+# Typical hours until a reply is sent, per priority
+DEMO_RESPONSE_HOURS = {"High": 2, "Medium": 6, "Low": 18}
+DEMO_HISTORY_DAYS = 90
+
+def demo_mailboxes(count):
+    """Company mailboxes: one per department first, then numbered ones (support2@, sales2@, ...)"""
+    names = list(DEMO_DEPARTMENTS.values())
+    return [
+        f"{names[i % len(names)]}{i // len(names) + 1 if i >= len(names) else ''}@vipbusinesscredit.com"
+        for i in range(count)
+    ]
+
+def create_demo_data(email_count=10, mailbox_count=5, seed=0, now=None):
+    """Generate synthetic emails in the typed schema.
+
+    The seed fixes every value drawn, with dates counted back from now, so runs
+    of the same size see the same data. Mailbox volumes are skewed towards the
+    first few inboxes, and every mailbox, priority and status appears when
+    there are enough emails. Received times cluster in business hours over the
+    last DEMO_HISTORY_DAYS and Email IDs increase with them, as in an appended
+    sheet.
+    """
+    rng = np.random.default_rng(seed)
+    now = np.datetime64((now or datetime.now()).replace(microsecond=0), "s")
+    mailboxes = demo_mailboxes(mailbox_count)
+    departments = list(DEMO_DEPARTMENTS)
+    
+    weights = 1 / np.arange(1, mailbox_count + 1) ** 0.8
+    mailbox = rng.choice(mailbox_count, email_count, p=weights / weights.sum())
+    mailbox[:min(email_count, mailbox_count)] = np.arange(min(email_count, mailbox_count))
+    rng.shuffle(mailbox)
+    
+    days_ago = rng.integers(0, DEMO_HISTORY_DAYS, email_count)
+    minutes = np.clip(rng.normal(13 * 60, 150, email_count), 7 * 60, 20 * 60).astype(np.int64)
+    today = now.astype("datetime64[D]")
+    received = np.sort(today - days_ago.astype("timedelta64[D]") + minutes.astype("timedelta64[m]"))
+    received = np.minimum(received, now - np.timedelta64(1, "m")).astype("datetime64[m]")
+    
+    def draw(values, rates):
+        codes = rng.choice(len(values), email_count, p=rates)
+        codes[:min(email_count, len(values))] = np.arange(min(email_count, len(values)))
+        rng.shuffle(codes)
+        return np.array(values, dtype=object)[codes]
+    
+    priority = draw(list(DEMO_RESPONSE_HOURS), DEMO_PRIORITY_RATES)
+    status = draw(["Pending", "In Progress", "Completed"], DEMO_STATUS_RATES)
+    category = np.array(DEMO_CATEGORIES, dtype=object)[rng.integers(0, len(DEMO_CATEGORIES), email_count)]
+    category[(priority == "High") & (rng.random(email_count) < 0.5)] = "Urgent"
+    topic = rng.integers(0, len(DEMO_SUBJECTS), email_count)
+    drafts = np.array([
+        f"Thank you for contacting us regarding '{subject[:30]}...'. We have reviewed your inquiry "
+        "and will provide a comprehensive response within 24 hours."
+        for subject in DEMO_SUBJECTS
+    ], dtype=object)
+    
+    approved = (status == "Completed") | ((status == "In Progress") & (rng.random(email_count) < 0.3))
+    sent = approved & ((status == "Completed") | (rng.random(email_count) < 0.1))
+    hours = pd.Series(priority).map(DEMO_RESPONSE_HOURS).to_numpy(dtype=float)
+    delay = (rng.lognormal(0, 0.8, email_count) * hours * 60).astype(np.int64).astype("timedelta64[m]")
+    sent_at = np.minimum(received + delay, now.astype("datetime64[m]"))
+    attachments = rng.random(email_count) < 0.25
+    follow_up = rng.random(email_count) < 0.3
+    
+    first = rng.integers(0, len(DEMO_FIRST_NAMES), email_count)
+    last = rng.integers(0, len(DEMO_LAST_NAMES), email_count)
+    names = [np.array(pool, dtype=object) for pool in (DEMO_FIRST_NAMES, DEMO_LAST_NAMES)]
+    addresses = [np.array([name.lower() for name in pool], dtype=object) for pool in (DEMO_FIRST_NAMES, DEMO_LAST_NAMES)]
+    company = rng.integers(1, max(email_count // 20, 1) + 1, email_count).astype(str).astype(object)
+    
+    # Format through lookup tables of the few distinct days and the minutes of a day
+    clock = np.array([f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(24 * 60)], dtype=object)
+    
+    def day_text(stamps, offset_days=0):
+        days, inverse = np.unique(stamps.astype("datetime64[D]"), return_inverse=True)
+        return (days + np.timedelta64(offset_days, "D")).astype(str).astype(object)[inverse]
+    
+    def time_text(stamps):
+        return clock[(stamps - stamps.astype("datetime64[D]")).astype(np.int64)]
+    
+    def when(mask, values, other=""):
+        return np.where(mask, values, other)
+    
+    df = pd.DataFrame({
+        "Company Main Email": np.array(mailboxes, dtype=object)[mailbox],
+        "Email ID": "E" + (1001 + np.arange(email_count)).astype(str).astype(object),
+        "Received Date": day_text(received),
+        "Received Time": time_text(received),
+        "From (Sender Name)": names[0][first] + " " + names[1][last],
+        "From (Sender Email)": addresses[0][first] + "." + addresses[1][last] + "@company" + company + ".com",
+        "Subject": np.array(DEMO_SUBJECTS, dtype=object)[topic],
+        "Department": np.array(departments, dtype=object)[mailbox % len(departments)],
+        "Priority": priority,
+        "Category/Tag": category,
+        "Email Summary": np.array(DEMO_SUMMARIES, dtype=object)[topic],
+        "Drafted Response": when(rng.random(email_count) < 0.9, drafts[topic]),
+        "Response Approved (Y/N)": when(approved, "Y", "N"),
+        "Approver Name": when(approved, np.array(DEMO_APPROVERS, dtype=object)[rng.integers(0, len(DEMO_APPROVERS), email_count)]),
+        "Sent (Y/N)": when(sent, "Y", "N"),
+        "Sent Date": when(sent, day_text(sent_at)),
+        "Sent Time": when(sent, time_text(sent_at)),
+        "Sent Email Summary": when(sent, "Professional response sent addressing all customer concerns"),
+        "Attachments Received (Y/N)": when(attachments, "Y", "N"),
+        "Attachment Details": when(attachments, np.array(DEMO_ATTACHMENTS, dtype=object)[rng.integers(0, len(DEMO_ATTACHMENTS), email_count)]),
+        "Follow-up Required (Y/N)": when(follow_up, "Y", "N"),
+        "Follow-up Due Date": when(follow_up, day_text(received, FOLLOW_UP_DAYS)),
+        "Assigned To": "Agent_" + (mailbox * 2 + rng.integers(1, 3, email_count)).astype(str).astype(object),
+        "Resolution Status": status,
+        "Notes/Comments": when(priority == "High", "High priority case - escalate if no response within 24 hours", "Standard processing")
+    }, columns=SHEET_COLUMNS)
+    return normalize_email_frame(df)
+
+SHEETS_SCOPES = ['https://spreadsheets.google.com/feeds',
+                 'https://www.googleapis.com/auth/drive']
+
+# Rows before the high-water mark that are re-read on every incremental sync,
+# so recent edits (status changes, sent flags) are picked up as well as appends
+SYNC_RECHECK_ROWS = 200
+# Edits to older rows are only seen by a full reload, so incremental syncs give
+# way to one after SYNC_FULL_EVERY of them or once the last full reload is
+# SYNC_FULL_MAX_AGE_SECONDS old
+SYNC_FULL_EVERY = 20
+SYNC_FULL_MAX_AGE_SECONDS = 30 * 60
+
+def extract_sheet_id(sheet_url):
+    """Extract the spreadsheet key from a Google Sheets URL (or pass a bare key through)"""
+    if 'docs.google.com/spreadsheets/d/' in sheet_url:
+        return sheet_url.split('/d/')[1].split('/')[0]
+    return sheet_url
+
+# Authorized clients are shared by every session in the process; a client
+# unused for this long is closed, and tokens are refreshed this long before expiry
+CLIENT_IDLE_SECONDS = 30 * 60
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+@st.cache_resource
+def _gspread_client_pool():
+    """Process-wide pool of authorized gspread clients, kept across reruns and sessions"""
+    return {"lock": threading.Lock(), "clients": {}}
+
+def service_account_identity(service_account_info):
+    """(client_email, private_key_id) of a service account, the key its client is pooled under"""
+    return (service_account_info.get("client_email"), service_account_info.get("private_key_id"))
+
+def get_gspread_client(service_account_info):
+    """Return the pooled client entry for a service account, refreshing its token if needed"""
+    key = service_account_identity(service_account_info)
+    pool = _gspread_client_pool()
+    now = time.time()
+    
+    with pool["lock"]:
+        # Evict idle clients and close their HTTP sessions
+        for idle_key, idle_entry in list(pool["clients"].items()):
+            if idle_key != key and now - idle_entry["last_used"] > CLIENT_IDLE_SECONDS:
+                idle_entry["client"].http_client.session.close()
+                del pool["clients"][idle_key]
+        
+        entry = pool["clients"].get(key)
+        if entry is None:
+            creds = Credentials.from_service_account_info(service_account_info, scopes=SHEETS_SCOPES)
+            entry = {
+                "creds": creds,
+                "client": gspread.authorize(creds),
+                "auth_request": Request(),
+                "worksheets": {},
+                "lock": threading.Lock(),
+                "last_used": now
+            }
+            pool["clients"][key] = entry
+        entry["last_used"] = now
+    
+    with entry["lock"]:
+        creds = entry["creds"]
+        utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
+        if not creds.valid or creds.expiry is None or creds.expiry - utc_now < TOKEN_REFRESH_MARGIN:
+            creds.refresh(entry["auth_request"])
+    
+    return entry
+
+# Sheets API quotas in requests per minute, per project and per user (for a
+# service account, per account). Every call takes a token from each bucket and
+# is retried on 429/5xx with full-jitter exponential backoff.
+SHEETS_QUOTAS = {
+    "read": {"project": 300, "user": 60},
+    "write": {"project": 300, "user": 60}
+}
+SHEETS_BURST_SECONDS = 60
+SHEETS_MAX_ATTEMPTS = 5
+SHEETS_BACKOFF_SECONDS = 1.0
+SHEETS_BACKOFF_CAP_SECONDS = 32.0
+SHEETS_MAX_WAIT_SECONDS = 10
+SHEETS_THROTTLE_COOLDOWN_SECONDS = 60
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503}
+
+class SheetsThrottled(Exception):
+    """A Sheets call could not run within its wait budget, or kept getting 429s"""
+
+@st.cache_resource
+def _sheets_quota():
+    """Process-wide token buckets and request counters for the Sheets API"""
+    return {
+        "lock": threading.Lock(),
+        "buckets": {},
+        "metrics": {"requests": 0, "rate_limited": 0, "retries": 0, "throttled": 0, "failures": 0, "waited_seconds": 0.0}
+    }
+
+def _acquire_quota(service_account_info, kind, max_wait):
+    """Take one token from each of the call's quota buckets, sleeping up to max_wait for them"""
+    quota = _sheets_quota()
+    owners = {"project": service_account_info.get("project_id"), "user": service_account_info.get("client_email")}
+    deadline = time.monotonic() + max_wait
+    while True:
+        with quota["lock"]:
+            now = time.monotonic()
+            buckets = []
+            for scope, per_minute in SHEETS_QUOTAS.get(kind, {}).items():
+                bucket = quota["buckets"].get((kind, scope, owners[scope]))
+                if bucket is None:
+                    rate = per_minute / 60
+                    bucket = {"rate": rate, "capacity": rate * SHEETS_BURST_SECONDS, "tokens": rate * SHEETS_BURST_SECONDS, "updated": now}
+                    quota["buckets"][(kind, scope, owners[scope])] = bucket
+                bucket["tokens"] = min(bucket["capacity"], bucket["tokens"] + (now - bucket["updated"]) * bucket["rate"])
+                bucket["updated"] = now
+                buckets.append(bucket)
+            wait = max([(1 - bucket["tokens"]) / bucket["rate"] for bucket in buckets] + [0])
+            if wait <= 0:
+                for bucket in buckets:
+                    bucket["tokens"] -= 1
+                return
+            if now + wait > deadline:
+                quota["metrics"]["throttled"] += 1
+                raise SheetsThrottled(f"Google Sheets {kind} quota used up, next request possible in {wait:.0f}s")
+            quota["metrics"]["waited_seconds"] += wait
+        time.sleep(wait)
+
+def sheets_call(service_account_info, call, kind="read", max_wait=SHEETS_MAX_WAIT_SECONDS):
+    """Run one Sheets API request within the quota budget, retrying rate-limit and transient errors.
+
+    Raises SheetsThrottled when the budget stays empty for max_wait seconds or
+    429s persist through every retry, so callers can fall back to cached data.
+    """
+    quota = _sheets_quota()
+    metrics = quota["metrics"]
+    for attempt in range(SHEETS_MAX_ATTEMPTS):
+        _acquire_quota(service_account_info, kind, max_wait)
+        with quota["lock"]:
+            metrics["requests"] += 1
+        try:
+            return call()
+        except (gspread.exceptions.APIError, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            response = getattr(e, "response", None)
+            status = response.status_code if isinstance(e, gspread.exceptions.APIError) else None
+            if status is not None and status not in RETRYABLE_STATUS_CODES:
+                raise
+            with quota["lock"]:
+                metrics["rate_limited"] += status == 429
+                metrics["failures"] += attempt == SHEETS_MAX_ATTEMPTS - 1
+                metrics["retries"] += attempt < SHEETS_MAX_ATTEMPTS - 1
+            if attempt == SHEETS_MAX_ATTEMPTS - 1:
+                if status == 429:
+                    raise SheetsThrottled("Google Sheets kept answering 429 (rate limited)") from e
+                raise
+            try:
+                delay = float(response.headers.get("Retry-After"))
+            except (AttributeError, TypeError, ValueError):
+                delay = random.uniform(0, min(SHEETS_BACKOFF_CAP_SECONDS, SHEETS_BACKOFF_SECONDS * 2 ** attempt))
+            time.sleep(delay)
+
+def sheets_unreachable(error):
+    """Whether a failed Sheets call means Google could not be reached, as opposed to refusing the request"""
+    if isinstance(error, gspread.exceptions.APIError):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (SheetsThrottled, requests.exceptions.ConnectionError, requests.exceptions.Timeout, TransportError))
+
+def sheets_metrics():
+    """Snapshot of the Sheets request counters (requests, 429s, retries, throttled calls)"""
+    quota = _sheets_quota()
+    with quota["lock"]:
+        return dict(quota["metrics"])
+
+def open_worksheet(service_account_info, sheet_url, worksheet_name="Sheet1"):
+    """Open a worksheet through the pooled client, reusing the handle from earlier opens"""
+    entry = get_gspread_client(service_account_info)
+    handle_key = (extract_sheet_id(sheet_url), worksheet_name)
+    worksheet = entry["worksheets"].get(handle_key)
+    if worksheet is None:
+        sheet = sheets_call(service_account_info, lambda: entry["client"].open_by_key(handle_key[0]))
+        worksheet = sheets_call(service_account_info, lambda: sheet.worksheet(worksheet_name))
+        entry["worksheets"][handle_key] = worksheet
+    return worksheet
+
+def forget_worksheet(service_account_info, sheet_url, worksheet_name="Sheet1"):
+    """Drop a cached worksheet handle, e.g. after it was renamed or deleted"""
+    entry = get_gspread_client(service_account_info)
+    entry["worksheets"].pop((extract_sheet_id(sheet_url), worksheet_name), None)
+
+def values_to_df(header, rows):
+    """Build a dataframe from raw sheet values, padding short rows to the header width"""
+    width = len(header)
+    rows = [(row + [""] * (width - len(row)))[:width] for row in rows]
+    return pd.DataFrame(rows, columns=header)
+
+# Large worksheets are read as row ranges of SYNC_CHUNK_ROWS, SYNC_CHUNK_PARALLEL
+# at a time, instead of one huge request
+SYNC_CHUNK_ROWS = 20000
+SYNC_CHUNK_PARALLEL = 4
+
+def fetch_sheet_rows(service_account_info, worksheet, header, first_row, last_row):
+    """Typed frame of sheet rows first_row..last_row, fetched as parallel row-range chunks.
+
+    Each chunk is its own batch_get (retried on its own by sheets_call) and is
+    decoded into typed columns inside its worker, so raw cell lists never pile
+    up. The API drops trailing blank rows of a range, so chunks are padded back
+    to their full length to keep frame positions aligned with sheet rows.
+    """
+    last_column = gspread.utils.rowcol_to_a1(1, max(len(header), 1)).rstrip("0123456789")
+    
+    def fetch(start):
+        stop = min(start + SYNC_CHUNK_ROWS - 1, last_row)
+        rows = sheets_call(
+            service_account_info,
+            lambda: worksheet.batch_get([f"A{start}:{last_column}{stop}"])[0]
+        )
+        rows = list(rows) + [[]] * (stop - start + 1 - len(rows))
+        return normalize_email_frame(values_to_df(header, rows))
+    
+    starts = list(range(first_row, last_row + 1, SYNC_CHUNK_ROWS))
+    if len(starts) <= 1:
+        return fetch(first_row) if starts else normalize_email_frame(values_to_df(header, []))
+    with ThreadPoolExecutor(max_workers=min(len(starts), SYNC_CHUNK_PARALLEL)) as pool:
+        return concat_email_frames(pool.map(fetch, starts))
+
+@timed("sheets fetch")
+def fetch_worksheet(service_account_info, worksheet):
+    """Return (header, typed frame) for a whole worksheet; large ones are read in chunks"""
+    if getattr(worksheet, "row_count", 0) <= SYNC_CHUNK_ROWS + 1:
+        values = sheets_call(service_account_info, worksheet.get_all_values)
+        header = values[0] if values else []
+        return header, normalize_email_frame(values_to_df(header, values[1:]))
+    
+    header = sheets_call(service_account_info, lambda: worksheet.row_values(1))
+    if "Email ID" not in header:
+        values = sheets_call(service_account_info, worksheet.get_all_values)
+        return header, normalize_email_frame(values_to_df(header, values[1:]))
+    # The Email ID column gives the real row count (the grid is usually larger)
+    ids = sheets_call(service_account_info, lambda: worksheet.col_values(header.index("Email ID") + 1))
+    return header, fetch_sheet_rows(service_account_info, worksheet, header, 2, len(ids))
+
+def full_sync_due(sync_state):
+    """Whether enough incremental syncs or time have passed since the last full reload"""
+    full_synced_at = sync_state.get("full_synced_at")
+    if full_synced_at is None or sync_state.get("incremental_syncs", 0) >= SYNC_FULL_EVERY:
+        return True
+    age = datetime.now() - datetime.fromisoformat(full_synced_at)
+    return age.total_seconds() >= SYNC_FULL_MAX_AGE_SECONDS
+
+@timed("sheets sync")
+def sync_gsheets(service_account_info, sheet_url, worksheet_name="Sheet1", df=None, sync_state=None):
+    """Sync a worksheet into a dataframe, fetching only new and recently edited rows.
+
+    Returns (df, sync_state, error). Without a previous df/sync_state, when
+    the header or the Email ID high-water mark no longer match what was synced
+    last time (rows deleted or reordered), or when a periodic full reload is
+    due (see full_sync_due), the whole worksheet is reloaded.
+    SheetsThrottled and other errors reaching Google (see sheets_unreachable)
+    are raised rather than returned, so callers can keep serving what they
+    already have.
+    """
+    try:
+        worksheet = open_worksheet(service_account_info, sheet_url, worksheet_name)
+        sheet_id = extract_sheet_id(sheet_url)
+        
+        incremental = (
+            df is not None and sync_state is not None and
+            sync_state.get("sheet_id") == sheet_id and
+            sync_state.get("worksheet") == worksheet_name and
+            not full_sync_due(sync_state)
+        )
+        
+        if incremental:
+            header = sheets_call(service_account_info, lambda: worksheet.row_values(1))
+            incremental = header == sync_state["header"] and "Email ID" in header
+        
+        if incremental:
+            synced_rows = sync_state["synced_rows"]
+            email_ids = sheets_call(service_account_info, lambda: worksheet.col_values(header.index("Email ID") + 1))[1:]
+            incremental = len(email_ids) >= synced_rows and (
+                synced_rows == 0 or email_ids[synced_rows - 1] == sync_state["last_email_id"]
+            )
+        
+        if not incremental:
+            header, new_df = fetch_worksheet(service_account_info, worksheet)
+            delta = {"mode": "full", "start": 0, "appended": len(new_df), "changed": len(new_df)}
+        else:
+            # Re-read a short window before the high-water mark plus everything appended after it
+            start = max(synced_rows - SYNC_RECHECK_ROWS, 0)
+            window = fetch_sheet_rows(service_account_info, worksheet, header, start + 2, len(email_ids) + 1)
+            
+            overlap_rows = min(synced_rows - start, len(window))
+            previous = df.iloc[start:start + overlap_rows].reset_index(drop=True).astype(str)
+            overlap = window.iloc[:overlap_rows].reset_index(drop=True).astype(str)
+            changed = int((previous != overlap).any(axis=1).sum())
+            appended = len(window) - overlap_rows
+            
+            if changed == 0 and appended == 0:
+                new_df = df
+            else:
+                new_df = concat_email_frames([df.iloc[:start], window])
+            delta = {"mode": "incremental", "start": start, "appended": appended, "changed": changed}
+        
+        synced_at = datetime.now().isoformat(timespec="seconds")
+        new_state = {
+            "sheet_id": sheet_id,
+            "worksheet": worksheet_name,
+            "header": header,
+            "synced_rows": len(new_df),
+            "last_email_id": str(new_df["Email ID"].iloc[-1]) if len(new_df) and "Email ID" in new_df.columns else None,
+            "synced_at": synced_at,
+            "full_synced_at": synced_at if not incremental else sync_state["full_synced_at"],
+            "incremental_syncs": sync_state["incremental_syncs"] + 1 if incremental else 0,
+            "last_delta": delta
+        }
+        return new_df, new_state, None
+    except Exception as e:
+        if sheets_unreachable(e):
+            raise
+        try:
+            forget_worksheet(service_account_info, sheet_url, worksheet_name)
+        except Exception:
+            pass
+        return None, sync_state, str(e)
+
+# Each sync writes an Arrow IPC snapshot, so a cold process starts from disk and
+# only catches up the delta from the sheet; the newest SNAPSHOT_KEEP are kept
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots")
+SNAPSHOT_KEEP = 3
+
+def _snapshot_folder(key):
+    """Folder holding the snapshots of one (sheet ID, worksheet)"""
+    safe = "__".join(re.sub(r"[^A-Za-z0-9_-]", "_", part) for part in key)
+    return os.path.join(SNAPSHOT_DIR, safe)
+
+def write_snapshot(key, df, sync_state, authorized=()):
+    """Write a frame and its sync state as a new Arrow IPC snapshot, pruning old ones.
+
+    authorized lists the service accounts (see service_account_identity) that
+    read this data from the sheet.
+    """
+    folder = _snapshot_folder(key)
+    os.makedirs(folder, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"sync_state": json.dumps(sync_state).encode("utf-8"),
+        b"authorized": json.dumps(sorted(authorized)).encode("utf-8")
+    })
+    
+    path = os.path.join(folder, f"{time.time_ns()}.arrow")
+    with pa.OSFile(path + ".tmp", "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(path + ".tmp", path)
+    
+    snapshots = sorted(name for name in os.listdir(folder) if name.endswith(".arrow"))
+    for name in snapshots[:-SNAPSHOT_KEEP]:
+        os.remove(os.path.join(folder, name))
+    return path
+
+def load_snapshot(key):
+    """Memory-map the newest snapshot for a key; returns (df, sync_state, authorized) or None"""
+    folder = _snapshot_folder(key)
+    if not os.path.isdir(folder):
+        return None
+    snapshots = sorted(name for name in os.listdir(folder) if name.endswith(".arrow"))
+    if not snapshots:
+        return None
+    
+    source = pa.memory_map(os.path.join(folder, snapshots[-1]), "r")
+    table = pa.ipc.open_file(source).read_all()
+    sync_state = json.loads(table.schema.metadata[b"sync_state"])
+    authorized = {tuple(identity) for identity in json.loads(table.schema.metadata.get(b"authorized", b"[]"))}
+    # Columns backed by the mapped buffers are not copied where pandas can avoid it
+    df = table.to_pandas(split_blocks=True)
+    return df, sync_state, authorized
+
+# Loaded frames are shared by all sessions: one entry per (sheet ID, worksheet),
+# re-synced after the TTL and evicted least-recently-used beyond these bounds
+DATA_CACHE_TTL_SECONDS = 300
+DATA_CACHE_MAX_ENTRIES = 8
+DATA_CACHE_MAX_BYTES = 1024 ** 3
+DEMO_DATA_KEY = ("demo", "demo")
+
+@st.cache_resource
+def _shared_data_cache():
+    """Process-wide cache of loaded email frames, shared by every session"""
+    return {"lock": threading.Lock(), "entries": OrderedDict(), "loading": {}, "key_locks": {}, "next_version": 1}
+
+def _key_lock(cache, key):
+    """Lock held while a new version of a key's entry is derived from the current one and stored"""
+    with cache["lock"]:
+        return cache["key_locks"].setdefault(key, threading.Lock())
+
+def _store_data_entry(cache, key, df, sync_state, base=None, parts=None):
+    """Insert a freshly loaded frame and evict least-recently-used entries over the bounds.
+
+    base optionally links the previous version's derived structures and the
+    first row that changed (None after in-place edits, which list the edited
+    "rows" instead), so they can be extended instead of rebuilt; get_derived drops the link once everything
+    has carried over. parts lays out the source entries a combined
+    frame was built from.
+    """
+    entry = {
+        "key": key,
+        "df": df,
+        "sync_state": sync_state,
+        "version": cache["next_version"],
+        "loaded_at": time.time(),
+        "nbytes": int(df.memory_usage(deep=True).sum()),
+        "derived": {},
+        "base": base,
+        "parts": parts,
+        "throttled": None,
+        "retry_at": 0,
+        "authorized": set(),
+        "lock": threading.Lock()
+    }
+    cache["next_version"] += 1
+    cache["entries"][key] = entry
+    cache["entries"].move_to_end(key)
+    
+    total_bytes = sum(e["nbytes"] for e in cache["entries"].values())
+    while len(cache["entries"]) > 1 and (
+        len(cache["entries"]) > DATA_CACHE_MAX_ENTRIES or total_bytes > DATA_CACHE_MAX_BYTES
+    ):
+        _, evicted = cache["entries"].popitem(last=False)
+        total_bytes -= evicted["nbytes"]
+    return entry
+
+def _forget_snapshot_entry(cache, entry):
+    """Drop an entry restored from a snapshot whose catch-up sync failed"""
+    if cache["entries"].get(entry["key"]) is entry:
+        del cache["entries"][entry["key"]]
+
+def check_sheet_access(entry, service_account_info):
+    """Return (entry, error), handing a shared sheet entry only to accounts that can open the sheet.
+
+    Accounts that synced the entry are trusted until its next sync; any other
+    account is checked once with a metadata request through its pooled client.
+    """
+    identity = service_account_identity(service_account_info or {})
+    if identity in entry["authorized"]:
+        return entry, None
+    try:
+        client = get_gspread_client(service_account_info)["client"]
+        sheets_call(service_account_info, lambda: client.open_by_key(entry["key"][0]))
+    except Exception as e:
+        return None, str(e)
+    entry["authorized"].add(identity)
+    return entry, None
+
+def load_email_data(service_account_info=None, sheet_url=None, worksheet_name="Sheet1",
+                    ttl=DATA_CACHE_TTL_SECONDS, force=False, incremental=True):
+    """Return (entry, error) for the shared frame of a worksheet, or of the demo data.
+
+    The entry dict holds the frame ("df") and its "version"; treat the frame as
+    read-only since other sessions hold the same object. Expired or forced
+    entries are re-synced (incrementally when possible), and concurrent
+    requests for the same key wait for a single fetch instead of starting their own.
+    While Google Sheets is throttling, the cached entry is served as is (with
+    entry["throttled"] set) and re-syncs pause for SHEETS_THROTTLE_COOLDOWN_SECONDS.
+    Sheet entries go only to accounts that can read the sheet (see check_sheet_access).
+    """
+    if sheet_url:
+        key = (extract_sheet_id(sheet_url), worksheet_name)
+    else:
+        key = DEMO_DATA_KEY
+    cache = _shared_data_cache()
+    
+    with cache["lock"]:
+        entry = cache["entries"].get(key)
+        fresh = entry is not None and not force and (
+            time.time() - entry["loaded_at"] < ttl or time.time() < entry["retry_at"]
+        )
+        if fresh:
+            cache["entries"].move_to_end(key)
+        else:
+            pending = cache["loading"].get(key)
+            leader = pending is None
+            if leader:
+                pending = {"done": threading.Event(), "result": (entry, None)}
+                cache["loading"][key] = pending
+    
+    if fresh or not leader:
+        error = None
+        if not fresh:
+            pending["done"].wait()
+            entry, error = pending["result"]
+        if entry is None or key == DEMO_DATA_KEY:
+            return entry, error
+        entry, access_error = check_sheet_access(entry, service_account_info)
+        return entry, access_error or error
+    
+    identity = service_account_identity(service_account_info or {})
+    result = (None, "Load was interrupted")
+    from_snapshot = False
+    new_version = False
+    try:
+        if key == DEMO_DATA_KEY:
+            df, sync_state, error = create_demo_data(), None, None
+        else:
+            if entry is None:
+                # Cold start: begin from the newest snapshot and only catch up the delta
+                snapshot = load_snapshot(key)
+                if snapshot is not None:
+                    df, sync_state, authorized = snapshot
+                    with cache["lock"]:
+                        entry = _store_data_entry(cache, key, df, sync_state)
+                        entry["authorized"] = authorized
+                    from_snapshot = True
+            df, sync_state, error = sync_gsheets(
+                service_account_info,
+                sheet_url,
+                worksheet_name,
+                entry["df"] if entry is not None and incremental else None,
+                entry["sync_state"] if entry is not None and incremental else None
+            )
+        
+        with _key_lock(cache, key), cache["lock"]:
+            if error is not None:
+                result = (None, error)
+            elif entry is not None and df is entry["df"]:
+                # Nothing changed upstream: keep the version (or the one edits made
+                # meanwhile), just restart the TTL (and the access checks of other accounts)
+                current = cache["entries"].get(key, entry)
+                current["loaded_at"] = time.time()
+                current["sync_state"] = sync_state
+                current["throttled"] = None
+                current["authorized"] = {identity}
+                result = (current, None)
+            else:
+                # Edits not yet written back would otherwise flicker back to the sheet's values
+                queued = pending_edits(key)
+                if queued:
+                    df = apply_email_edits(df, queued)
+                base = None
+                if entry is not None and sync_state and sync_state["last_delta"]["mode"] == "incremental":
+                    base = {"derived": entry["derived"], "start": sync_state["last_delta"]["start"]}
+                entry = _store_data_entry(cache, key, df, sync_state, base)
+                entry["authorized"].add(identity)
+                result = (entry, None)
+                new_version = True
+        
+        if new_version and key != DEMO_DATA_KEY:
+            try:
+                write_snapshot(key, df, sync_state, entry["authorized"])
+            except OSError:
+                pass
+    except SheetsThrottled as e:
+        if entry is not None and identity in entry["authorized"]:
+            # Serve the stale frame and back off instead of failing the page
+            entry["throttled"] = str(e)
+            entry["retry_at"] = time.time() + SHEETS_THROTTLE_COOLDOWN_SECONDS
+            result = (entry, None)
+        else:
+            result = (None, str(e))
+    except Exception as e:
+        if from_snapshot and sheets_unreachable(e) and identity in entry["authorized"]:
+            # A restored snapshot is still worth showing while the sheet is unreachable,
+            # but only to an account that read the sheet before
+            result = (entry, str(e))
+        else:
+            result = (None, str(e))
+    finally:
+        with cache["lock"]:
+            if from_snapshot and result[0] is None:
+                # Nobody should be served the restored snapshot as if it were fresh
+                _forget_snapshot_entry(cache, entry)
+            del cache["loading"][key]
+        pending["result"] = result
+        pending["done"].set()
+    
+    return result
+
+@timed("csv load")
+def load_csv_data(file_bytes):
+    """Return (entry, error) for an uploaded CSV in the sheet layout, parsed once per distinct file"""
+    key = ("csv", hashlib.sha1(file_bytes).hexdigest())
+    cache = _shared_data_cache()
+    with cache["lock"]:
+        entry = cache["entries"].get(key)
+        if entry is not None:
+            cache["entries"].move_to_end(key)
+            return entry, None
+    
+    try:
+        raw = pd.read_csv(io.BytesIO(file_bytes), dtype=str, keep_default_na=False)
+    except (ValueError, UnicodeDecodeError) as e:
+        return None, str(e)
+    missing = [column for column in SHEET_COLUMNS if column not in raw.columns]
+    if missing:
+        return None, f"CSV is missing columns: {', '.join(missing)}"
+    with cache["lock"]:
+        return _store_data_entry(cache, key, normalize_email_frame(raw), None), None
+
+# Several (sheet URL, worksheet) sources, e.g. one worksheet per mailbox, are
+# loaded concurrently and combined into one shared entry
+SHEETS_MAX_PARALLEL = 8
+
+def parse_sheet_sources(sheet_url, worksheet_name, extra=""):
+    """Sources from the main sheet inputs plus one per extra line ("worksheet" or "sheet URL | worksheet")"""
+    sources = [{"sheet_url": sheet_url, "worksheet_name": worksheet_name}]
+    for line in extra.splitlines():
+        if not line.strip():
+            continue
+        url, _, name = line.rpartition("|")
+        source = {"sheet_url": url.strip() or sheet_url, "worksheet_name": name.strip() or "Sheet1"}
+        if source not in sources:
+            sources.append(source)
+    return sources
+
+def sheet_source_label(source):
+    """Short name of a source for messages"""
+    return f"{source['worksheet_name']} ({extract_sheet_id(source['sheet_url'])})"
+
+def load_sheet_sources(service_account_info, sources, ttl=DATA_CACHE_TTL_SECONDS, force=False, incremental=True):
+    """Return (entry, errors) for one or more worksheet sources, fetched in parallel.
+
+    Each source is loaded (and cached, synced, snapshotted) on its own through
+    load_email_data, so a failing source only shows up in errors, keyed by
+    label, while the others are still combined. Sources whose columns differ
+    from the first loaded one are left out. The combined entry lists its
+    "parts" and is rebuilt only when one of their versions changes.
+    """
+    def load(source):
+        return load_email_data(
+            service_account_info, source["sheet_url"], source["worksheet_name"],
+            ttl=ttl, force=force, incremental=incremental
+        )
+    
+    if len(sources) == 1:
+        entry, error = load(sources[0])
+        return entry, {sheet_source_label(sources[0]): error} if error else {}
+    
+    # Loads touch only process-wide stores (st.cache_resource works from any
+    # thread), so pool threads run without a script context, like the refresh
+    # and write-back threads
+    with ThreadPoolExecutor(max_workers=min(len(sources), SHEETS_MAX_PARALLEL)) as pool:
+        results = list(pool.map(load, sources))
+    
+    parts, errors, reference = [], {}, None
+    for source, (entry, error) in zip(sources, results):
+        label = sheet_source_label(source)
+        if error:
+            errors[label] = error
+        if entry is None:
+            continue
+        columns = entry["df"].columns
+        if reference is None:
+            reference = columns
+        elif set(columns) != set(reference):
+            missing = [column for column in reference if column not in columns]
+            extra = [column for column in columns if column not in reference]
+            errors[label] = f"Columns differ from the first source (missing: {missing}, unexpected: {extra})"
+            continue
+        parts.append(entry)
+    if not parts:
+        return None, errors
+    
+    key = ("combined",) + tuple(part["key"] for part in parts)
+    versions = [part["version"] for part in parts]
+    throttled = next((part["throttled"] for part in parts if part["throttled"]), None)
+    cache = _shared_data_cache()
+    with cache["lock"]:
+        combined = cache["entries"].get(key)
+        if combined is not None and [part["version"] for part in combined["parts"]] == versions:
+            cache["entries"].move_to_end(key)
+            combined["throttled"] = throttled
+            return combined, errors
+    
+    df = concat_email_frames([
+        part["df"] if part["df"].columns.equals(reference) else part["df"][list(reference)]
+        for part in parts
+    ])
+    layout, start = [], 0
+    for part in parts:
+        layout.append({"key": part["key"], "version": part["version"], "start": start, "stop": start + len(part["df"])})
+        start += len(part["df"])
+    
+    # Rows of the parts before the first changed one are unchanged, so derived
+    # structures can be extended from there
+    base = None
+    if combined is not None:
+        previous = combined["parts"]
+        for old, new in zip(previous, layout):
+            if old["key"] != new["key"] or old["version"] != new["version"] or old["start"] != new["start"]:
+                base = {"derived": combined["derived"], "start": min(old["start"], new["start"])}
+                break
+        else:
+            if len(previous) != len(layout):
+                base = {"derived": combined["derived"], "start": min(previous[-1]["stop"], layout[-1]["stop"])}
+    with cache["lock"]:
+        combined = _store_data_entry(cache, key, df, None, base, parts=layout)
+        combined["throttled"] = throttled
+    return combined, errors
+
+def get_derived(entry, name, build, extend=None, patch=None):
+    """Return a structure derived from an entry's frame, built once per data version.
+
+    When the entry came from an incremental sync and the previous version had
+    already built it, extend(previous, df, start) updates it for rows from
+    start onwards instead of rebuilding from scratch. After edits to known
+    rows, patch(previous, df, rows) updates it for just those rows. Structures
+    named in the base's "reuse" set (after edits to columns they do not read)
+    are kept as is. Each structure has its own lock, so a slow build does not
+    hold up the others.
+    """
+    derived = entry["derived"]
+    if name not in derived:
+        with entry["lock"]:
+            lock = entry.setdefault("derived_locks", {}).setdefault(name, threading.Lock())
+        with lock:
+            if name not in derived:
+                base = entry["base"]
+                if base is not None and name in base.get("reuse", ()) and name in base["derived"]:
+                    derived[name] = base["derived"][name]
+                elif extend is not None and base is not None and base["start"] is not None and name in base["derived"]:
+                    derived[name] = extend(base["derived"][name], entry["df"], base["start"])
+                elif patch is not None and base is not None and base.get("rows") is not None and name in base["derived"]:
+                    derived[name] = patch(base["derived"][name], entry["df"], base["rows"])
+                else:
+                    derived[name] = build(entry["df"])
+        with entry["lock"]:
+            # Let the previous version go once everything it had is carried over
+            base = entry["base"]
+            if base is not None and base["derived"].keys() <= derived.keys():
+                entry["base"] = None
+    return derived[name]
+
+def memoized(entry, name, key, size, compute):
+    """compute() kept per data version in the derived LRU name, for the size most recent keys"""
+    memo = get_derived(entry, name, lambda df: OrderedDict())
+    with entry["lock"]:
+        if key in memo:
+            memo.move_to_end(key)
+            return memo[key]
+    value = compute()
+    with entry["lock"]:
+        memo[key] = value
+        while len(memo) > size:
+            memo.popitem(last=False)
+    return value
+
+# Columns behind the mailbox / priority / status / department filters
+FILTER_COLUMNS = ["Company Main Email", "Priority", "Resolution Status", "Department"]
+
+def build_filter_index(df):
+    """Map every value of the filter columns to the sorted row positions holding it"""
+    index = {}
+    for col in FILTER_COLUMNS:
+        values = df[col] if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].astype("category")
+        codes = values.cat.codes.to_numpy()
+        # A stable argsort groups positions by value while keeping each group in row order
+        order = np.argsort(codes, kind="stable").astype(np.int64)
+        bounds = np.searchsorted(codes[order], np.arange(len(values.cat.categories) + 1))
+        index[col] = {
+            category: order[bounds[i]:bounds[i + 1]]
+            for i, category in enumerate(values.cat.categories)
+            if bounds[i + 1] > bounds[i]
+        }
+    return index
+
+def filter_positions(filter_index, selections):
+    """Intersect the position sets of the selected values per column.
+
+    selections maps a filter column to its accepted values; empty selections
+    are ignored. Returns sorted row positions, or None when nothing is filtered.
+    """
+    result = None
+    for col, values in selections.items():
+        if not values:
+            continue
+        parts = [filter_index[col].get(value, np.empty(0, dtype=np.int64)) for value in values]
+        positions = parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+        result = positions if result is None else np.intersect1d(result, positions, assume_unique=True)
+    return result
+
+# Aggregates behind the metric cards, charts, mailbox headers and analytics report
+AGGREGATE_COLUMNS = {
+    "by_priority": "Priority",
+    "by_status": "Resolution Status",
+    "by_department": "Department",
+    "by_mailbox": "Company Main Email"
+}
+AGGREGATE_PAIRS = {
+    "department_status": ("Department", "Resolution Status"),
+    "mailbox_status": ("Company Main Email", "Resolution Status"),
+    "mailbox_priority": ("Company Main Email", "Priority")
+}
+# Filter states whose aggregates are memoized per data version
+AGGREGATE_MEMO_SIZE = 64
+
+def _code_counts(codes, categories):
+    """Count categorical codes, returning {value: count} for values that occur"""
+    counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+    return {categories[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+
+def count_rows(df, rows):
+    """Count one block of rows (a slice or position array) for every aggregate in one pass"""
+    codes = {col: df[col].cat.codes.to_numpy()[rows] for col in set(AGGREGATE_COLUMNS.values())}
+    categories = {col: df[col].cat.categories for col in codes}
+    counts = {"total": len(codes["Priority"])}
+    
+    for name, col in AGGREGATE_COLUMNS.items():
+        counts[name] = _code_counts(codes[col], categories[col])
+    
+    for name, (first, second) in AGGREGATE_PAIRS.items():
+        width = len(categories[second])
+        valid = (codes[first] >= 0) & (codes[second] >= 0)
+        combined = _code_counts(codes[first][valid] * width + codes[second][valid], range(len(categories[first]) * width))
+        counts[name] = {
+            (categories[first][code // width], categories[second][code % width]): count
+            for code, count in combined.items()
+        }
+    
+    days = df[RECEIVED_AT].to_numpy()[rows].astype("datetime64[D]")
+    day_values, day_counts = np.unique(days[~np.isnat(days)], return_counts=True)
+    counts["daily"] = dict(zip(day_values.tolist(), day_counts.tolist()))
+    counts["sent"] = int(df["Sent (Y/N)"].to_numpy()[rows].sum())
+    return counts
+
+def merge_counts(left, right):
+    """Add two count blocks together"""
+    merged = {}
+    for name, value in left.items():
+        if isinstance(value, dict):
+            combined = dict(value)
+            for key, count in right[name].items():
+                combined[key] = combined.get(key, 0) + count
+            merged[name] = combined
+        else:
+            merged[name] = value + right[name]
+    return merged
+
+def build_aggregates(df):
+    """Count the whole frame, keeping the rows an incremental sync may re-read as a separate block"""
+    split = max(len(df) - SYNC_RECHECK_ROWS, 0)
+    head = count_rows(df, slice(0, split))
+    return {"head": head, "split": split, "total": merge_counts(head, count_rows(df, slice(split, None)))}
+
+def extend_aggregates(aggregates, df, start):
+    """Update whole-frame counts after a sync that replaced rows from start onwards.
+
+    Rows before start are unchanged, so only the re-read and appended rows are counted.
+    """
+    if start != aggregates["split"]:
+        return build_aggregates(df)
+    split = max(len(df) - SYNC_RECHECK_ROWS, start)
+    head = merge_counts(aggregates["head"], count_rows(df, slice(start, split)))
+    return {"head": head, "split": split, "total": merge_counts(head, count_rows(df, slice(split, None)))}
+
+def get_aggregates(entry, filter_state=None, positions=None):
+    """Return the counts for a data version and filter state, memoized per (version, filter state)"""
+    if positions is None:
+        return get_derived(entry, "aggregates", build_aggregates, extend_aggregates)["total"]
+    
+    memo = get_derived(entry, "aggregate_memo", lambda df: OrderedDict())
+    with entry["lock"]:
+        counts = memo.get(filter_state)
+        if counts is not None:
+            memo.move_to_end(filter_state)
+            return counts
+    counts = count_rows(entry["df"], positions)
+    with entry["lock"]:
+        memo[filter_state] = counts
+        while len(memo) > AGGREGATE_MEMO_SIZE:
+            memo.popitem(last=False)
+    return counts
+
+# Response times and SLAs: hours from Received to Sent per email, against a
+# reply target per priority. Replies not sent within the target and open
+# follow-ups past their due date count as breaches.
+SLA_TARGET_HOURS = {"High": 4, "Medium": 24, "Low": 72}
+SLA_DEFAULT_TARGET_HOURS = 24
+SLA_GROUPS = {
+    "Mailbox": "Company Main Email",
+    "Department": "Department",
+    "Assignee": "Assigned To",
+    "Priority": "Priority"
+}
+SLA_QUANTILES = [0.5, 0.9, 0.95]
+RESPONSE_TIME_BINS = [0, 1, 2, 4, 8, 12, 24, 48, 72, 168]
+SLA_COLUMNS = [
+    "Company Main Email", "Department", "Assigned To", "Priority", "Resolution Status", RECEIVED_AT,
+    "Sent (Y/N)", "Sent Date", "Sent Time", "Follow-up Required (Y/N)", "Follow-up Due Date"
+]
+
+def parse_repeated_datetimes(dates, times=None):
+    """parse_sheet_datetimes for long columns with few distinct values: each distinct (date, time) is parsed once"""
+    # Factorize codes shifted by one, so code 0 is a missing cell (parsed as "")
+    date_codes, date_values = pd.factorize(dates)
+    codes = date_codes.astype(np.int64) + 1
+    width = 1
+    if times is not None:
+        time_codes, time_values = pd.factorize(times)
+        width = len(time_values) + 1
+        codes = codes * width + time_codes + 1
+    size = (len(date_values) + 1) * width
+    if size <= 4 * len(codes) + 1024:
+        # Dense code space: find the distinct pairs without sorting
+        present = np.zeros(size, dtype=bool)
+        present[codes] = True
+        pairs = np.flatnonzero(present)
+        rank = np.cumsum(present) - 1
+        inverse = rank[codes]
+    else:
+        pairs, inverse = np.unique(codes, return_inverse=True)
+    
+    def text(values, part):
+        return pd.Series(np.append(np.asarray(values, dtype=object), "")[part - 1], dtype=object)
+    parsed = parse_sheet_datetimes(
+        text(date_values, pairs // width), None if times is None else text(time_values, pairs % width)
+    )
+    return pd.Series(parsed.to_numpy()[inverse], index=dates.index)
+
+def build_response_times(df):
+    """Per-row inputs of the SLA report: response hours (NaN when unanswered or untimed), reply deadlines and due dates"""
+    sent_at = parse_repeated_datetimes(df["Sent Date"], df["Sent Time"])
+    hours = ((sent_at - df[RECEIVED_AT]).dt.total_seconds() / 3600).to_numpy(dtype=float, na_value=np.nan)
+    hours = np.where(hours < 0, np.nan, hours)
+    target_by_code = np.array([
+        SLA_TARGET_HOURS.get(priority, SLA_DEFAULT_TARGET_HOURS) for priority in df["Priority"].cat.categories
+    ] + [SLA_DEFAULT_TARGET_HOURS], dtype=float)
+    target = target_by_code[df["Priority"].cat.codes.to_numpy()]
+    responded = np.flatnonzero(~np.isnan(hours))
+    received = df[RECEIVED_AT].to_numpy()
+    sent = df["Sent (Y/N)"].to_numpy()
+    open_follow_up = df["Follow-up Required (Y/N)"].to_numpy() & (df["Resolution Status"] != "Completed").to_numpy()
+    due = parse_repeated_datetimes(df["Follow-up Due Date"]).to_numpy().astype("datetime64[D]")
+    
+    # Responded rows, fastest first, and per group column also grouped by value,
+    # so percentiles only pick offsets out of them
+    by_hours = responded[np.argsort(hours[responded], kind="stable")]
+    groups = {}
+    for column in SLA_GROUPS.values():
+        codes = df[column].cat.codes.to_numpy().astype(np.int32)
+        categories = df[column].cat.categories
+        # Missing values get their own last code
+        codes = np.where(codes < 0, np.int32(len(categories)), codes)
+        grouped = by_hours[np.argsort(codes[by_hours], kind="stable")]
+        groups[column] = {
+            "codes": codes,
+            "labels": list(categories.astype(str)) + ["(none)"],
+            "rows": grouped,
+            "grouped_codes": codes[grouped],
+            "grouped_hours": hours[grouped]
+        }
+    return {
+        "hours": hours,
+        "by_hours": by_hours,
+        "breached": hours > target,
+        # Unsent emails are overdue once the clock passes their deadline (NaT never does)
+        "reply_deadline": np.where(sent, np.datetime64("NaT"), received + (target * 3600e6).astype("timedelta64[us]")),
+        "follow_up_due": np.where(open_follow_up, due, np.datetime64("NaT")),
+        "groups": groups
+    }
+
+def _group_quantiles(codes, values, group_count, quantiles):
+    """Linearly interpolated quantiles per group code of values sorted by (code, value), NaN for empty groups"""
+    sizes = np.bincount(codes, minlength=group_count)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    result = {}
+    for q in quantiles:
+        position = q * np.maximum(sizes - 1, 0)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        if len(values):
+            below = values[np.minimum(starts + low, len(values) - 1)]
+            above = values[np.minimum(starts + high, len(values) - 1)]
+            result[q] = np.where(sizes > 0, below + (above - below) * (position - low), np.nan)
+        else:
+            result[q] = np.full(group_count, np.nan)
+    return result, sizes
+
+def sla_report(response_times, positions=None, now=None):
+    """Response-time percentiles, SLA breaches and overdue follow-ups, overall and per SLA_GROUPS column.
+
+    positions limits the report to a filtered view (None for every row).
+    """
+    now = np.datetime64(now or datetime.now(), "us")
+    hours = response_times["hours"]
+    rows = slice(None) if positions is None else positions
+    selected = None
+    if positions is not None:
+        selected = np.zeros(len(hours), dtype=bool)
+        selected[positions] = True
+    by_hours = response_times["by_hours"]
+    values = hours[by_hours if selected is None else by_hours[selected[by_hours]]]
+    
+    # One bit per kind of breach, so a single bincount per group counts them all
+    flags = response_times["breached"][rows].astype(np.int32)
+    flags |= (response_times["reply_deadline"][rows] < now) << 1
+    flags |= (response_times["follow_up_due"][rows] < now.astype("datetime64[D]")) << 2
+    flag_counts = np.bincount(flags, minlength=8)
+    
+    counts, _ = np.histogram(values, bins=RESPONSE_TIME_BINS + [np.inf])
+    labels = [f"{low}-{high}h" for low, high in zip(RESPONSE_TIME_BINS, RESPONSE_TIME_BINS[1:])] + [f"{RESPONSE_TIME_BINS[-1]}h+"]
+    report = {
+        "emails": len(flags),
+        "responded": len(values),
+        "quantiles": {q: float(np.quantile(values, q)) if len(values) else None for q in SLA_QUANTILES},
+        "breached": int(flag_counts[1::2].sum()),
+        "overdue_replies": int(flag_counts[[2, 3, 6, 7]].sum()),
+        "overdue_follow_ups": int(flag_counts[4:].sum()),
+        "histogram": dict(zip(labels, counts.tolist())),
+        "groups": {}
+    }
+    
+    for name, column in SLA_GROUPS.items():
+        group = response_times["groups"][column]
+        group_count = len(group["labels"])
+        codes, group_hours = group["grouped_codes"], group["grouped_hours"]
+        if selected is not None:
+            responded = selected[group["rows"]]
+            codes, group_hours = codes[responded], group_hours[responded]
+        quantiles, sizes = _group_quantiles(codes, group_hours, group_count, SLA_QUANTILES)
+        by_flags = np.bincount(group["codes"][rows] * 8 + flags, minlength=group_count * 8).reshape(group_count, 8)
+        table = pd.DataFrame({
+            name: group["labels"],
+            "Emails": by_flags.sum(axis=1),
+            "Responded": sizes,
+            **{f"p{round(q * 100)} (h)": quantiles[q] for q in SLA_QUANTILES},
+            "Breached": by_flags[:, 1::2].sum(axis=1),
+            "Overdue replies": by_flags[:, [2, 3, 6, 7]].sum(axis=1),
+            "Overdue follow-ups": by_flags[:, 4:].sum(axis=1)
+        })
+        report["groups"][name] = table[table["Emails"] > 0].reset_index(drop=True)
+    return report
+
+def get_sla_report(entry, filter_state=None, positions=None):
+    """SLA report for a data version and filter state, memoized per minute (overdue counts follow the clock)"""
+    now = datetime.now().replace(second=0, microsecond=0)
+    memo = get_derived(entry, "sla_memo", lambda df: OrderedDict())
+    key = (filter_state, now)
+    with entry["lock"]:
+        report = memo.get(key)
+        if report is not None:
+            memo.move_to_end(key)
+            return report
+    report = sla_report(get_derived(entry, "response_times", build_response_times), positions, now)
+    with entry["lock"]:
+        memo[key] = report
+        while len(memo) > AGGREGATE_MEMO_SIZE:
+            memo.popitem(last=False)
+    return report
+
+# Full-text search: an inverted index over these columns, with per-field weights
+SEARCH_FIELDS = {"Subject": 3.0, "Email Summary": 2.0, "Drafted Response": 1.0, "Notes/Comments": 1.0}
+# Words are runs of Unicode letters and digits in casefolded text
+SEARCH_TOKEN_PATTERN = re.compile(r"\w+")
+# Words that only start with a query term score this fraction of a whole-word match
+SEARCH_PREFIX_WEIGHT = 0.5
+# Shorter terms match whole words only: as prefixes they would match most rows
+SEARCH_MIN_PREFIX = 3
+# Incremental syncs add a segment per sync; past this many the index is rebuilt
+SEARCH_MAX_SEGMENTS = 8
+# Results kept per data version, so paging through them does not search again
+SEARCH_MEMO_SIZE = 8
+# Edited rows are re-indexed in a patch segment; past this fraction of the rows
+# the index is rebuilt instead
+SEARCH_MAX_PATCHED = 0.05
+
+def search_terms(query):
+    """Distinct words of a search query, casefolded like the indexed text"""
+    return tuple(dict.fromkeys(SEARCH_TOKEN_PATTERN.findall(query.casefold())))
+
+def _build_search_segment(df, start=0, positions=None):
+    """Index rows start.. (or the sorted positions) of df: a sorted vocabulary with (row, weight) postings per word"""
+    rows = df.iloc[start:] if positions is None else df.iloc[positions]
+    row_numbers = np.arange(start, start + len(rows), dtype=np.int64) if positions is None else positions
+    tokens, token_rows, token_weights = [], [], []
+    for col, weight in SEARCH_FIELDS.items():
+        if col not in rows.columns:
+            continue
+        # Tokenize each distinct text once; templated drafts and notes repeat a lot
+        text_codes, texts = pd.factorize(rows[col].astype(str))
+        words = pd.Series(texts).str.casefold().str.findall(SEARCH_TOKEN_PATTERN)
+        counts = words.str.len().to_numpy(dtype=np.int64)
+        flat_words = words.explode().dropna().to_numpy(dtype=object)
+        firsts = np.cumsum(counts) - counts
+        
+        # Expand back to one entry per (row, word)
+        row_counts = counts[text_codes]
+        within = np.arange(row_counts.sum()) - np.repeat(np.cumsum(row_counts) - row_counts, row_counts)
+        tokens.append(flat_words[np.repeat(firsts[text_codes], row_counts) + within])
+        token_rows.append(np.repeat(row_numbers, row_counts))
+        token_weights.append(np.full(len(within), weight, dtype=np.float32))
+    
+    tokens = np.concatenate(tokens) if tokens else np.empty(0, dtype=object)
+    token_rows = np.concatenate(token_rows) if token_rows else np.empty(0, dtype=np.int64)
+    token_weights = np.concatenate(token_weights) if token_weights else np.empty(0, dtype=np.float32)
+    
+    # Number words in sorted order so every prefix maps to one contiguous vocabulary range
+    codes, vocab = pd.factorize(tokens)
+    vocab = np.asarray(vocab, dtype=object)
+    vocab_order = np.argsort(vocab)
+    rank = np.empty_like(vocab_order)
+    rank[vocab_order] = np.arange(len(vocab_order))
+    codes, vocab = rank[codes], vocab[vocab_order]
+    
+    # Sort postings by (word, row) and merge repeats into one summed-weight posting
+    order = np.lexsort((token_rows, codes))
+    codes, token_rows, token_weights = codes[order], token_rows[order], token_weights[order]
+    if len(codes):
+        first = np.ones(len(codes), dtype=bool)
+        first[1:] = (codes[1:] != codes[:-1]) | (token_rows[1:] != token_rows[:-1])
+        starts = np.flatnonzero(first)
+        token_weights = np.add.reduceat(token_weights, starts)
+        codes, token_rows = codes[starts], token_rows[starts]
+    
+    return {
+        "vocab": vocab,
+        "offsets": np.searchsorted(codes, np.arange(len(vocab) + 1)),
+        "rows": token_rows,
+        "weights": token_weights,
+        "row_start": start if positions is None else int(positions[0]),
+        "row_end": start + len(rows) if positions is None else int(positions[-1]) + 1,
+        "row_limit": len(df),
+        "dead": None
+    }
+
+def build_search_index(df):
+    """Build the inverted full-text index for a frame"""
+    return {"segments": [_build_search_segment(df)], "doc_count": len(df), "patched": np.empty(0, dtype=np.int64)}
+
+def extend_search_index(index, df, start):
+    """Update an index after a sync that replaced rows from start onwards"""
+    segments = [
+        dict(segment, row_limit=min(segment["row_limit"], start))
+        for segment in index["segments"] if segment["row_start"] < start
+    ]
+    if len(segments) >= SEARCH_MAX_SEGMENTS:
+        return build_search_index(df)
+    segments.append(_build_search_segment(df, start))
+    return {"segments": segments, "doc_count": len(df), "patched": index["patched"][index["patched"] < start]}
+
+def patch_search_index(index, df, rows):
+    """Update an index after edits to the given rows, re-indexing every row edited so far in one patch segment"""
+    patched = np.union1d(index["patched"], np.asarray(rows, dtype=np.int64))
+    if len(patched) == 0:
+        return index
+    if len(patched) > len(df) * SEARCH_MAX_PATCHED:
+        return build_search_index(df)
+    # Older segments skip the patched rows; the patch segment holds their current text
+    dead = np.zeros(len(df), dtype=bool)
+    dead[patched] = True
+    segments = [dict(segment, dead=dead) for segment in index["segments"] if not segment.get("patch")]
+    segments.append(dict(_build_search_segment(df, positions=patched), patch=True))
+    return {"segments": segments, "doc_count": len(df), "patched": patched}
+
+def _term_postings(index, term):
+    """Collect (rows, weights) for every indexed word starting with term"""
+    rows, weights = [], []
+    for segment in index["segments"]:
+        vocab, offsets = segment["vocab"], segment["offsets"]
+        lo = np.searchsorted(vocab, term, side="left")
+        if len(term) >= SEARCH_MIN_PREFIX:
+            hi = np.searchsorted(vocab, term + "\U0010ffff", side="left")
+        else:
+            hi = lo + int(lo < len(vocab) and vocab[lo] == term)
+        if lo == hi:
+            continue
+        segment_rows = segment["rows"][offsets[lo]:offsets[hi]]
+        segment_weights = segment["weights"][offsets[lo]:offsets[hi]] * SEARCH_PREFIX_WEIGHT
+        if vocab[lo] == term:
+            segment_weights[:offsets[lo + 1] - offsets[lo]] /= SEARCH_PREFIX_WEIGHT
+        if segment["row_limit"] < segment["row_end"]:
+            valid = segment_rows < segment["row_limit"]
+            segment_rows, segment_weights = segment_rows[valid], segment_weights[valid]
+        if segment["dead"] is not None:
+            live = ~segment["dead"][segment_rows]
+            segment_rows, segment_weights = segment_rows[live], segment_weights[live]
+        rows.append(segment_rows)
+        weights.append(segment_weights)
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    return np.concatenate(rows), np.concatenate(weights)
+
+def search_emails(index, query, positions=None):
+    """Return (row positions, scores) of rows matching every query term, best match first.
+
+    Each term of SEARCH_MIN_PREFIX or more characters matches any word it is a
+    prefix of; shorter terms match whole words. Scores weight whole-word and
+    Subject matches higher and rare words above common ones. positions
+    optionally restricts the results to a filtered set of rows.
+    """
+    terms = search_terms(query)
+    doc_count = index["doc_count"]
+    if not terms:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    
+    # Accumulate per-row scores densely; merging sorted postings costs more on broad terms
+    matched = np.ones(doc_count, dtype=bool)
+    if positions is not None:
+        matched[:] = False
+        matched[positions] = True
+    scores = np.zeros(doc_count)
+    for term in terms:
+        rows, weights = _term_postings(index, term)
+        term_scores = np.bincount(rows, weights=weights, minlength=doc_count)
+        term_rows = term_scores > 0
+        term_count = np.count_nonzero(term_rows)
+        if term_count == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        matched &= term_rows
+        scores += term_scores * np.log1p(doc_count / term_count)
+    
+    result_rows = np.flatnonzero(matched)
+    scores = scores[result_rows]
+    order = _rank_descending(scores)
+    return result_rows[order], scores[order]
+
+def _rank_descending(scores):
+    """Stable descending argsort; scores take few distinct values, so sort their ranks as 16-bit codes"""
+    codes, distinct = pd.factorize(scores)
+    if len(distinct) > np.iinfo(np.uint16).max:
+        return np.argsort(-scores, kind="stable")
+    ranks = np.empty(len(distinct), dtype=np.uint16)
+    ranks[np.argsort(-distinct, kind="stable")] = np.arange(len(distinct))
+    # Stable sorts of 16-bit integers are radix sorts
+    return np.argsort(ranks[codes], kind="stable")
+
+def get_search_index(entry):
+    """The entry's search index, extended after syncs and patched after edits rather than rebuilt"""
+    return get_derived(entry, "search_index", build_search_index, extend_search_index, patch_search_index)
+
+def get_search_results(entry, query, filter_state=None, positions=None):
+    """search_emails over an entry for a filter state, memoized per query"""
+    terms = search_terms(query)
+    return memoized(
+        entry, "search_memo", (filter_state, terms), SEARCH_MEMO_SIZE,
+        lambda: search_emails(get_search_index(entry), query, positions)
+    )
+
+def prepare_search_index(entry):
+    """Start building an entry's search index in the background, so the first search finds it ready"""
+    with entry["lock"]:
+        if entry.get("search_started") or "search_index" in entry["derived"]:
+            return
+        entry["search_started"] = True
+    threading.Thread(target=get_search_index, args=(entry,), daemon=True, name="search-index").start()
+
+def peek_email_data(key):
+    """Return the current shared entry for a key without loading or re-syncing it"""
+    cache = _shared_data_cache()
+    with cache["lock"]:
+        return cache["entries"].get(key)
+
+# Background refresh: one polling worker per watched worksheet, stopped once no
+# dashboard session has asked for it within REFRESH_WORKER_IDLE_SECONDS
+AUTO_REFRESH_INTERVALS = [15, 30, 60, 120, 300]
+REFRESH_WORKER_IDLE_SECONDS = 10 * 60
+
+@st.cache_resource
+def _refresh_workers():
+    """Process-wide registry of background refresh workers"""
+    return {"lock": threading.Lock(), "workers": {}}
+
+def get_sheet_revision(service_account_info, sheet_url):
+    """Cheap change check: the spreadsheet's Drive modifiedTime"""
+    client = get_gspread_client(service_account_info)["client"]
+    metadata = sheets_call(
+        service_account_info,
+        lambda: client.get_file_drive_metadata(extract_sheet_id(sheet_url)),
+        kind="drive"
+    )
+    return metadata["modifiedTime"]
+
+def _refresh_worker_loop(worker):
+    """Poll the sheet revision and re-sync the shared entry only when it changed"""
+    registry = worker["registry"]
+    try:
+        worker["revision"] = get_sheet_revision(worker["service_account_info"], worker["sheet_url"])
+    except Exception as e:
+        worker["error"] = str(e)
+    
+    while not worker["stop"].wait(worker["interval"]):
+        if time.time() - worker["last_seen"] > REFRESH_WORKER_IDLE_SECONDS:
+            break
+        try:
+            revision = get_sheet_revision(worker["service_account_info"], worker["sheet_url"])
+            if revision == worker["revision"]:
+                continue
+            entry, error = load_email_data(
+                worker["service_account_info"],
+                worker["sheet_url"],
+                worker["worksheet_name"],
+                force=True
+            )
+            if error is None and entry["throttled"]:
+                error = entry["throttled"]
+            worker["error"] = error
+            if error is None:
+                worker["revision"] = revision
+                worker["refreshed_at"] = time.time()
+        except Exception as e:
+            worker["error"] = str(e)
+    
+    with registry["lock"]:
+        if registry["workers"].get(worker["key"]) is worker:
+            del registry["workers"][worker["key"]]
+
+def ensure_refresh_worker(service_account_info, sheet_url, worksheet_name, interval):
+    """Start (or keep alive) the background refresh worker for a worksheet and return it"""
+    key = (extract_sheet_id(sheet_url), worksheet_name)
+    registry = _refresh_workers()
+    with registry["lock"]:
+        worker = registry["workers"].get(key)
+        if worker is None:
+            worker = {
+                "key": key,
+                "registry": registry,
+                "service_account_info": service_account_info,
+                "sheet_url": sheet_url,
+                "worksheet_name": worksheet_name,
+                "interval": interval,
+                "stop": threading.Event(),
+                "revision": None,
+                "refreshed_at": None,
+                "error": None,
+                "last_seen": time.time()
+            }
+            # Shared by every session, so the thread runs without any one session's script context
+            thread = threading.Thread(target=_refresh_worker_loop, args=(worker,), daemon=True,
+                                      name=f"sheet-refresh-{key[0][:8]}")
+            registry["workers"][key] = worker
+            thread.start()
+        # The fastest interval any watching session asked for wins
+        worker["interval"] = min(worker["interval"], interval)
+        worker["last_seen"] = time.time()
+    return worker
+
+# Priority badge color
+PRIORITY_COLORS = {
+    "High": "#ff4757",
+    "Medium": "#ffa726", 
+    "Low": "#66bb6a"
+}
+
+# Status colors
+STATUS_COLORS = {
+    "Completed": "#27ae60",
+    "In Progress": "#f39c12",
+    "Pending": "#e74c3c"
+}
+
+def compile_html_template(markup):
+    """Compile card markup into a string.Template, dropping indentation and blank lines.
+
+    Indented lines after a blank line would otherwise be rendered by st.markdown as code blocks.
+    """
+    lines = [line.strip() for line in markup.splitlines()]
+    return string.Template("\n".join(line for line in lines if line))
+
+CARD_TEMPLATE = compile_html_template("""
+    <div class="email-card email-card-${priority_class}">
+        <div class="card-header">
+            <div>
+                <h3 style="margin: 0; font-size: 18px;">📧 ${email_id}</h3>
+                <p style="margin: 5px 0 0 0; opacity: 0.9; font-size: 14px;">
+                    From: ${sender_name} (${sender_email})
+                </p>
+            </div>
+            <div style="text-align: right;">
+                <span class="priority-badge" style="background: ${priority_color};">
+                    ${priority} Priority
+                </span>
+                <br>
+                <span class="status-badge" style="background: ${status_color}; margin-top: 5px; display: inline-block;">
+                    ${status}
+                </span>
+            </div>
+        </div>
+        
+        <div class="card-content">
+            <h4 style="margin: 0 0 10px 0; font-size: 16px;">📝 Subject:</h4>
+            <p style="margin: 0 0 15px 0; font-weight: 500;">${subject}</p>
+            
+            <h4 style="margin: 0 0 10px 0; font-size: 16px;">📋 Summary:</h4>
+            <p style="margin: 0 0 15px 0; line-height: 1.4;">${summary}</p>
+            
+            <h4 style='margin: 0 0 10px 0; font-size: 16px;'>${response_heading}</h4>
+            <p style="margin: 0 0 15px 0; line-height: 1.4; background: rgba(255,255,255,0.1); padding: 10px; border-radius: 5px;">
+                ${drafted_response}
+            </p>
+        </div>
+        
+        <div class="card-footer">
+            <div>
+                <strong>📅 Received:</strong> ${received}<br>
+                <strong>🏷️ Category:</strong> ${category} | 
+                <strong>👤 Assigned:</strong> ${assigned_to}
+            </div>
+            <div style="text-align: right;">
+                ${sent_line}
+                <br>
+                ${attachments_line}${follow_up_line}
+            </div>
+        </div>
+    </div>
+""")
+
+# Rendered card HTML is reused across reruns and sessions, keyed by
+# (Email ID, hash of the row's card fields)
+CARD_HTML_CACHE_SIZE = 5000
+CARD_COLUMNS = [
+    "Email ID", "From (Sender Name)", "From (Sender Email)", "Priority", "Resolution Status",
+    "Subject", "Email Summary", "Drafted Response", RECEIVED_AT, "Category/Tag", "Assigned To",
+    "Sent (Y/N)", "Sent Date", "Sent Time", "Attachments Received (Y/N)", "Attachment Details",
+    "Follow-up Required (Y/N)", "Follow-up Due Date"
+]
+
+@st.cache_resource
+def _card_html_cache():
+    """Process-wide LRU cache of rendered card fragments"""
+    return {"lock": threading.Lock(), "entries": OrderedDict()}
+
+def _render_card_batch(emails):
+    """Fill the card template for a batch of rows, escaping every value"""
+    def escaped(col):
+        return emails[col].astype(str).map(html.escape)
+    
+    priority = emails["Priority"].astype(str)
+    status = emails["Resolution Status"].astype(str)
+    sent = emails["Sent (Y/N)"].to_numpy(dtype=bool)
+    attachments = emails["Attachments Received (Y/N)"].to_numpy(dtype=bool)
+    follow_up = emails["Follow-up Required (Y/N)"].to_numpy(dtype=bool)
+    
+    fields = pd.DataFrame({
+        "priority_class": priority.str.lower().map(html.escape),
+        "email_id": escaped("Email ID"),
+        "sender_name": escaped("From (Sender Name)"),
+        "sender_email": escaped("From (Sender Email)"),
+        "priority_color": priority.map(PRIORITY_COLORS).fillna("#666"),
+        "priority": priority.map(html.escape),
+        "status_color": status.map(STATUS_COLORS).fillna("#666"),
+        "status": status.map(html.escape),
+        "subject": escaped("Subject"),
+        "summary": escaped("Email Summary"),
+        "response_heading": np.where(sent, "✅ Response:", "📝 Drafted Response:"),
+        "drafted_response": escaped("Drafted Response"),
+        "received": emails[RECEIVED_AT].map(format_received),
+        "category": escaped("Category/Tag"),
+        "assigned_to": escaped("Assigned To"),
+        "sent_line": np.where(
+            sent,
+            "<strong>✅ Sent:</strong> " + escaped("Sent Date") + " at " + escaped("Sent Time"),
+            "<strong>⏳ Pending</strong>"
+        ),
+        "attachments_line": np.where(
+            attachments, "<strong>📎 Attachments:</strong> " + escaped("Attachment Details"), ""
+        ),
+        "follow_up_line": np.where(
+            follow_up, "<br><strong>📅 Follow-up Due:</strong> " + escaped("Follow-up Due Date"), ""
+        )
+    })
+    return [CARD_TEMPLATE.substitute(record) for record in fields.to_dict("records")]
+
+@timed("card html")
+def build_card_html(emails):
+    """Return the card HTML for each row of a frame, reusing cached fragments for unchanged rows"""
+    if emails.empty:
+        return []
+    row_hashes = pd.util.hash_pandas_object(emails[CARD_COLUMNS], index=False).to_numpy()
+    keys = list(zip(emails["Email ID"].astype(str), row_hashes.tolist()))
+    cache = _card_html_cache()
+    
+    with cache["lock"]:
+        cards = [cache["entries"].get(key) for key in keys]
+        for key, card in zip(keys, cards):
+            if card is not None:
+                cache["entries"].move_to_end(key)
+    
+    missing = [i for i, card in enumerate(cards) if card is None]
+    if missing:
+        rendered = _render_card_batch(emails.iloc[missing])
+        with cache["lock"]:
+            for i, card in zip(missing, rendered):
+                cards[i] = card
+                cache["entries"][keys[i]] = card
+            while len(cache["entries"]) > CARD_HTML_CACHE_SIZE:
+                cache["entries"].popitem(last=False)
+    return cards
+
+# Cards are rendered one page at a time; only the visible window builds HTML
+CARD_PAGE_SIZES = [5, 10, 25, 50]
+
+def render_card_page(total, fetch, key):
+    """Render page controls and the cards of the selected page only; fetch(offset, limit) returns its rows"""
+    col1, col2, col3 = st.columns([1, 1, 2])
+    
+    with col1:
+        page_size = st.selectbox("Cards per page", options=CARD_PAGE_SIZES, index=1, key=f"card_page_size_{key}")
+    
+    total_pages = (total - 1) // page_size + 1 if total else 1
+    with col2:
+        page = st.number_input(f"Page (1-{total_pages})", min_value=1, value=1, step=1, key=f"card_page_{key}")
+    page = min(int(page), total_pages)
+    
+    start_idx = (page - 1) * page_size
+    end_idx = min(start_idx + page_size, total)
+    with col3:
+        st.caption(f"Showing cards {start_idx + 1}-{end_idx} of {total}")
+    
+    # One markdown element for the whole page of cards
+    cards = build_card_html(fetch(start_idx, end_idx - start_idx))
+    st.markdown("\n".join(cards), unsafe_allow_html=True)
+
+# The complete table is paged server-side: only the selected columns of the
+# visible rows are fetched. "All" shows TABLE_STREAM_ROWS rows at a time, with
+# a button appending the next block, instead of sending every row at once.
+TABLE_PAGE_SIZES = [10, 25, 50, 100, "All"]
+TABLE_STREAM_ROWS = 500
+TABLE_DEFAULT_COLUMNS = [
+    "Email ID", RECEIVED_AT, "From (Sender Name)", "Subject",
+    "Priority", "Resolution Status", "Department", "Assigned To"
+]
+
+def _show_more_table_rows():
+    st.session_state.main_table_stream["rows"] += TABLE_STREAM_ROWS
+
+@st.fragment
+def render_data_table(view, total, view_key):
+    """Column picker, page controls and the visible slice of a view; paging reruns only this fragment.
+
+    view_key identifies the view (data version, filters and sort), so "All"
+    starts again from its first block when the view changes.
+    """
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        table_columns = st.multiselect(
+            "Select columns to display",
+            options=view["source"]["columns"],
+            default=[column for column in TABLE_DEFAULT_COLUMNS if column in view["source"]["columns"]],
+            key="main_table_columns"
+        )
+    
+    with col2:
+        rows_per_page = st.selectbox("Rows per page", options=TABLE_PAGE_SIZES, index=1, key="main_table_rows")
+    
+    if not table_columns:
+        return
+    
+    if rows_per_page == "All":
+        stream = st.session_state.get("main_table_stream")
+        if stream is None or stream["view"] != view_key:
+            stream = st.session_state.main_table_stream = {"view": view_key, "rows": TABLE_STREAM_ROWS}
+        start_idx, end_idx = 0, min(stream["rows"], total)
+    else:
+        total_pages = (total - 1) // rows_per_page + 1 if total else 1
+        page = 1
+        if total_pages > 1:
+            page = st.number_input(f"Page (1-{total_pages})", min_value=1, value=1, step=1, key="main_table_page")
+            page = min(int(page), total_pages)
+        start_idx = (page - 1) * rows_per_page
+        end_idx = min(start_idx + rows_per_page, total)
+    
+    if end_idx - start_idx < total:
+        st.info(f"Showing rows {start_idx + 1}-{end_idx} of {total}")
+    st.dataframe(
+        view_rows(view, start_idx, end_idx - start_idx, table_columns),
+        height=400,
+        use_container_width=True,
+        hide_index=True
+    )
+    if rows_per_page == "All" and end_idx < total:
+        st.button(
+            f"⬇️ Show {min(TABLE_STREAM_ROWS, total - end_idx)} more rows",
+            on_click=_show_more_table_rows,
+            key="main_table_more"
+        )
+
+# Chart figures are built once per (data version, filter state) and shared by
+# every session. They use graph_objects with an empty template (the Streamlit
+# theme is applied in the browser) and carry only the plotted numbers, and the
+# volume series is bucketed into weeks or months once days would exceed
+# VOLUME_MAX_POINTS.
+FIGURE_CACHE_SIZE = 256
+VOLUME_MAX_POINTS = 180
+
+@st.cache_resource
+def _figure_cache():
+    """Process-wide LRU cache of chart figures"""
+    return {"lock": threading.Lock(), "entries": OrderedDict()}
+
+def cached_figure(key, build):
+    """Return the figure for key, building it on first use; cached figures are never modified"""
+    cache = _figure_cache()
+    with cache["lock"]:
+        figure = cache["entries"].get(key)
+        if figure is not None:
+            cache["entries"].move_to_end(key)
+            return figure
+    figure = build()
+    with cache["lock"]:
+        cache["entries"][key] = figure
+        while len(cache["entries"]) > FIGURE_CACHE_SIZE:
+            cache["entries"].popitem(last=False)
+    return figure
+
+def _figure(traces, title, height, **layout):
+    return go.Figure(traces, layout=dict(
+        title=title, height=height, template="none", margin=dict(l=40, r=20, t=50, b=40), **layout
+    ))
+
+def volume_buckets(daily):
+    """Bucket {day: count} into days, weeks (from Monday) or months, whichever keeps within VOLUME_MAX_POINTS.
+
+    Returns (bucket name, ISO start dates, counts).
+    """
+    days = np.array(list(daily), dtype="datetime64[D]")
+    counts = np.array(list(daily.values()))
+    span = int((days.max() - days.min()).astype(np.int64)) + 1
+    if span <= VOLUME_MAX_POINTS:
+        name, starts = "Daily", days
+    elif span // 7 <= VOLUME_MAX_POINTS:
+        # Day 0 (1970-01-01) was a Thursday
+        name, starts = "Weekly", days - ((days.astype(np.int64) + 3) % 7)
+    else:
+        name, starts = "Monthly", days.astype("datetime64[M]").astype("datetime64[D]")
+    buckets, inverse = np.unique(starts, return_inverse=True)
+    return name, np.datetime_as_string(buckets).tolist(), np.bincount(inverse, weights=counts).astype(int).tolist()
+
+def priority_figure(counts):
+    priorities = [priority for priority, count in counts["by_priority"].items() if count]
+    return _figure(
+        [go.Pie(
+            labels=priorities,
+            values=[counts["by_priority"][priority] for priority in priorities],
+            marker=dict(colors=[PRIORITY_COLORS.get(priority) for priority in priorities])
+        )],
+        "Priority Distribution", 300
+    )
+
+def status_department_figure(counts):
+    departments = sorted({department for department, _ in counts["department_status"]})
+    statuses = sorted({status for _, status in counts["department_status"]})
+    return _figure(
+        [
+            go.Bar(
+                name=status,
+                x=departments,
+                y=[counts["department_status"].get((department, status), 0) for department in departments],
+                marker_color=STATUS_COLORS.get(status)
+            )
+            for status in statuses
+        ],
+        "Status by Department", 300, barmode="relative", xaxis_title="Department", yaxis_title="Count"
+    )
+
+def volume_figure(daily):
+    name, starts, counts = volume_buckets(daily)
+    return _figure(
+        [go.Scatter(x=starts, y=counts, mode="lines+markers" if len(starts) <= 60 else "lines")],
+        f"{name} Email Volume", 250, xaxis=dict(type="date"), yaxis_title="Email Count"
+    )
+
+def response_time_figure(histogram):
+    return _figure(
+        [go.Bar(x=list(histogram), y=list(histogram.values()))],
+        "Response Time Distribution (Hours)", 250, yaxis_title="Replies"
+    )
+
+def render_sla_report(sla):
+    """Response-time percentiles, SLA breaches and the breakdown per mailbox, department, assignee or priority"""
+    st.subheader("⏱️ Response Times & SLA")
+    quantiles = sla["quantiles"]
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Median Response", "—" if quantiles[0.5] is None else f"{quantiles[0.5]:.1f} h")
+    with col2:
+        st.metric("p90 Response", "—" if quantiles[0.9] is None else f"{quantiles[0.9]:.1f} h")
+    with col3:
+        st.metric("SLA Breaches", sla["breached"] + sla["overdue_replies"], help=(
+            f"{sla['breached']} replies sent after the target, "
+            f"{sla['overdue_replies']} unsent emails already past it"
+        ))
+    with col4:
+        st.metric("Overdue Follow-ups", sla["overdue_follow_ups"])
+    
+    group = st.selectbox("Break down by", list(SLA_GROUPS), key="sla_group")
+    st.dataframe(sla["groups"][group].round(1), hide_index=True, use_container_width=True)
+    targets = ", ".join(f"{priority} {hours}h" for priority, hours in SLA_TARGET_HOURS.items())
+    st.caption(
+        f"Reply targets: {targets}. {sla['responded']:,} of {sla['emails']:,} emails have a timed reply; "
+        "overdue follow-ups are open follow-ups past their due date."
+    )
+
+# Downloads are serialized only when clicked, chunk by chunk, and the payloads
+# are cached per (data version, filter, sort, scope, format)
+EXPORT_FORMATS = {
+    "CSV": {"extension": "csv", "mime": "text/csv", "base": "CSV", "gzip": False},
+    "JSON": {"extension": "json", "mime": "application/json", "base": "JSON", "gzip": False},
+    "NDJSON": {"extension": "ndjson", "mime": "application/x-ndjson", "base": "NDJSON", "gzip": False},
+    "CSV (gzip)": {"extension": "csv.gz", "mime": "application/gzip", "base": "CSV", "gzip": True},
+    "NDJSON (gzip)": {"extension": "ndjson.gz", "mime": "application/gzip", "base": "NDJSON", "gzip": True}
+}
+EXPORT_CHUNK_ROWS = 10000
+EXPORT_CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+@st.cache_resource
+def _export_cache():
+    """Process-wide LRU cache of generated export payloads"""
+    return {"lock": threading.Lock(), "entries": OrderedDict(), "nbytes": 0}
+
+def iter_export_chunks(frames, export_format):
+    """Serialize typed frame chunks in the sheet layout, yielding encoded chunks"""
+    base = EXPORT_FORMATS[export_format]["base"]
+    if base == "JSON":
+        yield b"["
+    first = True
+    for chunk in frames:
+        chunk = to_sheet_format(chunk)
+        if base == "CSV":
+            text = chunk.to_csv(index=False, header=first)
+        elif chunk.empty:
+            continue
+        elif base == "NDJSON":
+            text = chunk.to_json(orient='records', lines=True).rstrip("\n") + "\n"
+        else:
+            text = ("" if first else ",") + chunk.to_json(orient='records', indent=2).strip()[1:-1]
+        first = False
+        yield text.encode("utf-8")
+    if base == "JSON":
+        yield b"]"
+
+@timed("export")
+def build_export(frames, export_format):
+    """Build an export payload, compressing chunks as they are produced for gzip formats"""
+    buffer = io.BytesIO()
+    if EXPORT_FORMATS[export_format]["gzip"]:
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as sink:
+            for chunk in iter_export_chunks(frames, export_format):
+                sink.write(chunk)
+    else:
+        for chunk in iter_export_chunks(frames, export_format):
+            buffer.write(chunk)
+    return buffer.getvalue()
+
+def lazy_export(view, export_format, cache_key, mailbox=None):
+    """Return a callable for st.download_button that builds (or reuses) the payload of a view on click"""
+    # Resolved here, on the script thread; the callable runs later on a server thread
+    cache = _export_cache()
+    key = cache_key + (mailbox or "All", export_format)
+    
+    def generate():
+        with cache["lock"]:
+            payload = cache["entries"].get(key)
+            if payload is not None:
+                cache["entries"].move_to_end(key)
+                return payload
+        payload = view_export(view, export_format, mailbox)
+        with cache["lock"]:
+            if key not in cache["entries"]:
+                cache["entries"][key] = payload
+                cache["nbytes"] += len(payload)
+            while cache["nbytes"] > EXPORT_CACHE_MAX_BYTES and len(cache["entries"]) > 1:
+                _, evicted = cache["entries"].popitem(last=False)
+                cache["nbytes"] -= len(evicted)
+        return payload
+    
+    return generate
+
+# Data backends. Everything the dashboard shows (filter options, aggregates, a
+# page of cards or table rows, search hits, exports, one email's details) is
+# asked of a backend, so a database can answer with queries and only the visible
+# page is loaded into memory. Sources and views are plain dicts whose "backend"
+# selects the implementation in DATA_BACKENDS.
+DATA_SOURCE_TYPES = ["Google Sheets", "CSV file", "SQL database"]
+SORT_OPTIONS = ["Received Date", "Priority", "Resolution Status", "Department", "Email ID"]
+PRIORITY_ORDER = {"High": 3, "Medium": 2, "Low": 1}
+SQL_RESULT_CACHE_SIZE = 256
+# Rows fetched for each mailbox's table and for the details picker
+MAILBOX_TABLE_ROWS = 1000
+DETAIL_PICKER_ROWS = 1000
+
+def filter_state_key(filters):
+    """Hashable key for a {column: selected values} filter dict"""
+    return tuple((column, tuple(values)) for column, values in filters.items())
+
+def frame_source(entry, sheets=None, backend=None):
+    """Source over a shared in-memory entry (Google Sheets, CSV upload or demo data).
+
+    sheets maps worksheet keys to the {"service_account_info", "sheet_url",
+    "worksheet_name"} that edits to their rows are written back to. backend
+    is "frame" or "shared"; by default it is "shared" in multi-process mode,
+    where the entry is published to the data plane.
+    """
+    source = {
+        "backend": "frame",
+        "entry": entry,
+        "sheets": sheets or {},
+        "columns": entry["df"].columns.tolist(),
+        "version": (entry["key"], entry["version"])
+    }
+    if backend is None:
+        backend = "shared" if DATAPLANE_WORKERS else "frame"
+    if backend == "shared":
+        try:
+            source["dataset"] = get_derived(entry, "dataplane", lambda df: _publish_entry(entry))
+            source["path"] = source["dataset"]["path"]
+            source["backend"] = "shared"
+        except OSError as e:
+            dataplane_logger.warning("Could not publish %s to %s: %s", entry["key"], dataplane.DATAPLANE_DIR, e)
+    return source
+
+def _publish_entry(entry):
+    """Publish an entry's frame to the data plane as a dataset {"path", "base"}.
+
+    When the previous version was published too, base names its file and what
+    changed since ("start" of re-synced rows, or the edited "rows" and the
+    structures to "reuse"), so workers extend, patch or keep what they derived
+    from it like get_derived does here.
+    """
+    base = entry["base"]
+    previous = base["derived"].get("dataplane") if base is not None else None
+    path = dataplane.publish(entry["df"], entry["key"], entry["version"], DATA_CACHE_MAX_ENTRIES)
+    if previous is None:
+        return {"path": path, "base": None}
+    return {"path": path, "base": {
+        "path": previous["path"],
+        "start": base["start"],
+        "rows": base.get("rows"),
+        "reuse": base.get("reuse", set())
+    }}
+
+def _category_ranks(values, category_rank):
+    """Per-row rank of a categorical column from a rank per category (missing where the rank is -1)"""
+    codes = values.cat.codes.to_numpy()
+    ranks = np.append(category_rank, -1)[codes]
+    return ranks.astype(np.int64), ranks < 0
+
+def _email_id_ranks(ids):
+    """Dense ranks of Email IDs in natural order: text before the trailing number, then its value"""
+    ids = pa.array(ids.fillna("").astype(str))
+    parts = pc.extract_regex(ids, r"^(?P<prefix>.*?)0*(?P<digits>\d*)$")
+    digits = pc.struct_field(parts, "digits")
+    # Zero-padded to one width, the digits compare like the numbers they spell
+    width = max(pc.max(pc.utf8_length(digits)).as_py() or 0, 1)
+    keys = [
+        pc.rank(column, tiebreaker="dense").to_numpy()
+        for column in (pc.struct_field(parts, "prefix"), pc.utf8_lpad(digits, width, padding="0"), ids)
+    ]
+    order = np.lexsort(keys[::-1])
+    raw = keys[2][order]
+    ranks = np.empty(len(ids), dtype=np.int64)
+    ranks[order] = np.cumsum(np.concatenate([[0], raw[1:] != raw[:-1]]))
+    return ranks, np.zeros(len(ids), dtype=bool)
+
+def build_sort_keys(df):
+    """Integer sort keys per SORT_OPTIONS entry, plus a cache of their row permutations.
+
+    Priorities become their PRIORITY_ORDER codes, Received Date the combined
+    received timestamp, status and department the alphabetical rank of their
+    category, and Email IDs natural-order ranks (E999 before E1000).
+    """
+    keys = {}
+    priority_rank = np.array([PRIORITY_ORDER.get(value, -1) for value in df["Priority"].cat.categories])
+    keys["Priority"] = _category_ranks(df["Priority"], priority_rank)
+    received = df[RECEIVED_AT]
+    keys["Received Date"] = (received.to_numpy().view(np.int64).copy(), received.isna().to_numpy())
+    for column in ["Resolution Status", "Department"]:
+        categories = df[column].cat.categories.to_numpy(dtype=str)
+        rank = np.empty(len(categories), dtype=np.int64)
+        rank[np.argsort(categories, kind="stable")] = np.arange(len(categories))
+        keys[column] = _category_ranks(df[column], rank)
+    keys["Email ID"] = _email_id_ranks(df["Email ID"])
+    return {"keys": keys, "orders": {}, "lock": threading.Lock()}
+
+def sort_order(sort_keys, sort_by, ascending):
+    """Permutation of all rows for one sort option and direction, computed once per data version.
+
+    Ties keep row order, so pages are stable, and missing values go last either way.
+    """
+    with sort_keys["lock"]:
+        order = sort_keys["orders"].get((sort_by, ascending))
+    if order is None:
+        key, missing = sort_keys["keys"][sort_by]
+        order = np.argsort(np.where(missing, np.iinfo(np.int64).max, key if ascending else -key), kind="stable")
+        with sort_keys["lock"]:
+            sort_keys["orders"][(sort_by, ascending)] = order
+    return order
+
+def sort_positions(sort_keys, positions, sort_by, ascending):
+    """Order row positions (None for every row) by one of SORT_OPTIONS, picking them out of the cached permutation"""
+    order = sort_order(sort_keys, sort_by, ascending)
+    if positions is None:
+        return order
+    selected = np.zeros(len(order), dtype=bool)
+    selected[positions] = True
+    return order[selected[order]]
+
+def _frame_options(source, column):
+    filter_index = get_derived(source["entry"], "filter_index", build_filter_index)
+    return sorted(filter_index[column])
+
+def _frame_totals(source):
+    return get_aggregates(source["entry"])
+
+def _frame_open_view(source, filters, sort_by, ascending):
+    # Intersect the precomputed position sets instead of scanning the frame.
+    # A view is only arrays of row positions into the shared frame; rows are
+    # gathered per page or export chunk, and sorting picks them out of a
+    # permutation cached per data version.
+    entry = source["entry"]
+    positions = filter_positions(get_derived(entry, "filter_index", build_filter_index), filters)
+    filter_state = filter_state_key(filters)
+    return {
+        "source": source,
+        "filters": filters,
+        "filter_state": filter_state,
+        "positions": positions,
+        "order": sort_positions(get_derived(entry, "sort_keys", build_sort_keys), positions, sort_by, ascending),
+        "mailboxes": {},
+        "counts": get_aggregates(entry, filter_state, positions)
+    }
+
+def _frame_scope(view, mailbox=None):
+    """Positions of the view's sorted rows, or of only one mailbox's rows of it"""
+    if mailbox is None:
+        return view["order"]
+    scope = view["mailboxes"].get(mailbox)
+    if scope is None:
+        entry = view["source"]["entry"]
+        filter_index = get_derived(entry, "filter_index", build_filter_index)
+        in_mailbox = np.zeros(len(entry["df"]), dtype=bool)
+        in_mailbox[filter_index["Company Main Email"].get(mailbox, [])] = True
+        scope = view["order"][in_mailbox[view["order"]]]
+        view["mailboxes"][mailbox] = scope
+    return scope
+
+def _frame_take(view, rows, columns=None):
+    # Take the page first: selecting columns of the whole frame copies it unless copy-on-write is on
+    page = view["source"]["entry"]["df"].take(rows)
+    return page if columns is None else page[columns]
+
+def _frame_rows(view, offset=0, limit=None, columns=None, mailbox=None):
+    rows = _frame_scope(view, mailbox)[offset:None if limit is None else offset + limit]
+    return _frame_take(view, rows, columns)
+
+def _frame_chunks(view, chunk_rows, mailbox=None):
+    scope = _frame_scope(view, mailbox)
+    for start in range(0, max(len(scope), 1), chunk_rows):
+        yield _frame_take(view, scope[start:start + chunk_rows])
+
+def _frame_sla(view):
+    return get_sla_report(view["source"]["entry"], view["filter_state"], view["positions"])
+
+def _frame_search(view, query):
+    entry = view["source"]["entry"]
+    rows, _ = get_search_results(entry, query, view["filter_state"], view["positions"])
+    return {
+        "total": len(rows),
+        "ranked": True,
+        "fetch": lambda offset, limit: _frame_take(view, rows[offset:offset + limit])
+    }
+
+def _frame_lookup(view, email_id):
+    entry = view["source"]["entry"]
+    position = get_derived(entry, "email_positions", email_positions).get(email_id)
+    if position is None:
+        return None
+    positions = view["positions"]
+    if positions is not None:
+        at = np.searchsorted(positions, position)
+        if at == len(positions) or positions[at] != position:
+            return None
+    return entry["df"].iloc[position]
+
+@st.cache_resource
+def _sql_result_cache():
+    """Process-wide LRU of query results (filter options, counts), keyed by database version"""
+    return {"lock": threading.Lock(), "entries": OrderedDict()}
+
+def _sql_cached(source, key, build):
+    """Return build() for (database version, key), running the query once per version"""
+    cache = _sql_result_cache()
+    key = (source["version"],) + key
+    with cache["lock"]:
+        if key in cache["entries"]:
+            cache["entries"].move_to_end(key)
+            return cache["entries"][key]
+    value = build()
+    with cache["lock"]:
+        cache["entries"][key] = value
+        while len(cache["entries"]) > SQL_RESULT_CACHE_SIZE:
+            cache["entries"].popitem(last=False)
+    return value
+
+def _sql_name(name):
+    """Quote a table or column name"""
+    return '"' + name.replace('"', '""') + '"'
+
+def _sql_connect(source):
+    """Open a read-only connection (one per call, so it is safe from any thread)"""
+    if source["engine"] == "duckdb":
+        return duckdb.connect(source["path"], read_only=True)
+    connection = sqlite3.connect(pathlib.Path(source["path"]).resolve().as_uri() + "?mode=ro", uri=True)
+    # SQLite's lower() only folds ASCII letters
+    connection.create_function(
+        "casefold", 1, lambda text: text.casefold() if isinstance(text, str) else text, deterministic=True
+    )
+    return connection
+
+@timed("sql query")
+def _sql_query(source, sql, params=()):
+    """Run a query and return the result as a frame of the raw (sheet layout) values; NULLs read as empty cells"""
+    connection = _sql_connect(source)
+    try:
+        cursor = connection.execute(sql, list(params))
+        columns = [description[0] for description in cursor.description]
+        return pd.DataFrame(cursor.fetchall(), columns=columns).fillna("")
+    finally:
+        connection.close()
+
+def _sql_where(source, filters, mailbox=None, terms=()):
+    """WHERE clause and parameters for a filter dict, optional mailbox and search terms"""
+    clauses, params = [], []
+    for column, values in filters.items():
+        if values:
+            clauses.append(f"{_sql_name(column)} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    if mailbox is not None:
+        clauses.append(f"{_sql_name('Company Main Email')} = ?")
+        params.append(mailbox)
+    # Substring matches on every search field; ranking is left to the in-memory index.
+    # Terms are casefolded (see search_terms), which lower() matches for ASCII text
+    fields = [field for field in SEARCH_FIELDS if field in source["sheet_columns"]]
+    fold = "lower" if source["engine"] == "duckdb" or all(term.isascii() for term in terms) else "casefold"
+    for term in terms:
+        pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        clauses.append("(" + " OR ".join(f"{fold}({_sql_name(field)}) LIKE ? ESCAPE '\\'" for field in fields) + ")")
+        params.extend([pattern] * len(fields))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def _sql_order(sort_by, ascending):
+    """ORDER BY clause matching build_sort_keys, with rowid as a stable tie-breaker"""
+    direction = "ASC" if ascending else "DESC"
+    if sort_by == "Priority":
+        cases = " ".join(f"WHEN '{priority}' THEN {rank}" for priority, rank in PRIORITY_ORDER.items())
+        rank = f"CASE {_sql_name('Priority')} {cases} END"
+        # Priorities without a rank go last either way, as in sort_order (SQLite
+        # puts NULLs first in ascending order)
+        return f" ORDER BY {rank} IS NULL, {rank} {direction}, rowid"
+    if sort_by == "Received Date":
+        # H:MM sorts before HH:MM
+        keys = [_sql_name("Received Date"), f"length({_sql_name('Received Time')})", _sql_name("Received Time")]
+    elif sort_by == "Email ID":
+        # Natural order, as in build_sort_keys: text before the trailing number, then the number
+        email_id = _sql_name("Email ID")
+        prefix = f"rtrim({email_id}, '0123456789')"
+        number = f"ltrim(substr({email_id}, length({prefix}) + 1), '0')"
+        keys = [prefix, f"length({number})", number, email_id]
+    else:
+        keys = [_sql_name(sort_by)]
+    return " ORDER BY " + ", ".join(f"{key} {direction}" for key in keys) + ", rowid"
+
+def _sql_select_list(columns):
+    """Select list for typed column names (Received At is stored as Received Date + Time)"""
+    if columns is None:
+        return "*"
+    names = []
+    for column in columns:
+        names.extend(["Received Date", "Received Time"] if column == RECEIVED_AT else [column])
+    return ", ".join(_sql_name(name) for name in names)
+
+def _sql_select(view, offset=0, limit=None, columns=None, mailbox=None, terms=()):
+    """Fetch one window of the view's rows, in view order, as a typed frame"""
+    source = view["source"]
+    where, params = _sql_where(source, view["filters"], mailbox, terms)
+    sql = f"SELECT {_sql_select_list(columns)} FROM {_sql_name(source['table'])}{where}{view['order']}"
+    if limit is not None:
+        sql += " LIMIT ? OFFSET ?"
+        params += [limit, offset]
+    rows = normalize_email_frame(_sql_query(source, sql, params))
+    return rows if columns is None else rows[columns]
+
+def _sql_counts(source, filters):
+    """Every aggregate for a filter state from one GROUP BY over the grouping columns"""
+    where, params = _sql_where(source, filters)
+    groups = ", ".join(_sql_name(column) for column in [*AGGREGATE_COLUMNS.values(), "Received Date"])
+    sent = f"upper(trim({_sql_name('Sent (Y/N)')})) IN ('Y', 'YES', 'TRUE')"
+    cube = _sql_query(
+        source,
+        f"SELECT {groups}, COUNT(*) AS n, SUM(CASE WHEN {sent} THEN 1 ELSE 0 END) AS sent "
+        f"FROM {_sql_name(source['table'])}{where} GROUP BY {groups}",
+        params
+    )
+    counts = {"total": int(cube["n"].sum())}
+    for name, column in AGGREGATE_COLUMNS.items():
+        counts[name] = {value: int(n) for value, n in cube.groupby(column)["n"].sum().items()}
+    for name, pair in AGGREGATE_PAIRS.items():
+        counts[name] = {values: int(n) for values, n in cube.groupby(list(pair))["n"].sum().items()}
+    days = parse_sheet_datetimes(cube["Received Date"])
+    valid = days.notna()
+    counts["daily"] = {
+        day: int(n) for day, n in cube["n"][valid].groupby(days[valid].dt.date).sum().items()
+    }
+    counts["sent"] = int(cube["sent"].sum())
+    return counts
+
+def _sql_options(source, column):
+    return _sql_cached(source, ("options", column), lambda: sorted(_sql_query(
+        source,
+        f"SELECT DISTINCT {_sql_name(column)} FROM {_sql_name(source['table'])} "
+        f"WHERE {_sql_name(column)} IS NOT NULL"
+    ).iloc[:, 0]))
+
+def _sql_totals(source):
+    return _sql_cached(source, ("counts", ()), lambda: _sql_counts(source, {}))
+
+def _sql_open_view(source, filters, sort_by, ascending):
+    filter_state = filter_state_key(filters)
+    return {
+        "source": source,
+        "filters": filters,
+        "filter_state": filter_state,
+        "order": _sql_order(sort_by, ascending),
+        "counts": _sql_cached(source, ("counts", filter_state), lambda: _sql_counts(source, filters))
+    }
+
+def _sql_rows(view, offset=0, limit=None, columns=None, mailbox=None):
+    return _sql_select(view, offset, limit, columns, mailbox)
+
+def _sql_chunks(view, chunk_rows, mailbox=None):
+    # Stream the ordered result set with fetchmany so only one chunk is in memory
+    source = view["source"]
+    where, params = _sql_where(source, view["filters"], mailbox)
+    connection = _sql_connect(source)
+    try:
+        cursor = connection.execute(
+            f"SELECT * FROM {_sql_name(source['table'])}{where}{view['order']}", params
+        )
+        columns = [description[0] for description in cursor.description]
+        first = True
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows and not first:
+                break
+            yield normalize_email_frame(pd.DataFrame(rows, columns=columns).fillna(""))
+            first = False
+            if len(rows) < chunk_rows:
+                break
+    finally:
+        connection.close()
+
+# SLA reports over a SQL source parse the report's columns of every row once
+# per database version (for this many versions), then filter and report in
+# memory like the frame backend, so only the overdue counts follow the clock
+SQL_SLA_VERSIONS = 2
+
+@st.cache_resource
+def _sql_sla_entries():
+    """Process-wide LRU of data entries over the SLA columns of SQL sources, keyed by database version"""
+    return {"lock": threading.Lock(), "entries": OrderedDict()}
+
+def _sql_sla_entry(source):
+    cache = _sql_sla_entries()
+    with cache["lock"]:
+        entry = cache["entries"].get(source["version"])
+        if entry is not None:
+            cache["entries"].move_to_end(source["version"])
+            return entry
+    df = normalize_email_frame(_sql_query(
+        source, f"SELECT {_sql_select_list(SLA_COLUMNS)} FROM {_sql_name(source['table'])}"
+    ))
+    entry = {"key": source["version"], "version": 0, "df": df, "derived": {}, "base": None, "lock": threading.Lock()}
+    with cache["lock"]:
+        entry = cache["entries"].setdefault(source["version"], entry)
+        while len(cache["entries"]) > SQL_SLA_VERSIONS:
+            cache["entries"].popitem(last=False)
+    return entry
+
+def _sql_sla(view):
+    # SLA_COLUMNS include every filter column, so the view's filters apply in memory
+    entry = _sql_sla_entry(view["source"])
+    positions = filter_positions(get_derived(entry, "filter_index", build_filter_index), view["filters"])
+    return get_sla_report(entry, view["filter_state"], positions)
+
+def _sql_search(view, query):
+    source = view["source"]
+    terms = search_terms(query)
+    if not terms:
+        return {"total": 0, "ranked": False, "fetch": lambda offset, limit: None}
+    where, params = _sql_where(source, view["filters"], terms=terms)
+    total = _sql_cached(source, ("search", view["filter_state"], terms), lambda: int(_sql_query(
+        source, f"SELECT COUNT(*) AS n FROM {_sql_name(source['table'])}{where}", params
+    )["n"].iloc[0]))
+    return {
+        "total": total,
+        "ranked": False,
+        "fetch": lambda offset, limit: _sql_select(view, offset, limit, terms=terms)
+    }
+
+def _sql_lookup(view, email_id):
+    source = view["source"]
+    rows = normalize_email_frame(_sql_query(
+        source,
+        f"SELECT * FROM {_sql_name(source['table'])} WHERE {_sql_name('Email ID')} = ? LIMIT 1",
+        [email_id]
+    ))
+    return None if rows.empty else rows.iloc[0]
+
+# Dashboard users pick SQL databases by file name; only files inside this
+# folder (EMAIL_DASHBOARD_SQL_DIR) can be opened, created or overwritten
+SQL_DATA_DIR = os.environ.get("EMAIL_DASHBOARD_SQL_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "databases"
+)
+
+def resolve_sql_path(name):
+    """Return (path, error) for a database file name, rejecting anything that resolves outside SQL_DATA_DIR"""
+    root = os.path.realpath(SQL_DATA_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    if path == root or os.path.commonpath([root, path]) != root:
+        return None, f"Database files must be inside {root}"
+    return path, None
+
+def open_sql_source(path, table="emails"):
+    """Return (source, error) for an email table in a SQLite (or, if installed, DuckDB) file.
+
+    The table uses the sheet layout (SHEET_COLUMNS). The source's version changes
+    whenever the file does, which keys every cached query result.
+    """
+    engine = "duckdb" if path.endswith(".duckdb") else "sqlite"
+    if engine == "duckdb" and duckdb is None:
+        return None, "DuckDB files need the duckdb package (pip install duckdb)"
+    if not os.path.isfile(path):
+        return None, f"Database file not found: {path}"
+    # SQLite commits may only touch the -wal file until the next checkpoint
+    version = ["sql", os.path.abspath(path), table]
+    for name in [path, path + "-wal"]:
+        if os.path.exists(name):
+            stat = os.stat(name)
+            version += [stat.st_mtime_ns, stat.st_size]
+    source = {
+        "backend": "sql",
+        "engine": engine,
+        "path": path,
+        "table": table,
+        "version": tuple(version)
+    }
+    try:
+        sheet_columns = _sql_cached(source, ("columns",), lambda: _sql_query(
+            source, f"SELECT * FROM {_sql_name(table)} LIMIT 0"
+        ).columns.tolist())
+    except Exception as e:
+        return None, str(e)
+    missing = [column for column in SHEET_COLUMNS if column not in sheet_columns]
+    if missing:
+        return None, f"Table {table} is missing columns: {', '.join(missing)}"
+    source["sheet_columns"] = sheet_columns
+    source["columns"] = normalize_email_frame(pd.DataFrame(columns=sheet_columns)).columns.tolist()
+    return source, None
+
+def write_sql_table(df, path, table="emails"):
+    """Write a typed frame to a SQLite/DuckDB table in the sheet layout, indexed for the dashboard's queries"""
+    rows = to_sheet_format(df)
+    if path.endswith(".duckdb"):
+        if duckdb is None:
+            raise RuntimeError("DuckDB files need the duckdb package (pip install duckdb)")
+        connection = duckdb.connect(path)
+        try:
+            connection.register("email_rows", rows)
+            connection.execute(f"CREATE OR REPLACE TABLE {_sql_name(table)} AS SELECT * FROM email_rows")
+        finally:
+            connection.close()
+        return
+    connection = sqlite3.connect(path)
+    try:
+        rows.to_sql(table, connection, if_exists="replace", index=False, chunksize=EXPORT_CHUNK_ROWS)
+        indexed = [[column] for column in FILTER_COLUMNS] + [["Received Date", "Received Time"], ["Email ID"]]
+        for columns in indexed:
+            name = _sql_name(f"{table}_{'_'.join(columns)}".lower().replace(" ", "_"))
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {_sql_name(table)} "
+                f"({', '.join(_sql_name(column) for column in columns)})"
+            )
+        connection.commit()
+    finally:
+        connection.close()
+
+def _chunked_export(view, export_format, mailbox=None):
+    return build_export(view_chunks(view, mailbox), export_format)
+
+# Multi-process serving (dataplane.py): with EMAIL_DASHBOARD_WORKERS=N, in-memory
+# sources are published to shared memory and their filters, aggregates, search,
+# SLA reports and exports run in N worker processes, so one session's pandas
+# work no longer holds the GIL for the others. Pages of rows, email lookups and
+# edits stay on this process's own frame.
+DATAPLANE_WORKERS = int(os.environ.get("EMAIL_DASHBOARD_WORKERS") or 0)
+# Worker answers (views, search results) the serving process keeps per data
+# version, so reruns do not ship the same row positions again
+DATAPLANE_MEMO_SIZE = 8
+dataplane_logger = logging.getLogger("email_dashboard.dataplane")
+
+@timed("worker pool")
+def _dataplane_call(source, fallback, task, *args):
+    """Run a data plane task on a shared source, or fallback() here when its file or the pool is gone"""
+    try:
+        return dataplane.run(DATAPLANE_WORKERS, task, source["dataset"], *args)
+    except (FileNotFoundError, BrokenProcessPool) as e:
+        dataplane_logger.warning("Running %s in-process: %r", task.__name__, e)
+        return fallback()
+
+def _shared_options(source, column):
+    options = get_derived(source["entry"], "dataplane_options", lambda df: _dataplane_call(
+        source, lambda: {name: _frame_options(source, name) for name in FILTER_COLUMNS}, dataplane.options_task
+    ))
+    return options[column]
+
+def _shared_totals(source):
+    return get_derived(source["entry"], "dataplane_totals", lambda df: _dataplane_call(
+        source, lambda: _frame_totals(source), dataplane.totals_task
+    ))
+
+def _shared_open_view(source, filters, sort_by, ascending):
+    # Same view as the frame backend, with the positions computed by a worker
+    filter_state = filter_state_key(filters)
+    
+    def compute():
+        answer = _dataplane_call(
+            source, lambda: _frame_open_view(source, filters, sort_by, ascending),
+            dataplane.view_task, filters, sort_by, ascending
+        )
+        if "mailbox_order" in answer:
+            grouped = answer.pop("mailbox_order")
+            bounds = answer.pop("mailbox_bounds")
+            answer["mailboxes"] = {mailbox: grouped[start:stop] for mailbox, (start, stop) in bounds.items()}
+        return answer
+    
+    answer = memoized(source["entry"], "dataplane_views", (filter_state, sort_by, ascending), DATAPLANE_MEMO_SIZE, compute)
+    return {
+        **answer,
+        # Scopes filled in later belong to this view, not the memoized answer
+        "mailboxes": dict(answer["mailboxes"]),
+        "source": source,
+        "filters": filters,
+        "filter_state": filter_state,
+        "sort": (sort_by, ascending)
+    }
+
+def _shared_sla(view):
+    return _dataplane_call(view["source"], lambda: _frame_sla(view), dataplane.sla_task, view["filters"])
+
+def _shared_search(view, query):
+    entry = view["source"]["entry"]
+    terms = search_terms(query)
+    rows = memoized(entry, "dataplane_searches", (view["filter_state"], terms), DATAPLANE_MEMO_SIZE, lambda: _dataplane_call(
+        view["source"],
+        lambda: get_search_results(entry, query, view["filter_state"], view["positions"])[0],
+        dataplane.search_task, view["filters"], query
+    ))
+    return {
+        "total": len(rows),
+        "ranked": True,
+        "fetch": lambda offset, limit: _frame_take(view, rows[offset:offset + limit])
+    }
+
+def _shared_export(view, export_format, mailbox=None):
+    return _dataplane_call(
+        view["source"], lambda: _chunked_export(view, export_format, mailbox),
+        dataplane.export_task, view["filters"], *view["sort"], mailbox, export_format
+    )
 
-.email-card-medium {
-    border-left-color: #ffa726;
-    background: linear-gradient(135deg, #ffa726 0%, #ff7043 100%);
+DATA_BACKENDS = {
+    "frame": {
+        "options": _frame_options, "totals": _frame_totals, "open_view": _frame_open_view,
+        "rows": _frame_rows, "chunks": _frame_chunks, "export": _chunked_export, "sla": _frame_sla,
+        "search": _frame_search, "lookup": _frame_lookup
+    },
+    "sql": {
+        "options": _sql_options, "totals": _sql_totals, "open_view": _sql_open_view,
+        "rows": _sql_rows, "chunks": _sql_chunks, "export": _chunked_export, "sla": _sql_sla,
+        "search": _sql_search, "lookup": _sql_lookup
+    },
+    "shared": {
+        "options": _shared_options, "totals": _shared_totals, "open_view": _shared_open_view,
+        "rows": _frame_rows, "chunks": _frame_chunks, "export": _shared_export, "sla": _shared_sla,
+        "search": _shared_search, "lookup": _frame_lookup
+    }
 }
 
-.email-card-low {
-    border-left-color: #66bb6a;
-    background: linear-gradient(135deg, #66bb6a 0%, #43a047 100%);
-}
+def source_options(source, column):
+    """Sorted distinct values of a filter column"""
+    return DATA_BACKENDS[source["backend"]]["options"](source, column)
 
-.card-header {
-    display: flex;
-    justify-content: space-between;
-    align-items: center;
-    margin-bottom: 15px;
-}
+def source_totals(source):
+    """Aggregates over the whole source"""
+    return DATA_BACKENDS[source["backend"]]["totals"](source)
 
-.priority-badge {
-    padding: 5px 15px;
-    border-radius: 20px;
-    font-size: 12px;
-    font-weight: bold;
-    text-transform: uppercase;
-}
+def open_view(source, filters, sort_by, ascending):
+    """Filtered, sorted view of a source; view["counts"] holds its aggregates"""
+    return DATA_BACKENDS[source["backend"]]["open_view"](source, filters, sort_by, ascending)
 
-.status-badge {
-    padding: 5px 10px;
-    border-radius: 10px;
-    font-size: 11px;
-    background: rgba(255,255,255,0.2);
-}
+def view_count(view, mailbox=None):
+    """Number of rows in a view, or in one mailbox of it"""
+    counts = view["counts"]
+    return counts["total"] if mailbox is None else counts["by_mailbox"].get(mailbox, 0)
 
-.card-content {
-    margin: 10px 0;
-}
+def view_rows(view, offset=0, limit=None, columns=None, mailbox=None):
+    """Typed frame of rows offset..offset+limit of a view (all rows when limit is None)"""
+    return DATA_BACKENDS[view["source"]["backend"]]["rows"](view, offset, limit, columns, mailbox)
 
-.card-footer {
-    margin-top: 15px;
-    padding-top: 15px;
-    border-top: 1px solid rgba(255,255,255,0.3);
-    display: flex;
-    justify-content: space-between;
-    font-size: 12px;
-}
+def view_chunks(view, mailbox=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Iterate a view (or one mailbox of it) as typed frames of at most chunk_rows rows"""
+    return DATA_BACKENDS[view["source"]["backend"]]["chunks"](view, chunk_rows, mailbox)
 
-.metric-card {
-    background: white;
-    padding: 20px;
-    border-radius: 10px;
-    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-    text-align: center;
-}
+def view_export(view, export_format, mailbox=None):
+    """Export payload of a view (or one mailbox of it) in an EXPORT_FORMATS format"""
+    return DATA_BACKENDS[view["source"]["backend"]]["export"](view, export_format, mailbox)
 
-.mailbox-header {
-    background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-    color: white;
-    padding: 15px;
-    border-radius: 10px;
-    margin: 20px 0 10px 0;
-}
+def view_sla(view):
+    """Response-time and SLA report (sla_report) of a view"""
+    return DATA_BACKENDS[view["source"]["backend"]]["sla"](view)
 
-.filter-section {
-    background: #f8f9fa;
-    padding: 15px;
-    border-radius: 10px;
-    margin: 10px 0;
+def view_search(view, query):
+    """Search within a view: {"total", "ranked", "fetch": fetch(offset, limit) -> typed frame}"""
+    return DATA_BACKENDS[view["source"]["backend"]]["search"](view, query)
+
+def view_lookup(view, email_id):
+    """One email of a view as a Series, or None"""
+    return DATA_BACKENDS[view["source"]["backend"]]["lookup"](view, email_id)
+
+# Write-back: actions edit sheet-layout cells ({Email ID: {column: value}}).
+# Edits show up at once in a new version of the shared frame, and a per-worksheet
+# queue coalesces them per row and flushes them with batched batch_update calls
+# (through sheets_call, so they share the quota budget and backoff).
+WRITEBACK_DELAY_SECONDS = 2
+WRITEBACK_BATCH_RANGES = 500
+# The writer runs in the background, so it can wait longer for quota than a page load
+WRITEBACK_MAX_WAIT_SECONDS = 60
+WRITEBACK_RETRY_SECONDS = 30
+FOLLOW_UP_DAYS = 3
+# Columns each derived structure reads; an edit to other columns keeps it as is
+DERIVED_COLUMNS = {
+    "filter_index": set(FILTER_COLUMNS),
+    "aggregates": {*AGGREGATE_COLUMNS.values(), RECEIVED_AT, "Sent (Y/N)"},
+    "aggregate_memo": {*AGGREGATE_COLUMNS.values(), RECEIVED_AT, "Sent (Y/N)"},
+    "search_index": set(SEARCH_FIELDS),
+    "search_memo": {*SEARCH_FIELDS, *FILTER_COLUMNS},
+    "email_positions": {"Email ID"},
+    "sort_keys": {"Priority", RECEIVED_AT, "Resolution Status", "Department", "Email ID"},
+    "response_times": set(SLA_COLUMNS),
+    "sla_memo": set(SLA_COLUMNS)
 }
-</style>
-""", unsafe_allow_html=True)
 
-# Initialize session state
-if 'df' not in st.session_state:
-    st.session_state.df = None
-if 'gsheet_connected' not in st.session_state:
-    st.session_state.gsheet_connected = False
-if 'service_account_info' not in st.session_state:
-    st.session_state.service_account_info = None
+def action_edits(action, emails, note=""):
+    """Sheet-layout edits an action makes to a frame of emails"""
+    ids = emails["Email ID"].tolist()
+    now = datetime.now()
+    if action == "approve":
+        return {email_id: {"Response Approved (Y/N)": "Y"} for email_id in ids}
+    if action == "send":
+        return {
+            email_id: {"Sent (Y/N)": "Y", "Sent Date": now.strftime("%Y-%m-%d"), "Sent Time": now.strftime("%H:%M")}
+            for email_id in ids
+        }
+    if action == "follow_up":
+        due = (now + timedelta(days=FOLLOW_UP_DAYS)).strftime("%Y-%m-%d")
+        return {email_id: {"Follow-up Required (Y/N)": "Y", "Follow-up Due Date": due} for email_id in ids}
+    if action == "note":
+        return {
+            email_id: {"Notes/Comments": f"{notes} | {note}" if notes else note}
+            for email_id, notes in zip(ids, emails["Notes/Comments"].tolist())
+        }
+    if action == "draft_responses":
+        undrafted = emails[emails["Drafted Response"].str.strip() == ""]
+        return {
+            email_id: {"Drafted Response": (
+                f"Thank you for contacting us regarding '{subject[:30]}...'. We have reviewed your "
+                "inquiry and will provide a comprehensive response within 24 hours."
+            )}
+            for email_id, subject in zip(undrafted["Email ID"].tolist(), undrafted["Subject"].tolist())
+        }
+    raise ValueError(f"Unknown action: {action}")
 
-def create_demo_data():
-    """Create enhanced demo data"""
-    columns = [
-        "Company Main Email", "Email ID", "Received Date", "Received Time",
-        "From (Sender Name)", "From (Sender Email)", "Subject", "Department",
-        "Priority", "Category/Tag", "Email Summary", "Drafted Response",
-        "Response Approved (Y/N)", "Approver Name", "Sent (Y/N)", "Sent Date",
-        "Sent Time", "Sent Email Summary", "Attachments Received (Y/N)",
-        "Attachment Details", "Follow-up Required (Y/N)", "Follow-up Due Date",
-        "Assigned To", "Resolution Status", "Notes/Comments"
-    ]
-    
-    mailboxes = [
-        "support@vipbusinesscredit.com",
-        "sales@vipbusinesscredit.com", 
-        "billing@vipbusinesscredit.com",
-        "hr@vipbusinesscredit.com",
-        "info@vipbusinesscredit.com"
-    ]
+def email_positions(df):
+    """Row position of each Email ID (its first occurrence), as a Series indexed by ID"""
+    positions = pd.Series(np.arange(len(df)), index=df["Email ID"].to_numpy())
+    return positions[~positions.index.duplicated()]
+
+def apply_email_edits(df, edits):
+    """Return a typed frame with sheet-layout edits applied; only the edited columns are copied"""
+    positions = email_positions(df)
+    result = df.copy(deep=False)
+    for column in sorted({column for changes in edits.values() for column in changes}):
+        if column not in result.columns:
+            continue
+        ids = [email_id for email_id, changes in edits.items() if column in changes]
+        rows = positions.reindex(ids).to_numpy()
+        found = ~np.isnan(rows)
+        if not found.any():
+            continue
+        values = [edits[email_id][column] for email_id, keep in zip(ids, found) if keep]
+        rows = rows[found].astype(np.int64)
+        edited = normalize_email_frame(pd.DataFrame({column: values}))[column]
+        series = result[column].copy()
+        if column in CATEGORY_COLUMNS:
+            added = edited.cat.categories.difference(series.cat.categories)
+            if len(added):
+                series = series.cat.add_categories(added)
+            edited = edited.astype(str)
+        series.iloc[rows] = edited.to_numpy()
+        result[column] = series
+    return result
+
+def update_entry(entry, edits):
+    """Store a new version of an entry with edits applied, keeping derived structures the edits cannot affect.
+
+    Concurrent updates (and syncs) of the same key take turns, so each one
+    starts from the version the previous one stored.
+    """
+    cache = _shared_data_cache()
+    with _key_lock(cache, entry["key"]):
+        with cache["lock"]:
+            current = cache["entries"].get(entry["key"], entry)
+        df = apply_email_edits(current["df"], edits)
+        edited = {column for changes in edits.values() for column in changes}
+        reuse = {name for name, columns in DERIVED_COLUMNS.items() if not columns & edited}
+        rows = get_derived(current, "email_positions", email_positions).reindex(list(edits)).dropna()
+        with cache["lock"]:
+            updated = _store_data_entry(
+                cache, current["key"], df, current["sync_state"],
+                {"derived": current["derived"], "start": None, "reuse": reuse, "rows": rows.to_numpy(dtype=np.int64)},
+                parts=current["parts"]
+            )
+            updated["authorized"] = set(current["authorized"])
+    return updated
+
+@st.cache_resource
+def _writeback_queues():
+    """Process-wide write-back queues, one per (sheet id, worksheet)"""
+    return {"lock": threading.Lock(), "queues": {}}
+
+def pending_edits(key):
+    """Edits queued (or being written) for a worksheet key, merged oldest first"""
+    queue = _writeback_queues()["queues"].get(key)
+    if queue is None:
+        return {}
+    with queue["lock"]:
+        merged = {}
+        for batch in [queue["in_flight"], queue["pending"]]:
+            for email_id, changes in batch.items():
+                merged[email_id] = {**merged.get(email_id, {}), **changes}
+        return merged
+
+def _merge_edits(target, edits, overwrite=True):
+    """Coalesce edits into target per row; with overwrite=False, values already in target win"""
+    for email_id, changes in edits.items():
+        row = target.setdefault(email_id, {})
+        for column, value in changes.items():
+            if overwrite or column not in row:
+                row[column] = value
+
+def _flush_edits(queue, edits):
+    """Write coalesced edits to the worksheet; returns the number of rows written"""
+    info = queue["service_account_info"]
+    worksheet = open_worksheet(info, queue["sheet_url"], queue["worksheet_name"])
+    header = sheets_call(info, lambda: worksheet.row_values(1), max_wait=WRITEBACK_MAX_WAIT_SECONDS)
+    if "Email ID" not in header:
+        raise ValueError("Worksheet has no 'Email ID' column")
+    # Rows can move between load and flush, so locate them by Email ID now
+    ids = sheets_call(
+        info, lambda: worksheet.col_values(header.index("Email ID") + 1), max_wait=WRITEBACK_MAX_WAIT_SECONDS
+    )
+    sheet_rows = {}
+    for row, email_id in enumerate(ids[1:], start=2):
+        sheet_rows.setdefault(email_id, row)
     
-    rows = []
-    email_counter = 1000
-    
-    demo_subjects = [
-        "Urgent: Payment processing issue needs immediate attention",
-        "Follow-up on credit application status inquiry",
-        "Request for documentation update and verification",
-        "Complaint about service delays and resolution needed",
-        "New partnership opportunity discussion",
-        "Account verification and security update required",
-        "Invoice discrepancy needs clarification",
-        "Employee onboarding documentation request",
-        "Product demo scheduling and requirements",
-        "Technical support for platform integration"
-    ]
+    data = []
+    written = 0
+    for email_id, changes in edits.items():
+        row = sheet_rows.get(email_id)
+        cells = sorted((header.index(column) + 1, value) for column, value in changes.items() if column in header)
+        if row is None or not cells:
+            continue
+        written += 1
+        # Adjacent columns of a row go out as one range
+        run = [cells[0]]
+        for cell in cells[1:] + [None]:
+            if cell is not None and cell[0] == run[-1][0] + 1:
+                run.append(cell)
+                continue
+            cell_range = gspread.utils.rowcol_to_a1(row, run[0][0])
+            if len(run) > 1:
+                cell_range += ":" + gspread.utils.rowcol_to_a1(row, run[-1][0])
+            data.append({"range": cell_range, "values": [[value for _, value in run]]})
+            run = [cell]
     
-    demo_summaries = [
-        "Customer experiencing payment gateway errors affecting multiple transactions",
-        "Applicant requesting status update on business credit application submitted last week",
-        "Client needs to update business documentation for compliance review",
-        "Frustrated customer complaining about 3-day service delay, requesting manager escalation",
-        "Potential partner proposing strategic alliance for mutual growth opportunities",
-        "Security team requesting account verification due to suspicious login attempts",
-        "Billing discrepancy of $1,500 requires investigation and correction",
-        "New hire needs access credentials and onboarding materials",
-        "Prospect interested in product demo and pricing information",
-        "Integration issues with API causing data sync problems"
-    ]
+    for start in range(0, len(data), WRITEBACK_BATCH_RANGES):
+        batch = data[start:start + WRITEBACK_BATCH_RANGES]
+        sheets_call(
+            info,
+            lambda: worksheet.batch_update(batch, value_input_option="RAW"),
+            kind="write",
+            max_wait=WRITEBACK_MAX_WAIT_SECONDS
+        )
+    return written
+
+def _writeback_loop(queue):
+    while True:
+        queue["wake"].wait()
+        # Let a burst of clicks coalesce into one flush
+        time.sleep(WRITEBACK_DELAY_SECONDS)
+        with queue["lock"]:
+            queue["wake"].clear()
+            edits = queue["pending"]
+            queue["pending"] = OrderedDict()
+            queue["in_flight"] = edits
+        if not edits:
+            continue
+        try:
+            written = _flush_edits(queue, edits)
+            with queue["lock"]:
+                queue["in_flight"] = {}
+                queue["written"] += written
+                queue["flushed_at"] = time.time()
+                queue["error"] = None
+        except Exception as e:
+            # Put the edits back behind any newer ones and try again later
+            with queue["lock"]:
+                _merge_edits(queue["pending"], edits, overwrite=False)
+                queue["in_flight"] = {}
+                queue["error"] = str(e)
+            threading.Timer(WRITEBACK_RETRY_SECONDS, queue["wake"].set).start()
+
+def queue_edits(service_account_info, sheet_url, worksheet_name, edits):
+    """Queue edits for a worksheet and wake its writer thread"""
+    key = (extract_sheet_id(sheet_url), worksheet_name)
+    queues = _writeback_queues()
+    with queues["lock"]:
+        queue = queues["queues"].get(key)
+        if queue is None:
+            queue = {
+                "service_account_info": service_account_info,
+                "sheet_url": sheet_url,
+                "worksheet_name": worksheet_name,
+                "pending": OrderedDict(),
+                "in_flight": {},
+                "written": 0,
+                "flushed_at": None,
+                "error": None,
+                "wake": threading.Event(),
+                "lock": threading.Lock()
+            }
+            thread = threading.Thread(target=_writeback_loop, args=(queue,), daemon=True)
+            queues["queues"][key] = queue
+            thread.start()
+    with queue["lock"]:
+        queue["service_account_info"] = service_account_info
+        _merge_edits(queue["pending"], edits)
+    queue["wake"].set()
+    return queue
+
+def write_sql_edits(source, edits):
+    """Apply edits to a SQL source's table with one UPDATE per row"""
+    statements = {}
+    for email_id, changes in edits.items():
+        columns = tuple(sorted(changes))
+        statements.setdefault(columns, []).append([changes[column] for column in columns] + [email_id])
+    connection = duckdb.connect(source["path"]) if source["engine"] == "duckdb" else sqlite3.connect(source["path"])
+    try:
+        for columns, params in statements.items():
+            assignments = ", ".join(f"{_sql_name(column)} = ?" for column in columns)
+            connection.executemany(
+                f"UPDATE {_sql_name(source['table'])} SET {assignments} WHERE {_sql_name('Email ID')} = ?",
+                params
+            )
+        connection.commit()
+    finally:
+        connection.close()
+
+def submit_edits(source, edits):
+    """Persist edits for a source and return a status message; frame sources update optimistically"""
+    if not edits:
+        return "Nothing to change"
+    if source["backend"] == "sql":
+        write_sql_edits(source, edits)
+        return f"Saved {len(edits)} emails to the database"
+    entry = source["entry"]
+    if not entry["parts"]:
+        batches = {entry["key"]: edits}
+    else:
+        # Edit each worksheet's own entry; the combined frame is rebuilt from them on the next load
+        parts = entry["parts"]
+        positions = email_positions(entry["df"]).reindex(list(edits)).to_numpy()
+        owners = np.searchsorted([part["start"] for part in parts], positions, side="right") - 1
+        owners[np.isnan(positions)] = -1
+        batches = {}
+        for (email_id, changes), owner in zip(edits.items(), owners):
+            if owner >= 0:
+                batches.setdefault(parts[owner]["key"], {})[email_id] = changes
     
-    for i, mailbox in enumerate(mailboxes):
-        for j in range(2):  # 2 emails per mailbox
-            email_counter += 1
-            idx = (i * 2 + j) % len(demo_subjects)
-            
-            received_date = (datetime.now() - timedelta(days=j+1)).strftime("%Y-%m-%d")
-            received_time = f"{9+j}:{15+j*5:02d}"
-            
-            row = [
-                mailbox,  # Company Main Email
-                f"E{email_counter}",  # Email ID
-                received_date,  # Received Date
-                received_time,  # Received Time
-                f"Contact Person {email_counter}",  # From (Sender Name)
-                f"contact{email_counter}@company{i+1}.com",  # From (Sender Email)
-                demo_subjects[idx],  # Subject
-                ("Support" if "support" in mailbox else "Sales" if "sales" in mailbox else 
-                 "Billing" if "billing" in mailbox else "HR" if "hr" in mailbox else "General"),  # Department
-                ["High", "Medium", "Low"][j % 3],  # Priority
-                ("Urgent" if j == 0 else "Follow-up" if j == 1 else "Inquiry"),  # Category/Tag
-                demo_summaries[idx],  # Email Summary
-                f"Thank you for contacting us regarding '{demo_subjects[idx][:30]}...'. We have reviewed your inquiry and will provide a comprehensive response within 24 hours.",  # Drafted Response
-                "Y" if j == 0 else "N",  # Response Approved
-                "Manager Smith" if j == 0 else "",  # Approver Name
-                "Y" if j == 0 else "N",  # Sent
-                received_date if j == 0 else "",  # Sent Date
-                f"{10+j}:30" if j == 0 else "",  # Sent Time
-                "Professional response sent addressing all customer concerns" if j == 0 else "",  # Sent Email Summary
-                "Y" if j == 1 else "N",  # Attachments Received
-                "contract.pdf, invoice.xlsx" if j == 1 else "",  # Attachment Details
-                "Y" if j % 2 == 0 else "N",  # Follow-up Required
-                (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d") if j % 2 == 0 else "",  # Follow-up Due Date
-                f"Agent_{i+1}",  # Assigned To
-                "Completed" if j == 0 else "In Progress",  # Resolution Status
-                f"High priority case - escalate if no response within 24 hours" if j == 0 else "Standard processing"  # Notes
-            ]
-            rows.append(row)
+    # Queue first: a sync that stores a new version meanwhile re-applies whatever is queued
+    sheets = source.get("sheets") or {}
+    for key, part_edits in batches.items():
+        if key in sheets:
+            target = sheets[key]
+            queue_edits(target["service_account_info"], target["sheet_url"], target["worksheet_name"], part_edits)
+    if not entry["parts"]:
+        update_entry(entry, edits)
+    else:
+        for key, part_edits in batches.items():
+            part_entry = peek_email_data(key)
+            if part_entry is not None:
+                update_entry(part_entry, part_edits)
     
-    return pd.DataFrame(rows, columns=columns)
+    if not any(key in sheets for key in batches):
+        return f"Updated {len(edits)} emails (this source is not written back)"
+    return f"Updated {len(edits)} emails; saving to Google Sheets in the background"
 
-def connect_to_gsheets(service_account_info, sheet_url, worksheet_name="Sheet1"):
-    """Connect to Google Sheets and return dataframe"""
+def run_email_action(source, emails, action, note_key=None):
+    """Button callback: apply an action to the emails and report it with a toast"""
+    note = ""
+    if note_key is not None:
+        note = st.session_state.get(note_key, "").strip()
+        if not note:
+            st.toast("Write a note first")
+            return
+        st.session_state[note_key] = ""
     try:
-        scope = ['https://spreadsheets.google.com/feeds',
-                'https://www.googleapis.com/auth/drive']
-        
-        creds = Credentials.from_service_account_info(service_account_info, scopes=scope)
-        client = gspread.authorize(creds)
-        
-        # Extract sheet ID from URL
-        if 'docs.google.com/spreadsheets/d/' in sheet_url:
-            sheet_id = sheet_url.split('/d/')[1].split('/')[0]
-        else:
-            sheet_id = sheet_url
-            
-        sheet = client.open_by_key(sheet_id)
-        worksheet = sheet.worksheet(worksheet_name)
-        
-        # Get all records
-        records = worksheet.get_all_records()
-        df = pd.DataFrame(records)
-        
-        return df, None
+        st.toast(f"✅ {submit_edits(source, action_edits(action, emails, note))}")
     except Exception as e:
-        return None, str(e)
+        st.toast(f"❌ Could not save: {str(e)}")
 
-def render_email_card(email_row):
-    """Render an enhanced email card"""
-    priority_class = f"email-card-{email_row['Priority'].lower()}"
-    
-    # Priority badge color
-    priority_colors = {
-        "High": "#ff4757",
-        "Medium": "#ffa726", 
-        "Low": "#66bb6a"
-    }
-    
-    # Status colors
-    status_colors = {
-        "Completed": "#27ae60",
-        "In Progress": "#f39c12",
-        "Pending": "#e74c3c"
-    }
-    
-    card_html = f"""
-    <div class="email-card {priority_class}">
-        <div class="card-header">
-            <div>
-                <h3 style="margin: 0; font-size: 18px;">📧 {email_row['Email ID']}</h3>
-                <p style="margin: 5px 0 0 0; opacity: 0.9; font-size: 14px;">
-                    From: {email_row['From (Sender Name)']} ({email_row['From (Sender Email)']})
-                </p>
-            </div>
-            <div style="text-align: right;">
-                <span class="priority-badge" style="background: {priority_colors.get(email_row['Priority'], '#666')};">
-                    {email_row['Priority']} Priority
-                </span>
-                <br>
-                <span class="status-badge" style="background: {status_colors.get(email_row['Resolution Status'], '#666')}; margin-top: 5px; display: inline-block;">
-                    {email_row['Resolution Status']}
-                </span>
-            </div>
-        </div>
-        
-        <div class="card-content">
-            <h4 style="margin: 0 0 10px 0; font-size: 16px;">📝 Subject:</h4>
-            <p style="margin: 0 0 15px 0; font-weight: 500;">{email_row['Subject']}</p>
-            
-            <h4 style="margin: 0 0 10px 0; font-size: 16px;">📋 Summary:</h4>
-            <p style="margin: 0 0 15px 0; line-height: 1.4;">{email_row['Email Summary']}</p>
-            
-            {"<h4 style='margin: 0 0 10px 0; font-size: 16px;'>✅ Response:</h4>" if email_row['Sent (Y/N)'] == 'Y' else "<h4 style='margin: 0 0 10px 0; font-size: 16px;'>📝 Drafted Response:</h4>"}
-            <p style="margin: 0 0 15px 0; line-height: 1.4; background: rgba(255,255,255,0.1); padding: 10px; border-radius: 5px;">
-                {email_row['Drafted Response']}
-            </p>
-        </div>
-        
-        <div class="card-footer">
-            <div>
-                <strong>📅 Received:</strong> {email_row['Received Date']} at {email_row['Received Time']}<br>
-                <strong>🏷️ Category:</strong> {email_row['Category/Tag']} | 
-                <strong>👤 Assigned:</strong> {email_row['Assigned To']}
-            </div>
-            <div style="text-align: right;">
-                {"<strong>✅ Sent:</strong> " + email_row['Sent Date'] + " at " + email_row['Sent Time'] if email_row['Sent (Y/N)'] == 'Y' else "<strong>⏳ Pending</strong>"}
-                <br>
-                {"<strong>📎 Attachments:</strong> " + email_row['Attachment Details'] if email_row['Attachments Received (Y/N)'] == 'Y' else ""}
-                {"<br><strong>📅 Follow-up Due:</strong> " + email_row['Follow-up Due Date'] if email_row['Follow-up Required (Y/N)'] == 'Y' else ""}
-            </div>
-        </div>
-    </div>
+def request_bulk_action(action):
+    """Button callback: ask for confirmation before a bulk action (None cancels it)"""
+    st.session_state.bulk_action = action
+
+def run_bulk_action(view, action):
+    """Button callback: apply a confirmed action to every email in a view, chunk by chunk"""
+    st.session_state.bulk_action = None
+    edits = {}
+    for chunk in view_chunks(view):
+        edits.update(action_edits(action, chunk))
+    try:
+        st.toast(f"✅ {submit_edits(view['source'], edits)}")
+    except Exception as e:
+        st.toast(f"❌ Could not save: {str(e)}")
+
+def watch_for_new_data(seen_versions, interval):
+    """Rerun the whole app once a background worker has swapped in a newer frame.
+
+    seen_versions maps each watched key to the version this run rendered. Runs
+    as a fragment on a timer; it only compares version numbers, so an idle
+    dashboard never blocks on a fetch itself.
     """
-    
-    st.markdown(card_html, unsafe_allow_html=True)
+    @st.fragment(run_every=interval)
+    def _watch():
+        changed = False
+        for key, seen_version in seen_versions.items():
+            # Keep the workers alive while this dashboard stays open
+            worker = _refresh_workers()["workers"].get(key)
+            if worker is not None:
+                worker["last_seen"] = time.time()
+            current = peek_email_data(key)
+            changed = changed or (current is not None and current["version"] != seen_version)
+        if changed:
+            st.rerun(scope="app")
+    _watch()
 
-def main():
+def render_dashboard():
     st.title("📧 AI Email Management Dashboard")
     st.markdown("Advanced email tracking with Google Sheets integration and enhanced analytics")
     
     # Sidebar configuration
     st.sidebar.header("⚙️ Configuration")
     
-    # Google Sheets Integration
-    st.sidebar.subheader("🔗 Google Sheets Integration")
-    
-    # Service account file upload
-    uploaded_file = st.sidebar.file_uploader(
-        "Upload Service Account JSON",
-        type=['json'],
-        help="Upload your Google Cloud Service Account JSON file"
-    )
-    
-    if uploaded_file is not None:
-        try:
-            service_account_info = json.load(uploaded_file)
-            st.session_state.service_account_info = service_account_info
-            st.sidebar.success("✅ Service account loaded successfully!")
-        except Exception as e:
-            st.sidebar.error(f"❌ Error loading service account: {str(e)}")
-    
-    # Google Sheets URL input
-    sheet_url = st.sidebar.text_input(
-        "Google Sheets URL",
-        placeholder="https://docs.google.com/spreadsheets/d/...",
-        help="Paste your Google Sheets URL here"
+    data_source_type = st.sidebar.radio(
+        "🗂️ Data source",
+        options=DATA_SOURCE_TYPES,
+        help="Google Sheets and CSV files are loaded into memory; SQL databases are queried one page at a time"
     )
     
-    worksheet_name = st.sidebar.text_input(
-        "Worksheet Name",
-        value="Sheet1",
-        help="Name of the worksheet tab to read from"
-    )
+    source = None
+    source_label = None
+    auto_refresh = False
+    incremental_sync = True
+    cache_ttl = DATA_CACHE_TTL_SECONDS
+    data_source = st.session_state.data_source
     
-    # Connect to Google Sheets
-    if st.sidebar.button("🔄 Connect to Google Sheets"):
-        if st.session_state.service_account_info and sheet_url:
-            with st.spinner("Connecting to Google Sheets..."):
-                df, error = connect_to_gsheets(
-                    st.session_state.service_account_info, 
-                    sheet_url, 
-                    worksheet_name
-                )
-                if df is not None:
-                    st.session_state.df = df
-                    st.session_state.gsheet_connected = True
-                    st.sidebar.success("✅ Connected to Google Sheets!")
-                    st.rerun()
-                else:
-                    st.sidebar.error(f"❌ Connection failed: {error}")
+    if data_source_type == "Google Sheets":
+        # Google Sheets Integration
+        st.sidebar.subheader("🔗 Google Sheets Integration")
+        
+        # Service account file upload
+        uploaded_file = st.sidebar.file_uploader(
+            "Upload Service Account JSON",
+            type=['json'],
+            help="Upload your Google Cloud Service Account JSON file"
+        )
+        
+        if uploaded_file is not None:
+            try:
+                service_account_info = json.load(uploaded_file)
+                st.session_state.service_account_info = service_account_info
+                st.sidebar.success("✅ Service account loaded successfully!")
+            except Exception as e:
+                st.sidebar.error(f"❌ Error loading service account: {str(e)}")
+        
+        # Google Sheets URL input
+        sheet_url = st.sidebar.text_input(
+            "Google Sheets URL",
+            placeholder="https://docs.google.com/spreadsheets/d/...",
+            help="Paste your Google Sheets URL here"
+        )
+        
+        worksheet_name = st.sidebar.text_input(
+            "Worksheet Name",
+            value="Sheet1",
+            help="Name of the worksheet tab to read from"
+        )
+        
+        extra_worksheets = st.sidebar.text_area(
+            "Additional worksheets (optional)",
+            placeholder="Sales\nhttps://docs.google.com/spreadsheets/d/... | Billing",
+            help="One source per line: a worksheet of the sheet above, or 'sheet URL | worksheet'. "
+                 "All sources are loaded in parallel and combined."
+        )
+        
+        incremental_sync = st.sidebar.checkbox(
+            "⚡ Incremental sync",
+            value=True,
+            help="Only fetch rows added or edited since the last sync instead of reloading the whole worksheet"
+        )
+        
+        cache_ttl = st.sidebar.number_input(
+            "⏱️ Shared cache TTL (seconds)",
+            min_value=0,
+            value=DATA_CACHE_TTL_SECONDS,
+            step=30,
+            help="How long loaded data is reused by every dashboard user before it is re-synced"
+        )
+        
+        # Connect to Google Sheets
+        if st.sidebar.button("🔄 Connect to Google Sheets"):
+            if st.session_state.service_account_info and sheet_url:
+                sources = parse_sheet_sources(sheet_url, worksheet_name, extra_worksheets)
+                with st.spinner(f"Connecting to {len(sources)} worksheet(s) in Google Sheets..."):
+                    entry, errors = load_sheet_sources(
+                        st.session_state.service_account_info,
+                        sources,
+                        ttl=cache_ttl,
+                        incremental=incremental_sync
+                    )
+                    if entry is not None:
+                        st.session_state.data_source = {"sources": sources}
+                        st.session_state.gsheet_connected = True
+                        if errors:
+                            st.sidebar.warning(f"⚠️ Connected, but some sources failed: {errors}")
+                        else:
+                            st.sidebar.success("✅ Connected to Google Sheets!")
+                        st.rerun()
+                    else:
+                        st.sidebar.error(f"❌ Connection failed: {errors}")
+            else:
+                st.sidebar.error("❌ Please upload service account file and enter sheet URL")
+        
+        # Auto-refresh for Google Sheets: background workers keep the shared frames
+        # fresh, so this session reads whatever is cached instead of waiting on a fetch
+        if st.session_state.gsheet_connected:
+            auto_refresh = st.sidebar.checkbox("🔄 Auto-refresh", value=False)
+            refresh_interval = st.sidebar.select_slider(
+                "Refresh interval (seconds)",
+                options=AUTO_REFRESH_INTERVALS,
+                value=30,
+                disabled=not auto_refresh
+            )
+        
+        # Pick up the shared frame for this session's sources, re-synced once the TTL expires
+        entry = None
+        if st.session_state.gsheet_connected and data_source:
+            entry, errors = load_sheet_sources(
+                st.session_state.service_account_info,
+                data_source["sources"],
+                ttl=float("inf") if auto_refresh else cache_ttl,
+                incremental=incremental_sync
+            )
+            for label, error in errors.items():
+                st.sidebar.error(f"❌ Sync failed for {label}: {error}")
         else:
-            st.sidebar.error("❌ Please upload service account file and enter sheet URL")
-    
-    # Use demo data if no Google Sheets connection
-    if st.session_state.df is None:
-        st.session_state.df = create_demo_data()
-        if not st.session_state.gsheet_connected:
+            # Use demo data if no Google Sheets connection
+            entry, _ = load_email_data(ttl=cache_ttl)
             st.sidebar.info("📊 Using demo data. Connect to Google Sheets for live data.")
+        
+        # Keep showing the last good data when a re-sync fails
+        if entry is None and st.session_state.data_version is not None:
+            entry = peek_email_data(st.session_state.data_version[0])
+        if entry is None:
+            entry, _ = load_email_data(ttl=cache_ttl)
+        st.session_state.data_version = (entry["key"], entry["version"])
+        sheets = {}
+        if st.session_state.gsheet_connected and entry["key"] != DEMO_DATA_KEY:
+            for sheet in data_source["sources"]:
+                sheets[(extract_sheet_id(sheet["sheet_url"]), sheet["worksheet_name"])] = {
+                    "service_account_info": st.session_state.service_account_info, **sheet
+                }
+        source = frame_source(entry, sheets)
+        
+        queues = [queue for queue in map(_writeback_queues()["queues"].get, sheets) if queue is not None]
+        if queues:
+            waiting = sum(len(pending_edits(key)) for key in sheets)
+            queue_errors = [queue["error"] for queue in queues if queue["error"]]
+            if queue_errors:
+                st.sidebar.warning(f"⚠️ Write-back: {waiting} emails waiting to be saved ({queue_errors[0]})")
+            elif waiting:
+                st.sidebar.caption(f"✍️ Write-back: {waiting} emails waiting to be saved")
+            else:
+                st.sidebar.caption(f"✍️ Write-back: all edits saved ({sum(queue['written'] for queue in queues)} emails)")
+        
+        if st.session_state.gsheet_connected:
+            source_label = "🔗 Connected to Google Sheets"
+            if entry["throttled"]:
+                st.sidebar.warning(f"⏳ Google Sheets is rate limiting requests; showing cached data ({entry['throttled']})")
+            metrics = sheets_metrics()
+            st.sidebar.caption(
+                f"📶 Sheets API: {metrics['requests']} requests, {metrics['rate_limited']} rate limited (429), "
+                f"{metrics['retries']} retries, {metrics['throttled']} throttled"
+            )
+            sync_state = entry["sync_state"]
+            if entry["parts"]:
+                st.sidebar.caption(f"🧩 Combined {len(entry['parts'])} worksheets: {len(entry['df'])} rows")
+            elif sync_state:
+                delta = sync_state["last_delta"]
+                st.sidebar.caption(
+                    f"Last sync {sync_state['synced_at']} ({delta['mode']}): "
+                    f"{sync_state['synced_rows']} rows, +{delta['appended']} new, {delta['changed']} changed"
+                )
+        
+        if auto_refresh and entry["key"] != DEMO_DATA_KEY:
+            for sheet in data_source["sources"]:
+                worker = ensure_refresh_worker(
+                    st.session_state.service_account_info,
+                    sheet["sheet_url"],
+                    sheet["worksheet_name"],
+                    refresh_interval
+                )
+                if worker["error"]:
+                    st.sidebar.warning(f"⚠️ Auto-refresh ({sheet_source_label(sheet)}): {worker['error']}")
+            st.sidebar.info(f"Auto-refresh enabled (every {refresh_interval}s)")
+            parts = entry["parts"] or [entry]
+            watch_for_new_data({part["key"]: part["version"] for part in parts}, refresh_interval)
+    
+    elif data_source_type == "CSV file":
+        st.sidebar.subheader("📄 CSV File")
+        csv_file = st.sidebar.file_uploader(
+            "Upload email CSV",
+            type=['csv'],
+            help="A CSV export of the email tracking sheet, with the same columns"
+        )
+        if csv_file is not None:
+            entry, error = load_csv_data(csv_file.getvalue())
+            if entry is not None:
+                source = frame_source(entry)
+                source_label = f"📄 Reading {csv_file.name}"
+            else:
+                st.sidebar.error(f"❌ Could not read CSV: {error}")
+    
+    else:
+        st.sidebar.subheader("🗄️ SQL Database")
+        sql_name = st.sidebar.text_input(
+            "Database file",
+            value="emails.sqlite",
+            help=(
+                "SQLite file (or .duckdb file, with the duckdb package installed) holding the emails "
+                f"in the sheet layout, inside {SQL_DATA_DIR}"
+            )
+        )
+        sql_table = st.sidebar.text_input("Table name", value="emails")
+        sql_path, error = resolve_sql_path(sql_name) if sql_name else (None, None)
+        if error:
+            st.sidebar.error(f"❌ {error}")
+        
+        if st.sidebar.button(
+            "📥 Copy loaded data into this database",
+            help="Replace the table with the data from the last Google Sheets (or demo) load",
+            disabled=sql_path is None
+        ):
+            data_version = st.session_state.data_version
+            loaded = (data_version and peek_email_data(data_version[0])) or load_email_data(ttl=cache_ttl)[0]
+            try:
+                os.makedirs(SQL_DATA_DIR, exist_ok=True)
+                write_sql_table(loaded["df"], sql_path, sql_table)
+                st.sidebar.success(f"✅ Wrote {len(loaded['df'])} emails to {sql_table}")
+            except Exception as e:
+                st.sidebar.error(f"❌ Could not write to the database: {str(e)}")
+        
+        if sql_path:
+            source, error = open_sql_source(sql_path, sql_table)
+            if source is not None:
+                source_label = f"🗄️ Querying {os.path.basename(sql_path)}"
+            else:
+                st.sidebar.error(f"❌ {error}")
     
-    df = st.session_state.df
+    if source is None:
+        entry, _ = load_email_data(ttl=cache_ttl)
+        source = frame_source(entry)
+        st.sidebar.info("📊 Using demo data until the selected source is loaded.")
     
-    # Auto-refresh for Google Sheets
-    if st.session_state.gsheet_connected:
-        auto_refresh = st.sidebar.checkbox("🔄 Auto-refresh (30s)", value=False)
-        if auto_refresh:
-            st.sidebar.info("Auto-refresh enabled")
-            # Note: In a real implementation, you'd use st.rerun() with a timer
+    perf_lap("load data")
+    if source["backend"] == "frame":
+        prepare_search_index(source["entry"])
     
     # Main dashboard
+    totals = source_totals(source)
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
@@ -376,10 +3598,10 @@ def main():
             <h3 style="color: #667eea; margin: 0;">Total Emails</h3>
             <h1 style="margin: 10px 0; color: #2c3e50;">{}</h1>
         </div>
-        """.format(len(df)), unsafe_allow_html=True)
+        """.format(totals["total"]), unsafe_allow_html=True)
     
     with col2:
-        pending_count = len(df[df['Resolution Status'] == 'Pending'])
+        pending_count = totals["by_status"].get('Pending', 0)
         st.markdown("""
         <div class="metric-card">
             <h3 style="color: #e74c3c; margin: 0;">Pending</h3>
@@ -388,7 +3610,7 @@ def main():
         """.format(pending_count), unsafe_allow_html=True)
     
     with col3:
-        high_priority = len(df[df['Priority'] == 'High'])
+        high_priority = totals["by_priority"].get('High', 0)
         st.markdown("""
         <div class="metric-card">
             <h3 style="color: #ff4757; margin: 0;">High Priority</h3>
@@ -397,7 +3619,7 @@ def main():
         """.format(high_priority), unsafe_allow_html=True)
     
     with col4:
-        response_rate = len(df[df['Sent (Y/N)'] == 'Y']) / len(df) * 100 if len(df) > 0 else 0
+        response_rate = totals["sent"] / totals["total"] * 100 if totals["total"] > 0 else 0
         st.markdown("""
         <div class="metric-card">
             <h3 style="color: #27ae60; margin: 0;">Response Rate</h3>
@@ -414,27 +3636,27 @@ def main():
     with col1:
         selected_mailbox = st.selectbox(
             "📮 Mailbox",
-            options=["All"] + sorted(df["Company Main Email"].unique().tolist())
+            options=["All"] + source_options(source, "Company Main Email")
         )
     
     with col2:
         selected_priority = st.multiselect(
             "⚡ Priority",
-            options=sorted(df["Priority"].unique().tolist()),
+            options=source_options(source, "Priority"),
             default=[]
         )
     
     with col3:
         selected_status = st.multiselect(
             "📊 Status",
-            options=sorted(df["Resolution Status"].unique().tolist()),
+            options=source_options(source, "Resolution Status"),
             default=[]
         )
     
     with col4:
         selected_department = st.multiselect(
             "🏢 Department",
-            options=sorted(df["Department"].unique().tolist()),
+            options=source_options(source, "Department"),
             default=[]
         )
     
@@ -444,7 +3666,7 @@ def main():
     with col1:
         sort_by = st.selectbox(
             "📊 Sort by",
-            options=["Received Date", "Priority", "Resolution Status", "Department", "Email ID"],
+            options=SORT_OPTIONS,
             index=0
         )
     
@@ -464,104 +3686,86 @@ def main():
     
     st.markdown('</div>', unsafe_allow_html=True)
     
-    # Apply filters
-    filtered_df = df.copy()
+    perf_lap("summary & filter options")
     
-    if selected_mailbox != "All":
-        filtered_df = filtered_df[filtered_df["Company Main Email"] == selected_mailbox]
-    if selected_priority:
-        filtered_df = filtered_df[filtered_df["Priority"].isin(selected_priority)]
-    if selected_status:
-        filtered_df = filtered_df[filtered_df["Resolution Status"].isin(selected_status)]
-    if selected_department:
-        filtered_df = filtered_df[filtered_df["Department"].isin(selected_department)]
+    # Filtering, sorting and counting happen in the backend; rows are fetched a page at a time
+    view = open_view(source, {
+        "Company Main Email": [selected_mailbox] if selected_mailbox != "All" else [],
+        "Priority": selected_priority,
+        "Resolution Status": selected_status,
+        "Department": selected_department
+    }, sort_by, sort_order == "Ascending")
+    counts = view["counts"]
+    total_filtered = view_count(view)
+    export_key = (source["version"], view["filter_state"], sort_by, sort_order)
+    chart_key = (source["version"], view["filter_state"])
     
-    # Apply sorting
-    ascending = sort_order == "Ascending"
-    if sort_by == "Priority":
-        # Custom priority sorting
-        priority_order = {"High": 3, "Medium": 2, "Low": 1}
-        filtered_df["priority_num"] = filtered_df["Priority"].map(priority_order)
-        filtered_df = filtered_df.sort_values("priority_num", ascending=ascending)
-        filtered_df = filtered_df.drop("priority_num", axis=1)
-    else:
-        filtered_df = filtered_df.sort_values(sort_by, ascending=ascending)
+    perf_lap("filter & sort")
     
     # Display results
-    if filtered_df.empty:
+    if total_filtered == 0:
         st.warning("🔍 No emails match your current filters. Try adjusting the criteria.")
         return
     
     # Analytics Section
-    if len(filtered_df) > 0:
+    if total_filtered > 0:
         st.subheader("📈 Email Analytics")
         
         col1, col2 = st.columns(2)
         
         with col1:
             # Priority distribution
-            priority_counts = filtered_df['Priority'].value_counts()
-            fig1 = px.pie(
-                values=priority_counts.values,
-                names=priority_counts.index,
-                title="Priority Distribution",
-                color_discrete_map={"High": "#ff4757", "Medium": "#ffa726", "Low": "#66bb6a"}
-            )
-            fig1.update_layout(height=300)
+            fig1 = cached_figure(chart_key + ("priority",), lambda: priority_figure(counts))
             st.plotly_chart(fig1, use_container_width=True)
         
         with col2:
             # Status by department
-            status_dept = filtered_df.groupby(['Department', 'Resolution Status']).size().reset_index(name='Count')
-            fig2 = px.bar(
-                status_dept,
-                x='Department',
-                y='Count',
-                color='Resolution Status',
-                title="Status by Department",
-                color_discrete_map={"Completed": "#27ae60", "In Progress": "#f39c12", "Pending": "#e74c3c"}
-            )
-            fig2.update_layout(height=300)
+            fig2 = cached_figure(chart_key + ("status_department",), lambda: status_department_figure(counts))
             st.plotly_chart(fig2, use_container_width=True)
     
+    perf_lap("charts")
+    
     # Display emails by mailbox
     mailboxes_to_show = (
         [selected_mailbox] if selected_mailbox != "All"
-        else filtered_df["Company Main Email"].unique().tolist()
+        else source_options(source, "Company Main Email")
     )
     
     for mailbox in sorted(mailboxes_to_show):
-        subset = filtered_df[filtered_df["Company Main Email"] == mailbox].reset_index(drop=True)
+        mailbox_count = view_count(view, mailbox)
         
-        if subset.empty:
+        if mailbox_count == 0:
             continue
             
         # Mailbox header with stats
-        pending_in_mailbox = len(subset[subset['Resolution Status'] == 'Pending'])
-        high_priority_in_mailbox = len(subset[subset['Priority'] == 'High'])
+        pending_in_mailbox = counts["mailbox_status"].get((mailbox, 'Pending'), 0)
+        high_priority_in_mailbox = counts["mailbox_priority"].get((mailbox, 'High'), 0)
         
         st.markdown(f"""
         <div class="mailbox-header">
             <h2 style="margin: 0; font-size: 24px;">📮 {mailbox}</h2>
             <p style="margin: 5px 0 0 0; opacity: 0.9;">
-                {len(subset)} emails | {pending_in_mailbox} pending | {high_priority_in_mailbox} high priority
+                {mailbox_count} emails | {pending_in_mailbox} pending | {high_priority_in_mailbox} high priority
             </p>
         </div>
         """, unsafe_allow_html=True)
         
         if view_mode in ["Card View", "Both"]:
             # Card view
-            for _, email in subset.iterrows():
-                render_email_card(email)
+            render_card_page(
+                mailbox_count,
+                lambda offset, limit: view_rows(view, offset, limit, mailbox=mailbox),
+                key=mailbox
+            )
         
         if view_mode in ["Table View", "Both"]:
             # Table view
             st.subheader(f"📊 Table View - {mailbox}")
             
             # Column selection for table
-            available_columns = df.columns.tolist()
+            available_columns = source["columns"]
             default_columns = [
-                "Email ID", "Received Date", "From (Sender Name)", 
+                "Email ID", RECEIVED_AT, "From (Sender Name)", 
                 "Subject", "Priority", "Resolution Status", "Assigned To"
             ]
             
@@ -573,13 +3777,18 @@ def main():
             )
             
             if selected_columns:
-                display_df = subset[selected_columns]
+                display_df = view_rows(view, 0, MAILBOX_TABLE_ROWS, selected_columns, mailbox)
                 st.dataframe(
                     display_df,
                     height=300,
                     use_container_width=True,
                     hide_index=True
                 )
+                if mailbox_count > MAILBOX_TABLE_ROWS:
+                    st.caption(
+                        f"Showing the first {MAILBOX_TABLE_ROWS} of {mailbox_count} emails; "
+                        "page through the rest in the Complete Data Table"
+                    )
             
         # Download section
         col1, col2, col3 = st.columns(3)
@@ -587,76 +3796,70 @@ def main():
         with col1:
             st.download_button(
                 label=f"📄 Download CSV - {mailbox.split('@')[0]}",
-                data=subset.to_csv(index=False).encode("utf-8"),
+                data=lazy_export(view, "CSV", export_key, mailbox),
                 file_name=f"emails_{mailbox.replace('@','_at_')}_{datetime.now().strftime('%Y%m%d')}.csv",
                 mime="text/csv",
-                key=f"csv_{mailbox}"
+                key=f"csv_{mailbox}",
+                on_click="ignore"
             )
         
         with col2:
             st.download_button(
                 label=f"📋 Download JSON - {mailbox.split('@')[0]}",
-                data=subset.to_json(orient='records', indent=2).encode("utf-8"),
+                data=lazy_export(view, "JSON", export_key, mailbox),
                 file_name=f"emails_{mailbox.replace('@','_at_')}_{datetime.now().strftime('%Y%m%d')}.json",
                 mime="application/json",
-                key=f"json_{mailbox}"
+                key=f"json_{mailbox}",
+                on_click="ignore"
             )
         
         with col3:
             # Excel download would require additional library
             st.info("📊 Excel export available with openpyxl")
     
+    perf_lap("mailbox tabs")
+    
     # Combined data section
     st.markdown("---")
     st.subheader("📊 Combined Analytics & Export")
     
+    sla = view_sla(view)
     col1, col2 = st.columns(2)
     
     with col1:
         # Timeline chart
-        if 'Received Date' in filtered_df.columns:
-            daily_counts = filtered_df.groupby('Received Date').size().reset_index(name='Email Count')
-            fig3 = px.line(
-                daily_counts,
-                x='Received Date',
-                y='Email Count',
-                title="Daily Email Volume",
-                markers=True
-            )
-            fig3.update_layout(height=250)
+        if counts["daily"]:
+            fig3 = cached_figure(chart_key + ("volume",), lambda: volume_figure(counts["daily"]))
             st.plotly_chart(fig3, use_container_width=True)
     
     with col2:
         # Response time analysis
-        sent_emails = filtered_df[filtered_df['Sent (Y/N)'] == 'Y']
-        if len(sent_emails) > 0:
-            # Mock response time data for demo
-            response_times = [2, 4, 1, 6, 3, 2, 5, 1, 3, 4][:len(sent_emails)]
-            fig4 = px.histogram(
-                x=response_times,
-                title="Response Time Distribution (Hours)",
-                nbins=10
-            )
-            fig4.update_layout(height=250)
+        if sla["responded"]:
+            fig4 = cached_figure(chart_key + ("response_time",), lambda: response_time_figure(sla["histogram"]))
             st.plotly_chart(fig4, use_container_width=True)
     
+    perf_lap("timeline charts")
+    
+    render_sla_report(sla)
+    
+    perf_lap("response times")
+    
     # Advanced search
     st.subheader("🔍 Advanced Search")
     search_term = st.text_input(
-        "Search in subjects and summaries",
-        placeholder="Enter keywords to search..."
+        "Search in subjects, summaries, drafted responses and notes",
+        placeholder="Enter keywords to search (all words must match, prefixes allowed)..."
     )
     
     if search_term:
-        search_results = filtered_df[
-            filtered_df['Subject'].str.contains(search_term, case=False, na=False) |
-            filtered_df['Email Summary'].str.contains(search_term, case=False, na=False)
-        ]
-        st.write(f"Found {len(search_results)} emails matching '{search_term}'")
+        search_results = view_search(view, search_term)
+        result_order = "best matches first" if search_results["ranked"] else f"sorted by {sort_by}"
+        st.write(f"Found {search_results['total']} emails matching '{search_term}' ({result_order})")
         
-        if len(search_results) > 0:
-            for _, email in search_results.iterrows():
-                render_email_card(email)
+        if search_results["total"] > 0:
+            render_card_page(search_results["total"], search_results["fetch"], key="search_results")
+    
+    perf_lap("search")
     
     # Bulk actions
     st.subheader("🔧 Bulk Actions")
@@ -667,18 +3870,22 @@ def main():
             st.success("✅ All emails marked as read!")
     
     with col2:
-        if st.button("📝 Generate Bulk Responses"):
-            st.success("✅ Bulk responses generated!")
+        st.button(
+            "📝 Generate Bulk Responses",
+            on_click=request_bulk_action,
+            args=("draft_responses",),
+            help="Drafts a response for every email matching the filters that has none yet"
+        )
     
     with col3:
         if st.button("📊 Export Analytics Report"):
             # Generate analytics report
             report_data = {
-                "total_emails": len(filtered_df),
-                "by_priority": filtered_df['Priority'].value_counts().to_dict(),
-                "by_status": filtered_df['Resolution Status'].value_counts().to_dict(),
-                "by_department": filtered_df['Department'].value_counts().to_dict(),
-                "response_rate": len(filtered_df[filtered_df['Sent (Y/N)'] == 'Y']) / len(filtered_df) * 100
+                "total_emails": counts["total"],
+                "by_priority": counts["by_priority"],
+                "by_status": counts["by_status"],
+                "by_department": counts["by_department"],
+                "response_rate": counts["sent"] / counts["total"] * 100
             }
             
             st.download_button(
@@ -688,6 +3895,21 @@ def main():
                 mime="application/json"
             )
     
+    # Bulk edits can touch every row of the sheet, so they wait for a confirmation
+    if st.session_state.get("bulk_action") == "draft_responses":
+        saving = " and saves the drafts to Google Sheets" if source.get("sheets") else ""
+        st.warning(
+            f"This drafts a response for each of the {counts['total']} emails matching the filters "
+            f"that has none yet{saving}."
+        )
+        confirm_col, cancel_col = st.columns(2)
+        confirm_col.button(
+            "✅ Draft responses", type="primary", on_click=run_bulk_action, args=(view, "draft_responses")
+        )
+        cancel_col.button("Cancel", on_click=request_bulk_action, args=(None,))
+    
+    perf_lap("bulk actions")
+    
     # Full dataset download
     st.markdown("---")
     st.subheader("📦 Complete Dataset Export")
@@ -697,17 +3919,33 @@ def main():
     with col1:
         st.download_button(
             label="📄 Download Complete CSV",
-            data=filtered_df.to_csv(index=False).encode("utf-8"),
+            data=lazy_export(view, "CSV", export_key),
             file_name=f"complete_email_data_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-            mime="text/csv"
+            mime="text/csv",
+            on_click="ignore"
         )
     
     with col2:
         st.download_button(
             label="📋 Download Complete JSON",
-            data=filtered_df.to_json(orient='records', indent=2).encode("utf-8"),
+            data=lazy_export(view, "JSON", export_key),
             file_name=f"complete_email_data_{datetime.now().strftime('%Y%m%d_%H%M')}.json",
-            mime="application/json"
+            mime="application/json",
+            on_click="ignore"
+        )
+        
+        # Compressed and line-delimited variants for large exports
+        large_format = st.selectbox(
+            "Large export format",
+            options=["NDJSON", "CSV (gzip)", "NDJSON (gzip)"],
+            index=2
+        )
+        st.download_button(
+            label=f"🗜️ Download Complete {large_format}",
+            data=lazy_export(view, large_format, export_key),
+            file_name=f"complete_email_data_{datetime.now().strftime('%Y%m%d_%H%M')}.{EXPORT_FORMATS[large_format]['extension']}",
+            mime=EXPORT_FORMATS[large_format]["mime"],
+            on_click="ignore"
         )
     
     with col3:
@@ -720,8 +3958,8 @@ def main():
                 "departments": selected_department if selected_department else "All departments"
             },
             "results": {
-                "total_filtered": len(filtered_df),
-                "total_original": len(df)
+                "total_filtered": total_filtered,
+                "total_original": totals["total"]
             }
         }
         
@@ -732,71 +3970,31 @@ def main():
             mime="application/json"
         )
     
+    perf_lap("exports")
+    
     # Show full table view at bottom
     if view_mode == "Table View" or st.checkbox("📋 Show Complete Data Table", value=False):
         st.subheader("📊 Complete Data Table")
-        
-        # Advanced table configuration
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            table_columns = st.multiselect(
-                "Select columns to display",
-                options=filtered_df.columns.tolist(),
-                default=["Email ID", "Received Date", "From (Sender Name)", "Subject", 
-                        "Priority", "Resolution Status", "Department", "Assigned To"],
-                key="main_table_columns"
-            )
-        
-        with col2:
-            rows_per_page = st.selectbox(
-                "Rows per page",
-                options=[10, 25, 50, 100, "All"],
-                index=1
-            )
-        
-        if table_columns:
-            display_df = filtered_df[table_columns].copy()
-            
-            # Pagination
-            if rows_per_page != "All":
-                total_rows = len(display_df)
-                total_pages = (total_rows - 1) // rows_per_page + 1
-                
-                if total_pages > 1:
-                    page = st.selectbox(
-                        f"Page (1-{total_pages})",
-                        options=list(range(1, total_pages + 1)),
-                        index=0
-                    )
-                    
-                    start_idx = (page - 1) * rows_per_page
-                    end_idx = min(start_idx + rows_per_page, total_rows)
-                    display_df = display_df.iloc[start_idx:end_idx]
-                    
-                    st.info(f"Showing rows {start_idx + 1}-{end_idx} of {total_rows}")
-            
-            st.dataframe(
-                display_df,
-                height=400,
-                use_container_width=True,
-                hide_index=True
-            )
+        render_data_table(view, total_filtered, export_key)
+    
+    perf_lap("data table")
     
     # Email details modal simulation
     st.markdown("---")
     st.subheader("🔍 Email Details Viewer")
     
-    if len(filtered_df) > 0:
-        email_ids = filtered_df['Email ID'].tolist()
+    if total_filtered > 0:
+        email_ids = view_rows(view, 0, DETAIL_PICKER_ROWS, ["Email ID"])['Email ID'].tolist()
         selected_email_id = st.selectbox(
             "Select an email to view full details",
             options=email_ids,
             key="email_detail_selector"
         )
+        if total_filtered > DETAIL_PICKER_ROWS:
+            st.caption(f"Listing the first {DETAIL_PICKER_ROWS} emails in the current order; narrow the filters to reach others")
         
-        if selected_email_id:
-            email_details = filtered_df[filtered_df['Email ID'] == selected_email_id].iloc[0]
+        email_details = view_lookup(view, selected_email_id) if selected_email_id else None
+        if email_details is not None:
             
             # Create detailed view
             col1, col2 = st.columns([2, 1])
@@ -806,7 +4004,7 @@ def main():
                 ### 📧 Email Details: {email_details['Email ID']}
                 
                 **📨 From:** {email_details['From (Sender Name)']} ({email_details['From (Sender Email)']})  
-                **📅 Received:** {email_details['Received Date']} at {email_details['Received Time']}  
+                **📅 Received:** {format_received(email_details[RECEIVED_AT])}  
                 **📋 Subject:** {email_details['Subject']}  
                 **🏢 Department:** {email_details['Department']}  
                 **⚡ Priority:** {email_details['Priority']}  
@@ -818,7 +4016,7 @@ def main():
                 **💬 Drafted Response:**
                 {email_details['Drafted Response']}
                 
-                {"**✅ Sent Summary:** " + email_details['Sent Email Summary'] if email_details['Sent (Y/N)'] == 'Y' else ""}
+                {"**✅ Sent Summary:** " + email_details['Sent Email Summary'] if email_details['Sent (Y/N)'] else ""}
                 
                 **📝 Notes:**
                 {email_details['Notes/Comments']}
@@ -830,68 +4028,96 @@ def main():
                 
                 **👤 Assigned To:** {email_details['Assigned To']}  
                 **📊 Status:** {email_details['Resolution Status']}  
-                **✅ Response Approved:** {email_details['Response Approved (Y/N)']}  
+                **✅ Response Approved:** {format_flag(email_details['Response Approved (Y/N)'])}  
                 {"**👨‍💼 Approver:** " + email_details['Approver Name'] if email_details['Approver Name'] else ""}  
-                **📧 Sent:** {email_details['Sent (Y/N)']}  
-                {"**📅 Sent:** " + email_details['Sent Date'] + " at " + email_details['Sent Time'] if email_details['Sent (Y/N)'] == 'Y' else ""}  
-                **📎 Attachments:** {email_details['Attachments Received (Y/N)']}  
-                {"**📄 Files:** " + email_details['Attachment Details'] if email_details['Attachments Received (Y/N)'] == 'Y' else ""}  
-                **🔄 Follow-up Required:** {email_details['Follow-up Required (Y/N)']}  
-                {"**📅 Follow-up Due:** " + email_details['Follow-up Due Date'] if email_details['Follow-up Required (Y/N)'] == 'Y' else ""}
+                **📧 Sent:** {format_flag(email_details['Sent (Y/N)'])}  
+                {"**📅 Sent:** " + email_details['Sent Date'] + " at " + email_details['Sent Time'] if email_details['Sent (Y/N)'] else ""}  
+                **📎 Attachments:** {format_flag(email_details['Attachments Received (Y/N)'])}  
+                {"**📄 Files:** " + email_details['Attachment Details'] if email_details['Attachments Received (Y/N)'] else ""}  
+                **🔄 Follow-up Required:** {format_flag(email_details['Follow-up Required (Y/N)'])}  
+                {"**📅 Follow-up Due:** " + email_details['Follow-up Due Date'] if email_details['Follow-up Required (Y/N)'] else ""}
                 """)
                 
                 # Action buttons
                 st.markdown("### 🎯 Quick Actions")
                 
-                if st.button("✅ Approve Response", key=f"approve_{selected_email_id}"):
-                    st.success("Response approved!")
+                selected_email = email_details.to_frame().T
+                
+                st.button("✅ Approve Response", key=f"approve_{selected_email_id}",
+                          on_click=run_email_action, args=(source, selected_email, "approve"))
                 
-                if st.button("📧 Send Email", key=f"send_{selected_email_id}"):
-                    st.success("Email sent successfully!")
+                st.button("📧 Send Email", key=f"send_{selected_email_id}",
+                          on_click=run_email_action, args=(source, selected_email, "send"))
                 
-                if st.button("🔄 Request Follow-up", key=f"followup_{selected_email_id}"):
-                    st.success("Follow-up scheduled!")
+                st.button("🔄 Request Follow-up", key=f"followup_{selected_email_id}",
+                          on_click=run_email_action, args=(source, selected_email, "follow_up"))
                 
-                if st.button("📝 Add Note", key=f"note_{selected_email_id}"):
-                    note_text = st.text_area("Add a note:", key=f"note_text_{selected_email_id}")
-                    if note_text:
-                        st.success("Note added!")
+                st.text_area("Add a note:", key=f"note_text_{selected_email_id}")
+                st.button("📝 Add Note", key=f"note_{selected_email_id}",
+                          on_click=run_email_action,
+                          args=(source, selected_email, "note", f"note_text_{selected_email_id}"))
 
+    perf_lap("email details")
+    
     # Footer with connection status
     st.markdown("---")
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        if st.session_state.gsheet_connected:
-            st.success("🔗 Connected to Google Sheets")
+        if source_label:
+            st.success(source_label)
         else:
             st.info("📊 Using demo data")
     
     with col2:
-        st.info(f"📈 Displaying {len(filtered_df)} of {len(df)} emails")
+        st.info(f"📈 Displaying {total_filtered} of {totals['total']} emails")
     
     with col3:
         if st.button("🔄 Refresh Data"):
-            if st.session_state.gsheet_connected and st.session_state.service_account_info and sheet_url:
+            if data_source_type == "Google Sheets" and st.session_state.gsheet_connected and st.session_state.service_account_info and data_source:
                 with st.spinner("Refreshing from Google Sheets..."):
-                    df_new, error = connect_to_gsheets(
+                    entry, errors = load_sheet_sources(
                         st.session_state.service_account_info, 
-                        sheet_url, 
-                        worksheet_name
+                        data_source["sources"],
+                        force=True,
+                        incremental=incremental_sync
                     )
-                    if df_new is not None:
-                        st.session_state.df = df_new
+                    if entry is not None:
                         st.success("✅ Data refreshed!")
                         st.rerun()
                     else:
-                        st.error(f"❌ Refresh failed: {error}")
+                        st.error(f"❌ Refresh failed: {errors}")
+            elif source_label:
+                # CSV and SQL sources are re-read (or re-queried) on the next run
+                st.rerun()
             else:
-                st.session_state.df = create_demo_data()
+                load_email_data(force=True)
                 st.success("✅ Demo data refreshed!")
                 st.rerun()
+    perf_lap("footer")
+
+def main():
+    start_perf_run()
+    try:
+        render_dashboard()
+    finally:
+        # Action buttons end the run with st.rerun() / st.stop(); record those reruns too
+        record = finish_perf_run()
+    if st.sidebar.checkbox(
+        "⏱️ Show performance panel",
+        value=False,
+        help="Time and memory per stage of this rerun, rolling percentiles and metric exports"
+    ):
+        render_perf_panel(record)
 
 if __name__ == "__main__":
     main()
 
 # Requirements for this enhanced dashboard:
 # pip install streamlit pandas gspread google-auth plotly
+# Optional, for .duckdb SQL data sources:
+# pip install duckdb
+# SQL data sources are files inside EMAIL_DASHBOARD_SQL_DIR (default: databases/ next to app.py)
+# Multi-process serving, with filters, search, SLA reports and exports in
+# worker processes over a shared-memory copy of the data (see dataplane.py):
+# EMAIL_DASHBOARD_WORKERS=4 streamlit run app.py
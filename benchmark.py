@@ -0,0 +1,312 @@
+"""Headless benchmarks for the dashboard's data paths at synthetic scale.
+
+Generates seeded synthetic emails (create_demo_data) at each size and times
+the paths a dashboard run goes through: loading through a local stand-in for
+the Google Sheets worksheet and from CSV, the filter/sort view, aggregates,
+the response-time/SLA report, search, card HTML and exports. Each step
+reports its best wall time over --repeat runs and the peak memory of one
+extra traced run: Python/NumPy allocations (tracemalloc) and, on Linux,
+growth of the process RSS, which also covers Arrow string buffers.
+
+With --workers, the multi-process data plane is timed too, including
+CONCURRENT_SESSIONS sessions opening views at once in-process and through
+the worker pool (the pool's memory is not part of the traced numbers).
+
+    python benchmark.py                                  # 1k, 100k and 1M rows
+    python benchmark.py --rows 1000 100000 --repeat 3 --json results.json
+    python benchmark.py --rows 100000 --compare results.json
+    python benchmark.py --rows 1000000 --workers 4
+"""
+import argparse
+import gc
+import json
+import os
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit.config
+import streamlit.logger
+
+# Importing app runs the Streamlit script in bare mode; keep its warnings quiet.
+# The config is parsed first, since parsing it resets the log level.
+os.environ.setdefault("STREAMLIT_GLOBAL_SHOW_WARNING_ON_DIRECT_EXECUTION", "false")
+streamlit.config.get_config_options()
+streamlit.logger.set_log_level("error")
+
+import app
+
+DEFAULT_ROWS = [1000, 100000, 1000000]
+SEARCH_QUERY = "payment processing"
+CARD_ROWS = 1000
+CONCURRENT_SESSIONS = 8
+# Steps this much (and at least REGRESSION_MIN_SECONDS) slower than in the
+# --compare results are flagged
+REGRESSION_RATIO = 1.2
+REGRESSION_MIN_SECONDS = 0.005
+
+class LocalWorksheet:
+    """In-memory stand-in for a gspread Worksheet, serving the sheet's cell values"""
+
+    def __init__(self, values, title="Sheet1"):
+        self.values = values
+        self.title = title
+        self.row_count = len(values)
+
+    def get_all_values(self):
+        return [list(row) for row in self.values]
+
+    def row_values(self, row):
+        return list(self.values[row - 1])
+
+    def col_values(self, col):
+        return [row[col - 1] for row in self.values]
+
+    def batch_get(self, ranges, **kwargs):
+        # Ranges come as "A<first row>:<last column><last row>"
+        result = []
+        for cell_range in ranges:
+            first, last = cell_range.split(":")
+            start = int(first.lstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+            stop = int(last.lstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+            result.append([list(row) for row in self.values[start - 1:stop]])
+        return result
+
+def sheet_values(df):
+    """The worksheet grid (header row first) for a typed frame, sharing repeated cell strings"""
+    sheet = app.to_sheet_format(df)
+    columns = []
+    for column in sheet.columns:
+        codes, uniques = pd.factorize(sheet[column])
+        columns.append(np.asarray(uniques, dtype=object)[codes])
+    return [list(sheet.columns)] + [list(row) for row in zip(*columns)]
+
+_accounts = iter(range(1, 1 << 62))
+
+def stand_in_account():
+    """Service account info for one stand-in load, with its own (unused) Sheets quota buckets"""
+    number = next(_accounts)
+    return {"client_email": f"benchmark-{number}@local", "project_id": f"benchmark-{number}"}
+
+def fresh_entry(df, name):
+    """A shared-cache entry for df without any derived structures built yet"""
+    cache = app._shared_data_cache()
+    with cache["lock"]:
+        return app._store_data_entry(cache, ("benchmark", name, len(df)), df, None)
+
+def concurrent_sessions(source, filters):
+    """Open CONCURRENT_SESSIONS differently sorted views and their SLA reports at once, a thread per session"""
+    def session(number):
+        view = app.open_view(source, filters, app.SORT_OPTIONS[number % len(app.SORT_OPTIONS)], number % 2 == 0)
+        return app.view_sla(view)
+    with ThreadPoolExecutor(CONCURRENT_SESSIONS) as pool:
+        return list(pool.map(session, range(CONCURRENT_SESSIONS)))
+
+def benchmark_steps(df, workers=0):
+    """(name, setup, run) for every measured step; setup runs untimed before each run"""
+    values = sheet_values(df)
+    csv_bytes = app.to_sheet_format(df).to_csv(index=False).encode("utf-8")
+    filters = {"Priority": ["High", "Medium"], "Resolution Status": ["Pending", "In Progress"]}
+
+    # In-process sources name their backend, so they stay in-process with --workers too
+    warm = app.frame_source(fresh_entry(df, "warm"), backend="frame")
+    app.open_view(warm, filters, "Received Date", False)
+    view = app.open_view(warm, {}, "Received Date", False)
+    filtered = app.open_view(warm, filters, "Received Date", False)
+    response_times = app.build_response_times(df)
+    search_index = app.build_search_index(df)
+    card_rows = app.view_rows(view, 0, CARD_ROWS)
+    state = {}
+
+    def cold_source():
+        state["source"] = app.frame_source(fresh_entry(df, "cold"), backend="frame")
+
+    def clear_csv_cache():
+        cache = app._shared_data_cache()
+        with cache["lock"]:
+            for key in [key for key in cache["entries"] if key[0] == "csv"]:
+                del cache["entries"][key]
+
+    def clear_card_cache():
+        app._card_html_cache()["entries"].clear()
+
+    steps = [
+        ("load: sheets stand-in", None, lambda: app.fetch_worksheet(stand_in_account(), LocalWorksheet(values))),
+        ("load: csv", clear_csv_cache, lambda: app.load_csv_data(csv_bytes)),
+        ("filter index", None, lambda: app.build_filter_index(df)),
+        ("sort keys", None, lambda: app.build_sort_keys(df)),
+        ("aggregates: all rows", None, lambda: app.build_aggregates(df)),
+        ("aggregates: filtered", None, lambda: app.count_rows(df, filtered["positions"])),
+        ("view: cold (index, aggregates, sort)", cold_source, lambda: app.open_view(state["source"], filters, "Priority", True)),
+        ("view: warm filter + sort", None, lambda: app.open_view(warm, filters, "Priority", True)),
+        ("response times", None, lambda: app.build_response_times(df)),
+        ("sla report: all rows", None, lambda: app.sla_report(response_times)),
+        ("sla report: filtered", None, lambda: app.sla_report(response_times, filtered["positions"])),
+        ("search index", None, lambda: app.build_search_index(df)),
+        ("search", None, lambda: app.search_emails(search_index, SEARCH_QUERY, filtered["positions"])),
+        (f"card html: {len(card_rows)} rows", clear_card_cache, lambda: app.build_card_html(card_rows))
+    ]
+    for export_format in ["CSV", "NDJSON", "JSON", "CSV (gzip)"]:
+        steps.append((
+            f"export: {export_format}", None,
+            lambda export_format=export_format: app.build_export(app.view_chunks(view), export_format)
+        ))
+    
+    if workers:
+        def start_shared():
+            # Outside the timed steps: start the pool, attach the dataset in each
+            # worker and wait for their search indexes, then forget the memoized
+            # view answers so the workers are what gets timed
+            if "shared" not in state:
+                state["shared"] = app.frame_source(fresh_entry(df, "shared"), backend="shared")
+                dataset = state["shared"]["dataset"]
+                with ThreadPoolExecutor(CONCURRENT_SESSIONS) as pool:
+                    list(pool.map(
+                        lambda _: app.dataplane.run(workers, app.dataplane.search_task, dataset, {}, SEARCH_QUERY),
+                        range(CONCURRENT_SESSIONS)
+                    ))
+            state["shared"]["entry"]["derived"].pop("dataplane_views", None)
+
+        steps += [
+            ("dataplane: publish", None, lambda: app.dataplane.publish(
+                df, ("benchmark", "publish"), len(df), app.DATA_CACHE_MAX_ENTRIES
+            )),
+            ("dataplane: view", start_shared, lambda: app.open_view(state["shared"], filters, "Priority", True)),
+            (f"{CONCURRENT_SESSIONS} sessions: in-process", None, lambda: concurrent_sessions(warm, filters)),
+            (
+                f"{CONCURRENT_SESSIONS} sessions: {workers} workers", start_shared,
+                lambda: concurrent_sessions(state["shared"], filters)
+            )
+        ]
+    return steps
+
+def measure_memory(setup, run):
+    """Peak (tracemalloc bytes, RSS growth bytes or None) of one run"""
+    if setup is not None:
+        setup()
+    gc.collect()
+    start_rss = app._rss_bytes()
+    peak_rss = [start_rss]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.005):
+            peak_rss[0] = max(peak_rss[0], app._rss_bytes())
+
+    sampler = None
+    if start_rss is not None:
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        done.set()
+        if sampler is not None:
+            sampler.join()
+    if start_rss is None:
+        return peak, None
+    return peak, max(peak_rss[0], app._rss_bytes()) - start_rss
+
+def measure(setup, run, repeat):
+    """Best wall time in seconds over repeat runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def run_benchmarks(rows, mailboxes, seed, repeat, trace_memory=True, report=print, workers=0):
+    """Run every step at each size; returns one result dict per (size, step)"""
+    results = []
+
+    def record(size, step, seconds, memory):
+        result = {"rows": size, "step": step, "seconds": seconds}
+        if memory is not None:
+            result["peak_mib"] = memory[0] / 1024 ** 2
+            result["rss_mib"] = None if memory[1] is None else memory[1] / 1024 ** 2
+        results.append(result)
+        report(format_result(result))
+
+    # The pool size the shared source's steps run with; restored for the caller
+    previous_workers = app.DATAPLANE_WORKERS
+    app.DATAPLANE_WORKERS = workers
+    try:
+        for size in rows:
+            report(f"\n{size:,} rows, {mailboxes} mailboxes (seed {seed})")
+            started = time.perf_counter()
+            df = app.create_demo_data(size, mailboxes, seed=seed)
+            record(size, "generate", time.perf_counter() - started, None)
+            for step, setup, run in benchmark_steps(df, workers):
+                seconds = measure(setup, run, repeat)
+                record(size, step, seconds, measure_memory(setup, run) if trace_memory else None)
+            del df
+            app._shared_data_cache()["entries"].clear()
+            app._export_cache()["entries"].clear()
+            app._card_html_cache()["entries"].clear()
+            gc.collect()
+    finally:
+        app.DATAPLANE_WORKERS = previous_workers
+    return results
+
+def format_result(result, baseline=None):
+    """One report line: step, time, memory and the ratio to a baseline result"""
+    line = f"  {result['step']:<40} {result['seconds'] * 1000:>10.1f} ms"
+    if "peak_mib" in result:
+        line += f" {result['peak_mib']:>9.1f} MiB peak"
+        if result["rss_mib"] is not None:
+            line += f" {result['rss_mib']:>9.1f} MiB RSS"
+    if baseline is not None and baseline["seconds"] > 0:
+        line += f"  x{result['seconds'] / baseline['seconds']:.2f}" + ("  REGRESSION" if is_regression(result, baseline) else "")
+    return line
+
+def is_regression(result, baseline):
+    """Whether a step got meaningfully slower than its baseline"""
+    slower = result["seconds"] - baseline["seconds"]
+    return slower > REGRESSION_MIN_SECONDS and result["seconds"] > baseline["seconds"] * REGRESSION_RATIO
+
+def compare_results(results, baseline_results, report=print):
+    """Print each step against the same (rows, step) of an earlier run, flagging slowdowns"""
+    baseline = {(result["rows"], result["step"]): result for result in baseline_results}
+    report(f"\nCompared with the baseline (slower than x{REGRESSION_RATIO} is flagged):")
+    regressions = 0
+    for result in results:
+        previous = baseline.get((result["rows"], result["step"]))
+        if previous is None:
+            continue
+        report(f"{result['rows']:>9,}" + format_result(result, previous))
+        regressions += is_regression(result, previous)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="Dataset sizes to run")
+    parser.add_argument("--mailboxes", type=int, default=20, help="Number of company mailboxes")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per step (the best is reported)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced memory run of each step")
+    parser.add_argument("--workers", type=int, default=0, help="Also time the data plane with this many worker processes")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.rows, args.mailboxes, args.seed, args.repeat, not args.no_memory, workers=args.workers)
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare_results(results, json.load(baseline))
+        raise SystemExit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
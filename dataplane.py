@@ -0,0 +1,212 @@
+"""Shared-memory data plane for serving the dashboard from several processes.
+
+Streamlit runs every session of app.py in one process, so the pandas work of
+one session holds the GIL for all of them. In multi-process mode
+(EMAIL_DASHBOARD_WORKERS=N) each loaded data version is published once as an
+uncompressed Arrow IPC file in shared memory (/dev/shm where available), and
+filters, aggregates, sorting, search, SLA reports and exports run in a pool of
+N worker processes that memory-map it: the column buffers are the same
+physical pages in every process, so attaching a dataset copies nothing.
+Workers answer with row positions, counts or finished payloads; the Streamlit
+process gathers only the rows it shows from its own frame.
+
+The tasks live here rather than in app.py because Streamlit runs the script as
+__main__, and pool workers can only unpickle functions of an importable
+module. Workers import app for its data engine (the dashboard itself only runs
+under __name__ == "__main__") and keep the structures they derive (filter
+index, sort keys, search index) per attached dataset, starting on the search
+index in the background as soon as a dataset is attached. A dataset that
+replaces one the worker still holds (after edits or an incremental sync)
+extends, patches or keeps those structures instead of rebuilding them.
+"""
+import atexit
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc
+
+DATAPLANE_DIR = os.environ.get("EMAIL_DASHBOARD_DATAPLANE_DIR") or (
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+)
+# Datasets a worker keeps attached (with what it derived from them)
+WORKER_DATASETS = 2
+
+# Serving process: the published file of every data key, oldest first
+_published = OrderedDict()
+_publish_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+# Worker process: attached datasets as app data entries, least recently used first
+_attached = OrderedDict()
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def publish(df, key, version, keep):
+    """Write a typed frame to the data plane as an Arrow IPC file and return its path.
+
+    Only the newest version of each key is kept, for at most keep keys. A worker
+    still mapping a removed file can read it until it lets go; new tasks for it
+    fail with FileNotFoundError.
+    """
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+    path = os.path.join(DATAPLANE_DIR, f"email-dashboard-{os.getpid()}-{digest}-{version}.arrow")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(path + ".tmp", "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(path + ".tmp", path)
+
+    with _publish_lock:
+        stale = [_published.pop(key)] if key in _published else []
+        _published[key] = path
+        while len(_published) > keep:
+            stale.append(_published.popitem(last=False)[1])
+    for old in stale:
+        _remove(old)
+    return path
+
+@atexit.register
+def _remove_published():
+    with _publish_lock:
+        for path in _published.values():
+            _remove(path)
+        _published.clear()
+
+def _init_worker():
+    # Importing app runs the Streamlit script in bare mode; keep its warnings quiet.
+    # The config is parsed first, since parsing it resets the log level.
+    os.environ.setdefault("STREAMLIT_GLOBAL_SHOW_WARNING_ON_DIRECT_EXECUTION", "false")
+    # Workers serve their datasets in-process instead of starting pools of their own
+    os.environ.pop("EMAIL_DASHBOARD_WORKERS", None)
+    import streamlit.config
+    import streamlit.logger
+    streamlit.config.get_config_options()
+    streamlit.logger.set_log_level("error")
+    import app  # noqa: F401
+
+def run(workers, task, *args):
+    """Run task(*args) in the worker pool (started on first use) and return its result.
+
+    A pool whose worker died is replaced on the next call; this one raises
+    BrokenProcessPool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: the serving process has threads (and locks) of its own
+            _pool = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker
+            )
+        executor = _pool
+    try:
+        return executor.submit(task, *args).result()
+    except BrokenProcessPool:
+        with _pool_lock:
+            if _pool is executor:
+                _pool = None
+        raise
+
+def _source(dataset):
+    """Frame source over a published dataset ({"path", "base"}), memory-mapped once per worker.
+
+    When this worker still holds the dataset's base, its derived structures
+    are carried over the way app.get_derived does after a sync or edits.
+    """
+    import app
+    path = dataset["path"]
+    entry = _attached.get(path)
+    if entry is None:
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        base = dataset["base"]
+        previous = _attached.get(base["path"]) if base is not None else None
+        entry = {
+            "key": path,
+            "version": 0,
+            "df": table.to_pandas(split_blocks=True),
+            "derived": {},
+            "base": None if previous is None else {**base, "derived": previous["derived"]},
+            "lock": threading.Lock()
+        }
+        _attached[path] = entry
+        while len(_attached) > WORKER_DATASETS:
+            _attached.popitem(last=False)
+        app.prepare_search_index(entry)
+    _attached.move_to_end(path)
+    return app.frame_source(entry)
+
+def _positions(source, filters):
+    import app
+    filter_index = app.get_derived(source["entry"], "filter_index", app.build_filter_index)
+    return app.filter_positions(filter_index, filters)
+
+def options_task(dataset):
+    """Sorted distinct values of every filter column"""
+    import app
+    source = _source(dataset)
+    return {column: app.source_options(source, column) for column in app.FILTER_COLUMNS}
+
+def totals_task(dataset):
+    import app
+    return app.source_totals(_source(dataset))
+
+def _compact(positions, row_count):
+    """Row positions as int32 when the frame allows, halving what is pickled back"""
+    if positions is None or row_count >= 2 ** 31:
+        return positions
+    return positions.astype(np.int32)
+
+def view_task(dataset, filters, sort_by, ascending):
+    """Positions, sorted order and counts of a filtered view, with its order grouped by mailbox.
+
+    Every mailbox tab shows its rows, so the order also comes back stably
+    regrouped by mailbox, with each mailbox's (start, stop) in it.
+    """
+    import app
+    source = _source(dataset)
+    view = app.open_view(source, filters, sort_by, ascending)
+    mailbox = source["entry"]["df"]["Company Main Email"]
+    codes = mailbox.cat.codes.to_numpy()[view["order"]]
+    grouping = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[grouping], np.arange(len(mailbox.cat.categories) + 1))
+    return {
+        "positions": _compact(view["positions"], len(mailbox)),
+        "order": _compact(view["order"], len(mailbox)),
+        "mailbox_order": _compact(view["order"][grouping], len(mailbox)),
+        "mailbox_bounds": {
+            category: (int(bounds[i]), int(bounds[i + 1])) for i, category in enumerate(mailbox.cat.categories)
+        },
+        "counts": view["counts"]
+    }
+
+def search_task(dataset, filters, query):
+    """Ranked row positions of the view's emails matching query"""
+    import app
+    source = _source(dataset)
+    rows, _ = app.get_search_results(
+        source["entry"], query, app.filter_state_key(filters), _positions(source, filters)
+    )
+    return _compact(rows, len(source["entry"]["df"]))
+
+def sla_task(dataset, filters):
+    import app
+    source = _source(dataset)
+    return app.get_sla_report(source["entry"], app.filter_state_key(filters), _positions(source, filters))
+
+def export_task(dataset, filters, sort_by, ascending, mailbox, export_format):
+    """Finished export payload of a view (or one mailbox of it)"""
+    import app
+    view = app.open_view(_source(dataset), filters, sort_by, ascending)
+    return app.build_export(app.view_chunks(view, mailbox), export_format)
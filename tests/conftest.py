@@ -0,0 +1,138 @@
+"""Fixtures shared by the tests: the app imported outside a Streamlit run, with Google Sheets faked in memory"""
+import json
+import logging
+import pathlib
+import sys
+from datetime import datetime, timedelta
+
+import gspread
+import pytest
+import requests
+import streamlit as st
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+import app  # noqa: E402
+
+READER = {"client_email": "reader@project.iam.gserviceaccount.com", "private_key_id": "k1", "project_id": "project"}
+STRANGER = {"client_email": "stranger@other.iam.gserviceaccount.com", "private_key_id": "k2", "project_id": "other"}
+
+def api_error(status):
+    """A gspread APIError as raised for an HTTP error response"""
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps({"error": {"code": status, "message": f"HTTP {status}", "status": str(status)}}).encode()
+    return gspread.exceptions.APIError(response)
+
+def sheet_values(df):
+    """Header plus rows of a typed frame, as a worksheet returns them"""
+    sheet = app.to_sheet_format(df)
+    return [list(sheet.columns)] + sheet.astype(str).values.tolist()
+
+class FakeWorksheet:
+    def __init__(self, values):
+        self.values = values
+
+    @property
+    def row_count(self):
+        return len(self.values)
+
+    def row_values(self, row):
+        return list(self.values[row - 1]) if row <= len(self.values) else []
+
+    def col_values(self, col):
+        values = [row[col - 1] if len(row) >= col else "" for row in self.values]
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def get_all_values(self):
+        return [list(row) for row in self.values]
+
+    def batch_get(self, ranges, **kwargs):
+        results = []
+        for cell_range in ranges:
+            first, last = cell_range.split(":")
+            first_row = gspread.utils.a1_to_rowcol(first)[0]
+            last_row = gspread.utils.a1_to_rowcol(last)[0]
+            results.append([list(row) for row in self.values[first_row - 1:last_row]])
+        return results
+
+    def batch_update(self, data, **kwargs):
+        for update in data:
+            row, col = gspread.utils.a1_to_rowcol(update["range"].split(":")[0])
+            for offset, value in enumerate(update["values"][0]):
+                cells = self.values[row - 1]
+                cells.extend([""] * (col + offset - len(cells)))
+                cells[col + offset - 1] = value
+
+class FakeSheets:
+    """Spreadsheets held in memory, each readable by the service accounts listed for it"""
+
+    def __init__(self):
+        self.worksheets = {}
+        self.readers = {}
+        self.error = None
+
+    def add(self, sheet_id, df, worksheet_name="Sheet1", readers=(READER,)):
+        self.worksheets[(sheet_id, worksheet_name)] = FakeWorksheet(sheet_values(df))
+        self.readers.setdefault(sheet_id, set()).update(info["client_email"] for info in readers)
+        return self.worksheets[(sheet_id, worksheet_name)]
+
+    def open(self, info, sheet_id):
+        if self.error is not None:
+            raise self.error
+        if info["client_email"] not in self.readers.get(sheet_id, ()):
+            raise api_error(403)
+        return FakeSpreadsheet(self, sheet_id)
+
+class FakeSpreadsheet:
+    def __init__(self, sheets, sheet_id):
+        self.sheets = sheets
+        self.id = sheet_id
+
+    def worksheet(self, name):
+        worksheet = self.sheets.worksheets.get((self.id, name))
+        if worksheet is None:
+            raise gspread.exceptions.WorksheetNotFound(name)
+        return worksheet
+
+class FakeCredentials:
+    valid = True
+
+    def __init__(self, info):
+        self.info = info
+        self.expiry = datetime.utcnow() + timedelta(hours=1)
+
+    @classmethod
+    def from_service_account_info(cls, info, scopes=None):
+        return cls(info)
+
+    def refresh(self, request):
+        self.expiry = datetime.utcnow() + timedelta(hours=1)
+
+class FakeClient:
+    def __init__(self, sheets, info):
+        self.sheets = sheets
+        self.info = info
+        self.http_client = type("HTTPClient", (), {"session": requests.Session()})()
+
+    def open_by_key(self, key):
+        return self.sheets.open(self.info, key)
+
+@pytest.fixture(autouse=True)
+def fresh_app(monkeypatch, tmp_path):
+    """Empty process-wide caches, snapshots in a temporary folder and no retry backoff"""
+    st.cache_resource.clear()
+    monkeypatch.setattr(app, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setattr(app, "SHEETS_BACKOFF_SECONDS", 0)
+    yield
+    st.cache_resource.clear()
+
+@pytest.fixture
+def fake_sheets(monkeypatch):
+    sheets = FakeSheets()
+    monkeypatch.setattr(app, "Credentials", FakeCredentials)
+    monkeypatch.setattr(app.gspread, "authorize", lambda creds: FakeClient(sheets, creds.info))
+    return sheets
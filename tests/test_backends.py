@@ -0,0 +1,81 @@
+import sqlite3
+
+import pytest
+
+import app
+
+def sql_source(tmp_path, df):
+    """A SQLite source holding df, in the table layout write_sql_table creates"""
+    path = str(tmp_path / "emails.sqlite")
+    app.write_sql_table(df, path)
+    return path
+
+def test_sql_null_cells_read_as_empty_cells(tmp_path):
+    df = app.create_demo_data()
+    path = sql_source(tmp_path, df)
+    email_id = df["Email ID"].iloc[0]
+    connection = sqlite3.connect(path)
+    connection.execute('UPDATE emails SET "Sent (Y/N)" = \'Y\', "Sent Date" = NULL WHERE "Email ID" = ?', [email_id])
+    connection.commit()
+    connection.close()
+
+    source, error = app.open_sql_source(path)
+    assert error is None
+    view = app.open_view(source, {}, "Email ID", True)
+    assert len(app.build_card_html(app.view_rows(view))) == len(df)
+    assert app.view_lookup(view, email_id)["Sent Date"] == ""
+    chunk = next(app.view_chunks(view))
+    assert chunk.loc[chunk["Email ID"] == email_id, "Sent Date"].tolist() == [""]
+
+def test_sql_paths_stay_inside_the_data_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "SQL_DATA_DIR", str(tmp_path / "databases"))
+    (tmp_path / "databases").mkdir()
+    (tmp_path / "databases" / "escape.sqlite").symlink_to(tmp_path / "outside.sqlite")
+
+    path, error = app.resolve_sql_path("emails.sqlite")
+    assert error is None and path == str(tmp_path / "databases" / "emails.sqlite")
+    for name in ["../outside.sqlite", str(tmp_path / "outside.sqlite"), "/etc/passwd", "escape.sqlite", "."]:
+        path, error = app.resolve_sql_path(name)
+        assert path is None and error
+
+@pytest.fixture(scope="module")
+def backends(tmp_path_factory):
+    df = app.create_demo_data(600, 5, seed=8)
+    cache = app._shared_data_cache()
+    with cache["lock"]:
+        entry = app._store_data_entry(cache, ("test", "backends"), df, None)
+    source, error = app.open_sql_source(sql_source(tmp_path_factory.mktemp("sql"), df))
+    assert error is None
+    return app.frame_source(entry), source
+
+FILTERS = [
+    {},
+    {"Priority": ["High"]},
+    {"Priority": ["High", "Low"], "Department": ["Sales", "Support"]},
+    {"Resolution Status": ["Resolved"], "Company Main Email": ["sales@vipbusinesscredit.com"]}
+]
+
+def test_sql_and_frame_sources_agree_on_options_and_totals(backends):
+    frame, sql = backends
+    assert frame["columns"] == sql["columns"]
+    for column in app.FILTER_COLUMNS:
+        assert app.source_options(frame, column) == app.source_options(sql, column)
+    assert app.source_totals(frame) == app.source_totals(sql)
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("sort_by", app.SORT_OPTIONS)
+@pytest.mark.parametrize("ascending", [True, False])
+def test_sql_and_frame_views_agree_on_counts_and_order(backends, filters, sort_by, ascending):
+    views = [app.open_view(source, filters, sort_by, ascending) for source in backends]
+    assert views[0]["counts"] == views[1]["counts"]
+    frame_ids, sql_ids = (app.view_rows(view, columns=["Email ID"])["Email ID"].tolist() for view in views)
+    assert frame_ids == sql_ids
+    mailbox = "support@vipbusinesscredit.com"
+    assert app.view_count(views[0], mailbox) == app.view_count(views[1], mailbox)
+
+@pytest.mark.parametrize("query", ["payment", "urgent issue", "acc"])
+def test_sql_and_frame_searches_find_the_same_emails(backends, query):
+    results = [app.view_search(app.open_view(source, {}, "Email ID", True), query) for source in backends]
+    assert results[0]["total"] == results[1]["total"] > 0
+    total = results[0]["total"]
+    assert set(results[0]["fetch"](0, total)["Email ID"]) == set(results[1]["fetch"](0, total)["Email ID"])
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import app
+import dataplane
+
+@pytest.fixture(autouse=True)
+def attached_here(monkeypatch, tmp_path):
+    """Run data plane tasks in this process, over files in a temporary folder"""
+    monkeypatch.setattr(dataplane, "DATAPLANE_DIR", str(tmp_path))
+    monkeypatch.setattr(dataplane, "_attached", dataplane._attached.__class__())
+    yield
+    dataplane._remove_published()
+
+def shared_entry(rows=2000):
+    cache = app._shared_data_cache()
+    with cache["lock"]:
+        return app._store_data_entry(cache, ("test", "shared"), app.create_demo_data(rows, 5, seed=1), None)
+
+def test_worker_patches_what_it_derived_from_the_previous_version(monkeypatch):
+    entry = shared_entry()
+    dataset = app.frame_source(entry, backend="shared")["dataset"]
+    dataplane.search_task(dataset, {}, "payment")
+    dataplane.view_task(dataset, {"Priority": ["High"]}, "Priority", True)
+
+    email_id = entry["df"]["Email ID"].iloc[123]
+    edited = app.update_entry(entry, {email_id: {"Notes/Comments": "zebra crossing"}})
+    edited_dataset = app.frame_source(edited, backend="shared")["dataset"]
+    assert edited_dataset["base"]["path"] == dataset["path"]
+
+    expected = app.open_view(app.frame_source(edited, backend="frame"), {"Priority": ["High"]}, "Priority", True)
+
+    def rebuilt(df):
+        raise AssertionError("rebuilt from scratch")
+
+    monkeypatch.setattr(app, "build_search_index", rebuilt)
+    monkeypatch.setattr(app, "build_filter_index", rebuilt)
+    rows = dataplane.search_task(edited_dataset, {}, "zebra")
+    assert edited["df"]["Email ID"].iloc[rows].tolist() == [email_id]
+    view = dataplane.view_task(edited_dataset, {"Priority": ["High"]}, "Priority", True)
+    assert view["counts"] == expected["counts"]
+    assert np.array_equal(view["order"], expected["order"])
+
+def test_worker_without_the_previous_version_builds_from_scratch():
+    entry = shared_entry()
+    app.frame_source(entry, backend="shared")
+    email_id = entry["df"]["Email ID"].iloc[7]
+    edited = app.update_entry(entry, {email_id: {"Notes/Comments": "zebra crossing"}})
+    dataset = app.frame_source(edited, backend="shared")["dataset"]
+
+    rows = dataplane.search_task(dataset, {}, "zebra")
+    assert np.array_equal(rows, app.get_search_results(edited, "zebra")[0])
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import app
+from conftest import READER
+
+def test_concurrent_edits_to_one_entry_are_all_kept(monkeypatch):
+    entry, _ = app.load_email_data()
+    source = app.frame_source(entry)
+    ids = entry["df"]["Email ID"].tolist()[:2]
+    apply_email_edits = app.apply_email_edits
+
+    def slow_apply(df, edits):
+        time.sleep(0.05)
+        return apply_email_edits(df, edits)
+
+    monkeypatch.setattr(app, "apply_email_edits", slow_apply)
+    threads = [
+        threading.Thread(target=app.submit_edits, args=(source, {email_id: {"Notes/Comments": f"note{i}"}}))
+        for i, email_id in enumerate(ids)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latest = app.peek_email_data(app.DEMO_DATA_KEY)
+    notes = latest["df"].set_index("Email ID")["Notes/Comments"]
+    assert [notes[email_id] for email_id in ids] == ["note0", "note1"]
+
+def test_queued_edits_coalesce_into_one_sheet_write(fake_sheets, monkeypatch):
+    df = app.create_demo_data(20, 5, seed=7)
+    worksheet = fake_sheets.add("sheet", df)
+    writes = []
+    batch_update = worksheet.batch_update
+
+    def record(data, **kwargs):
+        writes.append(data)
+        batch_update(data, **kwargs)
+
+    monkeypatch.setattr(worksheet, "batch_update", record)
+    monkeypatch.setattr(app, "WRITEBACK_DELAY_SECONDS", 0.2)
+    first, second = df["Email ID"].iloc[3], df["Email ID"].iloc[12]
+    for edits in [
+        {first: {"Resolution Status": "In Progress"}},
+        {first: {"Notes/Comments": "called back"}, second: {"Resolution Status": "Resolved"}},
+        {first: {"Resolution Status": "Resolved"}}
+    ]:
+        queue = app.queue_edits(READER, "sheet", "Sheet1", edits)
+
+    deadline = time.time() + 5
+    while (queue["written"] < 2 or queue["in_flight"]) and time.time() < deadline:
+        time.sleep(0.02)
+    assert queue["error"] is None and queue["written"] == 2
+    # One write, with the adjacent columns of a row in one range
+    assert len(writes) == 1
+    assert writes[0] == [
+        {"range": "X5:Y5", "values": [["Resolved", "called back"]]},
+        {"range": "X14", "values": [["Resolved"]]}
+    ]
+    assert app.pending_edits(("sheet", "Sheet1")) == {}
+
+def test_failed_writes_go_back_behind_newer_edits():
+    pending = {"E1": {"Resolution Status": "Resolved"}}
+    app._merge_edits(pending, {"E1": {"Resolution Status": "Pending", "Notes/Comments": "x"}, "E2": {"Priority": "Low"}},
+                     overwrite=False)
+    assert pending == {"E1": {"Resolution Status": "Resolved", "Notes/Comments": "x"}, "E2": {"Priority": "Low"}}
@@ -0,0 +1,48 @@
+import requests
+
+import app
+from conftest import READER, STRANGER
+
+def test_cached_sheet_is_only_served_to_accounts_that_can_read_it(fake_sheets):
+    fake_sheets.add("sheet", app.create_demo_data())
+    entry, error = app.load_email_data(READER, "sheet")
+    assert error is None and entry is not None
+
+    denied, error = app.load_email_data(STRANGER, "sheet")
+    assert denied is None and "403" in error
+
+    fake_sheets.readers["sheet"].add(STRANGER["client_email"])
+    shared, error = app.load_email_data(STRANGER, "sheet")
+    assert error is None and shared is entry
+
+def cold_start_from_snapshot(fake_sheets):
+    """Sync a sheet once (writing a snapshot), then forget everything held in memory"""
+    fake_sheets.add("sheet", app.create_demo_data())
+    entry, error = app.load_email_data(READER, "sheet")
+    assert error is None
+    app.st.cache_resource.clear()
+    return entry
+
+def test_snapshot_is_served_to_its_reader_while_the_sheet_is_unreachable(fake_sheets):
+    synced = cold_start_from_snapshot(fake_sheets)
+    fake_sheets.error = requests.exceptions.ConnectionError("network down")
+
+    entry, error = app.load_email_data(READER, "sheet")
+    assert "network down" in error
+    assert entry["df"]["Email ID"].tolist() == synced["df"]["Email ID"].tolist()
+
+def test_snapshot_is_not_served_to_other_accounts_while_the_sheet_is_unreachable(fake_sheets):
+    cold_start_from_snapshot(fake_sheets)
+    fake_sheets.readers["sheet"].add(STRANGER["client_email"])
+    fake_sheets.error = requests.exceptions.ConnectionError("network down")
+
+    entry, error = app.load_email_data(STRANGER, "sheet")
+    assert entry is None and "network down" in error
+
+def test_snapshot_is_not_served_when_the_sheet_refuses_the_account(fake_sheets):
+    cold_start_from_snapshot(fake_sheets)
+    fake_sheets.readers["sheet"].clear()
+
+    entry, error = app.load_email_data(READER, "sheet")
+    assert entry is None and "403" in error
+    assert ("sheet", "Sheet1") not in app._shared_data_cache()["entries"]
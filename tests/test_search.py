@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import app
+
+@pytest.fixture
+def accented():
+    df = app.create_demo_data(50, 5, seed=2)
+    subjects = df["Subject"].astype(object)
+    subjects.iloc[3] = "Rückruf von Frau Müller"
+    subjects.iloc[8] = "Lieferung an die HAUPTSTRASSE"
+    subjects.iloc[9] = "東京 office visit"
+    return df.assign(Subject=subjects)
+
+def matches(df, query):
+    rows, _ = app.search_emails(app.build_search_index(df), query)
+    return sorted(df["Email ID"].iloc[rows])
+
+@pytest.mark.parametrize("query", ["müller", "Müller", "MÜLLER", "mül", "rückruf müller"])
+def test_search_matches_accented_words(accented, query):
+    assert matches(accented, query) == [accented["Email ID"].iloc[3]]
+
+def test_search_casefolds_text_and_query(accented):
+    assert matches(accented, "hauptstraße") == [accented["Email ID"].iloc[8]]
+    assert matches(accented, "東京") == [accented["Email ID"].iloc[9]]
+
+def test_sql_search_matches_accented_words(accented, tmp_path):
+    path = str(tmp_path / "emails.sqlite")
+    app.write_sql_table(accented, path)
+    source, _ = app.open_sql_source(path)
+    view = app.open_view(source, {}, "Email ID", True)
+    for query in ["müller", "MÜLLER", "東京"]:
+        result = app.view_search(view, query)
+        assert result["total"] == 1
+    assert np.array_equal(
+        app.view_search(view, "MÜLLER")["fetch"](0, 5)["Email ID"].to_numpy(), [accented["Email ID"].iloc[3]]
+    )
+
+def assert_same_results(index, expected, queries):
+    for query in queries:
+        rows, scores = app.search_emails(index, query)
+        expected_rows, expected_scores = app.search_emails(expected, query)
+        assert rows.tolist() == expected_rows.tolist()
+        assert np.allclose(scores, expected_scores)
+
+def test_patched_index_matches_a_rebuild(monkeypatch):
+    cache = app._shared_data_cache()
+    with cache["lock"]:
+        entry = app._store_data_entry(cache, ("test", "search"), app.create_demo_data(2000, 5, seed=5), None)
+    app.get_search_index(entry)
+    ids = entry["df"]["Email ID"]
+    edited = app.update_entry(entry, {ids.iloc[10]: {"Subject": "Müller zebra crossing"}})
+    app.get_search_index(edited)
+    edited = app.update_entry(edited, {
+        ids.iloc[10]: {"Notes/Comments": "zebra again"},
+        ids.iloc[1500]: {"Subject": "Payment for the zebra", "Email Summary": ""}
+    })
+    expected = app.build_search_index(edited["df"])
+
+    def rebuilt(df):
+        raise AssertionError("rebuilt from scratch")
+
+    monkeypatch.setattr(app, "build_search_index", rebuilt)
+    patched = app.get_search_index(edited)
+    assert patched["patched"].tolist() == [10, 1500]
+    assert sorted(app.search_emails(patched, "zebra")[0].tolist()) == [10, 1500]
+    assert_same_results(patched, expected, ["zebra", "müller", "payment", "payment gateway", "urgent", "account"])
+
+def test_extended_index_matches_a_rebuild():
+    df = app.create_demo_data(1200, 5, seed=6)
+    index = app.build_search_index(df.iloc[:1000].reset_index(drop=True))
+    index = app.patch_search_index(index, df.iloc[:1000].reset_index(drop=True), [5, 950])
+    extended = app.extend_search_index(index, df, 800)
+    assert extended["patched"].tolist() == [5]
+    assert_same_results(extended, app.build_search_index(df), ["payment", "urgent issue", "account", "contract"])
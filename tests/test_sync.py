@@ -0,0 +1,54 @@
+import pandas as pd
+
+import app
+from conftest import READER, sheet_values
+
+def edit_and_append(worksheet, count=30):
+    """Edit a row inside the re-check window and append new rows to a worksheet"""
+    header = worksheet.values[0]
+    worksheet.values[-5][header.index("Subject")] = "Renewal quote for the Lisbon office"
+    worksheet.values[-5][header.index("Priority")] = "High"
+    last_id = int(worksheet.values[-1][header.index("Email ID")][1:])
+    for offset, row in enumerate(sheet_values(app.create_demo_data(count, 5, seed=4))[1:], start=1):
+        row[header.index("Email ID")] = f"E{last_id + offset}"
+        worksheet.values.append(row)
+
+def test_incremental_sync_matches_a_full_reload(fake_sheets, monkeypatch):
+    worksheet = fake_sheets.add("sheet", app.create_demo_data(600, 5, seed=3))
+    entry, error = app.load_email_data(READER, "sheet")
+    assert error is None
+    app.get_aggregates(entry)
+    app.get_search_index(entry)
+
+    edit_and_append(worksheet)
+    synced, error = app.load_email_data(READER, "sheet", force=True)
+    assert error is None
+    assert synced["sync_state"]["last_delta"] == {"mode": "incremental", "start": 400, "appended": 30, "changed": 1}
+
+    full, _, error = app.sync_gsheets(READER, "sheet")
+    assert error is None
+    pd.testing.assert_frame_equal(synced["df"], full)
+    aggregates = app.build_aggregates(full)["total"]
+    index = app.build_search_index(full)
+    assert len(app.search_emails(index, "lisbon")[0]) == 1
+
+    def rebuilt(df):
+        raise AssertionError("rebuilt from scratch")
+
+    # The new version extends what the previous one built
+    monkeypatch.setattr(app, "build_aggregates", rebuilt)
+    monkeypatch.setattr(app, "build_search_index", rebuilt)
+    assert app.get_aggregates(synced) == aggregates
+    extended = app.get_search_index(synced)
+    for query in ["lisbon", "payment", "urgent pay", "account"]:
+        rows, scores = app.search_emails(extended, query)
+        expected_rows, expected_scores = app.search_emails(index, query)
+        assert rows.tolist() == expected_rows.tolist()
+        assert scores.tolist() == expected_scores.tolist()
+
+def test_unchanged_sheet_keeps_the_synced_frame(fake_sheets):
+    fake_sheets.add("sheet", app.create_demo_data(300, 5, seed=3))
+    entry, _ = app.load_email_data(READER, "sheet")
+    synced, error = app.load_email_data(READER, "sheet", force=True)
+    assert error is None and synced["df"] is entry["df"]
+    assert synced["sync_state"]["last_delta"]["changed"] == 0